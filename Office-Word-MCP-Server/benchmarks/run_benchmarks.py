@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Word Document Server.
+
+Synthesizes a document of configurable size and times every tool that
+``register_tools`` exposes, going through the same MCP call path clients
+use. Each tool runs in a fresh process: the first call is reported as the
+cold latency (including lazy imports and empty caches) and the following
+calls as warm latencies. Memory is reported per tool: the growth of the
+resident set during its calls, measured from the high-water mark reset after
+the server modules are imported (Linux only), and the peak Python heap
+allocation of one extra, untimed call traced with tracemalloc.
+
+Usage:
+    python benchmarks/run_benchmarks.py --paragraphs 2000 --output results.json
+    python benchmarks/run_benchmarks.py --tools get_document_text,find_text_in_document
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import datetime
+import tempfile
+import tracemalloc
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthesize import synthesize_document, write_png
+
+
+PASSWORD = "benchmark-password"
+
+# Tools that never modify their input; they share one document so warm
+# calls can benefit from any caching the server does
+READ_ONLY_TOOLS = {
+    "get_document_info", "get_document_text", "get_document_outline",
+    "export_document_chunks", "export_markdown", "list_available_documents", "bulk_extract",
+    "get_paragraph_text_from_document", "find_text_in_document", "diff_documents",
+    "convert_to_pdf", "convert_documents_to_pdf", "get_server_metrics", "get_edit_history",
+    "verify_documents",
+}
+
+# Tools that need LibreOffice (or Word) to do any work
+PDF_TOOLS = {"convert_to_pdf", "convert_documents_to_pdf"}
+
+# Tools that work on an encrypted copy of the document
+ENCRYPTED_TOOLS = {
+    "unprotect_document", "open_protected_document", "save_protected_document", "close_protected_document",
+}
+
+# Tools that need the opt-in edit journal; other tools are measured without it
+JOURNAL_TOOLS = {"undo_last_edit", "create_snapshot", "restore_snapshot", "get_edit_history"}
+
+# Untimed calls that give a tool something to work on, run before each measured call
+SETUP_CALLS = {
+    "save_protected_document": [("open_protected_document", {"password": PASSWORD}),
+                                ("add_paragraph", {"text": "Paragraph in a protected session."})],
+    "close_protected_document": [("open_protected_document", {"password": PASSWORD}),
+                                 ("add_paragraph", {"text": "Paragraph in a protected session."})],
+    "undo_last_edit": [("add_paragraph", {"text": "Paragraph to undo."})],
+    "restore_snapshot": [("create_snapshot", {"snapshot_name": "benchmark"}),
+                         ("add_paragraph", {"text": "Paragraph to roll back."}),
+                         ("add_table", {"rows": 3, "cols": 3})],
+}
+
+# Result prefixes the tools use to report failures
+ERROR_PREFIXES = ("Failed", "Cannot", "Invalid", "Error")
+
+
+def _copy_library(workspace: Dict[str, Any], name: str, i: int) -> List[str]:
+    """Copy the library documents to a fresh directory for a tool that modifies them."""
+    directory = os.path.join(workspace["scratch"], f"{name}_{i}")
+    os.makedirs(directory, exist_ok=True)
+    copies = []
+    for path in workspace["library_files"]:
+        target = os.path.join(directory, os.path.basename(path))
+        shutil.copyfile(path, target)
+        copies.append(target)
+    return copies
+
+
+def _report_spec(image: str, sections: int = 40) -> Dict[str, Any]:
+    """A spec for build_document of roughly fifty pages."""
+    blocks: List[Any] = [{"type": "heading", "text": "Benchmark Report", "level": 0}]
+    for section in range(sections):
+        blocks.append({"type": "heading", "text": f"Section {section + 1}", "level": 1})
+        for paragraph in range(8):
+            blocks.append({"type": "paragraph", "runs": [
+                f"Paragraph {paragraph + 1} of section {section + 1} with some body text. ",
+                {"text": "Emphasized text.", "bold": True}
+            ]})
+        blocks.append({"type": "list", "items": ["First point", "Second point", "Third point"]})
+        blocks.append({"type": "table", "header": True,
+                       "rows": [["Item", "Value", "Notes"]] + [[f"Row {row}", str(row * 10), "-"] for row in range(5)]})
+        if section % 10 == 0:
+            blocks.append({"type": "image", "path": image, "width": 2})
+        blocks.append({"type": "page_break"})
+    return {"title": "Benchmark Report", "blocks": blocks}
+
+
+def _report_markdown(sections: int = 40) -> str:
+    """Markdown for import_markdown, a section per page as in _report_spec."""
+    parts = ["# Benchmark Report\n"]
+    for section in range(sections):
+        parts.append(f"\n## Section {section + 1}\n\n")
+        parts.extend(f"Paragraph {paragraph + 1} of section {section + 1} with some body text. "
+                     f"**Emphasized text** and a [link](https://example.com/{section}).\n\n"
+                     for paragraph in range(8))
+        parts.append("- First point\n- Second point\n- Third point\n\n")
+        parts.append("| Item | Value | Notes |\n|------|------:|-------|\n")
+        parts.extend(f"| Row {row} | {row * 10} | - |\n" for row in range(5))
+        parts.append("\n```\nprint('code')\n```\n")
+    return "".join(parts)
+
+
+def _arguments(workspace: Dict[str, str], doc: str, i: int) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """Argument builders for each tool, keyed by tool name."""
+    scratch = workspace["scratch"]
+    return {
+        "create_document": lambda: {"filename": os.path.join(scratch, f"created_{i}.docx"), "title": "Benchmark"},
+        "build_document": lambda: {"filename": os.path.join(scratch, f"built_{i}.docx"),
+                                   "spec": _report_spec(workspace["image"])},
+        "copy_document": lambda: {"source_filename": doc,
+                                  "destination_filename": os.path.join(scratch, f"copied_{i}.docx")},
+        "get_document_info": lambda: {"filename": doc},
+        "get_document_text": lambda: {"filename": doc},
+        "get_document_outline": lambda: {"filename": doc},
+        "export_markdown": lambda: {"filename": doc},
+        "export_document_chunks": lambda: {"filename": doc, "max_tokens": 256, "overlap": 32, "page_size": 20},
+        "list_available_documents": lambda: {"directory": workspace["library"]},
+        "bulk_extract": lambda: {"directory": workspace["library"],
+                                 "output_path": os.path.join(scratch, f"bulk_{i}.jsonl")},
+        "add_paragraph": lambda: {"filename": doc, "text": "Benchmark paragraph text."},
+        "add_heading": lambda: {"filename": doc, "text": "Benchmark heading", "level": 2},
+        "add_picture": lambda: {"filename": doc, "image_path": workspace["image"], "width": 1.0},
+        "add_table": lambda: {"filename": doc, "rows": 5, "cols": 4,
+                              "data": [[f"r{r}c{c}" for c in range(4)] for r in range(5)]},
+        "add_page_break": lambda: {"filename": doc},
+        "import_markdown": lambda: {"filename": doc, "markdown_or_path": _report_markdown()},
+        "delete_paragraph": lambda: {"filename": doc, "paragraph_index": 1},
+        "delete_paragraphs": lambda: {"filename": doc, "start_index": 1, "end_index": 10},
+        "move_range": lambda: {"filename": doc, "start_index": 1, "end_index": 5, "target_index": 20},
+        "replace_range_with": lambda: {"filename": doc, "start_index": 1, "end_index": 5,
+                                       "paragraphs": ["Replacement one.", "Replacement two."]},
+        "search_and_replace": lambda: {"filename": doc, "find_text": "report", "replace_text": "summary"},
+        "create_custom_style": lambda: {"filename": doc, "style_name": "Benchmark Style", "bold": True,
+                                        "font_size": 12},
+        "create_styles": lambda: {"filename": doc, "styles": [
+            {"style_name": f"Benchmark Style {n}", "bold": n % 2 == 0, "font_size": 10 + n % 4,
+             "base_style": "Normal"} for n in range(20)]},
+        "format_text": lambda: {"filename": doc, "paragraph_index": 1, "start_pos": 0, "end_pos": 5,
+                                "bold": True, "color": "red"},
+        "format_text_ranges": lambda: {"filename": doc, "ranges": [
+            {"paragraph_index": p, "start_pos": start, "end_pos": start + 3, "highlight": "yellow"}
+            for p in range(2, 12) for start in range(0, 50, 5)]},
+        "format_matches": lambda: {"filename": doc, "pattern": r"\b[a-z]{6,}\b", "regex": True,
+                                   "formatting": {"bold": True, "highlight": "yellow"}},
+        "format_table": lambda: {"filename": doc, "table_index": 0, "has_header_row": True,
+                                 "border_style": "single"},
+        "protect_document": lambda: {"filename": doc, "password": PASSWORD},
+        "protect_documents": lambda: {"filenames": _copy_library(workspace, "protect_documents", i),
+                                      "password": PASSWORD},
+        "verify_documents": lambda: {"directory": workspace["signed"],
+                                     "output_path": os.path.join(scratch, f"verification_{i}.json")},
+        "unprotect_document": lambda: {"filename": doc, "password": PASSWORD},
+        "open_protected_document": lambda: {"filename": doc, "password": PASSWORD},
+        "save_protected_document": lambda: {"filename": doc},
+        "close_protected_document": lambda: {"filename": doc},
+        "add_footnote_to_document": lambda: {"filename": doc, "paragraph_index": 1,
+                                             "footnote_text": "Benchmark footnote."},
+        "add_endnote_to_document": lambda: {"filename": doc, "paragraph_index": 1,
+                                            "endnote_text": "Benchmark endnote."},
+        "add_notes": lambda: {"filename": doc, "notes": [[p, f"Benchmark note {p}."] for p in range(1, 51)]},
+        "convert_footnotes_to_endnotes_in_document": lambda: {"filename": doc},
+        "customize_footnote_style": lambda: {"filename": doc, "numbering_format": "i, ii, iii",
+                                             "font_size": 9},
+        "get_paragraph_text_from_document": lambda: {"filename": doc, "paragraph_index": 1},
+        "find_text_in_document": lambda: {"filename": doc, "text_to_find": "report"},
+        "diff_documents": lambda: {"original_filename": doc, "revised_filename": workspace["revised"]},
+        "convert_to_pdf": lambda: {"filename": doc, "output_filename": os.path.join(scratch, f"converted_{i}.pdf")},
+        "convert_documents_to_pdf": lambda: {"filenames": workspace["library_files"],
+                                             "output_directory": os.path.join(scratch, f"pdf_{i}")},
+        "get_server_metrics": lambda: {},
+        "undo_last_edit": lambda: {"filename": doc},
+        "create_snapshot": lambda: {"filename": doc, "snapshot_name": f"snapshot_{i}"},
+        "restore_snapshot": lambda: {"filename": doc, "snapshot_name": "benchmark"},
+        "get_edit_history": lambda: {"filename": doc},
+    }
+
+
+def _prepare_document(name: str, workspace: Dict[str, str], i: int) -> str:
+    """Get the document a tool call should work on, copying it for mutating tools."""
+    if name in READ_ONLY_TOOLS:
+        return workspace["document"]
+    source = workspace["encrypted"] if name in ENCRYPTED_TOOLS else workspace["document"]
+    target = os.path.join(workspace["scratch"], f"{name}_{i}.docx")
+    shutil.copyfile(source, target)
+    return target
+
+
+def _result_text(result: Any) -> str:
+    """Flatten the result of FastMCP.call_tool into text."""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        return json.dumps(result)
+    return "".join(getattr(block, "text", "") for block in result)
+
+
+def _rss_mb(field: str) -> Optional[float]:
+    """
+    Read a memory field of the current process from /proc in MB.
+
+    Args:
+        field: 'VmRSS' for the current resident set, 'VmHWM' for its high-water mark
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset the resident set high-water mark of the current process.
+
+    getrusage() cannot be used for this: its peak includes the parent's
+    memory at fork time and everything imported before the tool ran, so it
+    is about the same for every tool.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _benchmark_tool(name: str, workspace: Dict[str, str], iterations: int, results) -> None:
+    """Run one tool in this (fresh) process and report its timings."""
+    os.environ["WORD_MCP_PDF_CACHE_DIR"] = os.path.join(workspace["scratch"], "pdf_cache")
+    os.environ["WORD_MCP_JOURNAL_DIR"] = os.path.join(workspace["scratch"], "journal")
+    if name in JOURNAL_TOOLS:
+        os.environ["WORD_MCP_JOURNAL_MB"] = "64"
+
+    start = time.perf_counter()
+    from word_document_server.main import mcp, register_tools
+    register_tools()
+    import_seconds = time.perf_counter() - start
+
+    loop = asyncio.new_event_loop()
+    timings = []
+    sample = ""
+    errors = 0
+    rss_before = _rss_mb("VmRSS") if _reset_peak_rss() else None
+    rss_increase = None
+    heap_peak = None
+    try:
+        # The last call is untimed and only traces heap allocations,
+        # since tracemalloc slows every allocation down
+        for i in range(iterations + 2):
+            traced = i == iterations + 1
+            doc = _prepare_document(name, workspace, i)
+            arguments = _arguments(workspace, doc, i)[name]()
+            for setup_name, setup_arguments in SETUP_CALLS.get(name, []):
+                loop.run_until_complete(mcp.call_tool(setup_name, {"filename": doc, **setup_arguments}))
+
+            if traced:
+                rss_peak = _rss_mb("VmHWM")
+                if rss_before is not None and rss_peak is not None:
+                    rss_increase = round(max(0.0, rss_peak - rss_before), 1)
+                tracemalloc.start()
+                try:
+                    loop.run_until_complete(mcp.call_tool(name, arguments))
+                    heap_peak = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+                finally:
+                    tracemalloc.stop()
+                continue
+
+            start = time.perf_counter()
+            text = _result_text(loop.run_until_complete(mcp.call_tool(name, arguments)))
+            timings.append(time.perf_counter() - start)
+
+            if text.startswith(ERROR_PREFIXES) or text.endswith("does not exist"):
+                errors += 1
+            if i == 0:
+                sample = text[:200]
+    except Exception as e:
+        results.put({"tool": name, "status": "error", "error": f"{type(e).__name__}: {e}"})
+        return
+    finally:
+        loop.close()
+
+    warm = timings[1:]
+    report = {
+        "tool": name,
+        "status": "ok" if not errors else "tool_errors",
+        "tool_errors": errors,
+        "import_seconds": round(import_seconds, 4),
+        "cold_seconds": round(timings[0], 6),
+        "rss_increase_mb": rss_increase,
+        "heap_peak_mb": heap_peak,
+        "result_sample": sample,
+    }
+    if warm:
+        mean = sum(warm) / len(warm)
+        report["warm"] = {
+            "iterations": len(warm),
+            "mean_seconds": round(mean, 6),
+            "p50_seconds": round(_percentile(warm, 50), 6),
+            "p99_seconds": round(_percentile(warm, 99), 6),
+            "min_seconds": round(min(warm), 6),
+            "max_seconds": round(max(warm), 6),
+            "ops_per_second": round(1 / mean, 2) if mean > 0 else None,
+        }
+    results.put(report)
+
+
+def _list_registered_tools() -> List[str]:
+    """Names of all tools registered by register_tools()."""
+    from word_document_server.main import mcp, register_tools
+    register_tools()
+    return [tool.name for tool in asyncio.run(mcp.list_tools())]
+
+
+def build_workspace(directory: str, args) -> Dict[str, Any]:
+    """Synthesize the benchmark inputs."""
+    scratch = os.path.join(directory, "scratch")
+    library = os.path.join(directory, "library")
+    os.makedirs(scratch)
+    os.makedirs(library)
+
+    image = write_png(os.path.join(directory, "image.png"))
+    document = synthesize_document(
+        os.path.join(directory, "document.docx"), paragraphs=args.paragraphs, tables=args.tables,
+        images=args.images, footnotes=args.footnotes, seed=args.seed, image_path=image
+    )
+
+    # A revision of the document for diff_documents
+    from docx import Document
+    revised_doc = Document(document)
+    paragraphs = revised_doc.paragraphs
+    for paragraph in paragraphs[::max(1, len(paragraphs) // 10)]:
+        paragraph.add_run(" Revised.")
+    revised_doc.add_paragraph("Appended in the revision.")
+    revised = os.path.join(directory, "revised.docx")
+    revised_doc.save(revised)
+
+    # A small library of documents for directory-level tools
+    library_files = []
+    for i in range(args.library_size):
+        path = synthesize_document(
+            os.path.join(library, f"library_{i}.docx"), paragraphs=max(10, args.paragraphs // 10),
+            tables=1, images=0, footnotes=0, seed=args.seed + i + 1
+        )
+        library_files.append(path)
+
+    # Signed copies of the library for verify_documents
+    from word_document_server.core.protection import add_protection_info, create_signature_info
+    from word_document_server.core.signatures import build_hash_tree
+    signed = os.path.join(directory, "signed")
+    os.makedirs(signed)
+    for path in library_files:
+        copy = os.path.join(signed, os.path.basename(path))
+        shutil.copyfile(path, copy)
+        signature_info = create_signature_info(None, "Benchmark", hash_tree=build_hash_tree(copy))
+        add_protection_info(copy, "signature", "", signature_info=signature_info)
+
+    # An encrypted copy for unprotect_document
+    import msoffcrypto
+    encrypted = os.path.join(directory, "encrypted.docx")
+    with open(document, "rb") as infile, open(encrypted, "wb") as outfile:
+        msoffcrypto.OfficeFile(infile).encrypt(PASSWORD, outfile)
+
+    return {
+        "document": document,
+        "revised": revised,
+        "encrypted": encrypted,
+        "image": image,
+        "scratch": scratch,
+        "library": library,
+        "library_files": library_files,
+        "signed": signed,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Format a comparison of warm p50 latencies against a previous run."""
+    lines = [f"{'tool':40} {'baseline p50':>14} {'current p50':>14} {'change':>9}"]
+    for name, report in sorted(current["tools"].items()):
+        old = baseline.get("tools", {}).get(name, {}).get("warm", {}).get("p50_seconds")
+        new = report.get("warm", {}).get("p50_seconds")
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        lines.append(f"{name:40} {old * 1000:12.2f}ms {new * 1000:12.2f}ms {change:+8.1f}%")
+    return "\n".join(lines)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Format the results as a text table."""
+    lines = [f"{'tool':40} {'cold':>10} {'p50':>10} {'p99':>10} {'ops/s':>9} {'rss+ MB':>8} {'heap MB':>8}  status"]
+    for name, result in sorted(report["tools"].items()):
+        warm = result.get("warm", {})
+        cold = result.get("cold_seconds")
+        lines.append(
+            f"{name:40} {_ms(cold):>10} {_ms(warm.get('p50_seconds')):>10} {_ms(warm.get('p99_seconds')):>10} "
+            f"{str(warm.get('ops_per_second', '-')):>9} {_mb(result.get('rss_increase_mb')):>8} "
+            f"{_mb(result.get('heap_peak_mb')):>8}  {result['status']}"
+        )
+    return "\n".join(lines)
+
+
+def _ms(seconds: Optional[float]) -> str:
+    """Format seconds as milliseconds for the text table."""
+    return f"{seconds * 1000:.1f}ms" if seconds is not None else "-"
+
+
+def _mb(megabytes: Optional[float]) -> str:
+    """Format a memory figure for the text table."""
+    return str(megabytes) if megabytes is not None else "-"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Word Document Server tools.")
+    parser.add_argument("--paragraphs", type=int, default=1000, help="Body paragraphs in the test document")
+    parser.add_argument("--tables", type=int, default=10, help="Tables in the test document")
+    parser.add_argument("--images", type=int, default=5, help="Images in the test document")
+    parser.add_argument("--footnotes", type=int, default=20, help="Footnotes in the test document")
+    parser.add_argument("--library-size", type=int, default=8, help="Documents for directory-level tools")
+    parser.add_argument("--iterations", type=int, default=10, help="Warm calls per tool")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic documents")
+    parser.add_argument("--tools", help="Comma-separated tool names to run (default: all registered tools)")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="Compare against a previous JSON result file")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated files")
+    args = parser.parse_args(argv)
+
+    registered = _list_registered_tools()
+    selected = [name.strip() for name in args.tools.split(",")] if args.tools else registered
+
+    directory = tempfile.mkdtemp(prefix="word_mcp_bench_")
+    try:
+        workspace = build_workspace(directory, args)
+
+        from word_document_server.core.conversion import find_libreoffice
+        has_pdf_converter = find_libreoffice() is not None or platform.system() == "Windows"
+
+        context = multiprocessing.get_context("spawn")
+        tools = {}
+        for name in selected:
+            if name not in registered:
+                tools[name] = {"tool": name, "status": "skipped", "reason": "not registered"}
+            elif name not in _arguments(workspace, "", 0):
+                tools[name] = {"tool": name, "status": "skipped", "reason": "no argument builder"}
+            elif name in PDF_TOOLS and not has_pdf_converter:
+                tools[name] = {"tool": name, "status": "skipped", "reason": "no PDF converter installed"}
+            else:
+                results = context.Queue()
+                process = context.Process(target=_benchmark_tool, args=(name, workspace, args.iterations, results))
+                process.start()
+                process.join()
+                tools[name] = results.get() if not results.empty() else {
+                    "tool": name, "status": "error", "error": f"process exited with code {process.exitcode}"
+                }
+            print(f"{name}: {tools[name]['status']}", file=sys.stderr)
+
+        report = {
+            "environment": {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "settings": {
+                "paragraphs": args.paragraphs,
+                "tables": args.tables,
+                "images": args.images,
+                "footnotes": args.footnotes,
+                "library_size": args.library_size,
+                "iterations": args.iterations,
+                "seed": args.seed,
+                "document_bytes": os.path.getsize(workspace["document"]),
+            },
+            "tools": tools,
+        }
+    finally:
+        if args.keep:
+            print(f"Generated files kept in {directory}", file=sys.stderr)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print()
+            print(compare_results(report, json.load(f)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
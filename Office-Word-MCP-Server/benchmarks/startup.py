@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Word Document Server.
+
+Measures how long a client waits after spawning the server: the import
+time of the server module, the time until the stdio ``initialize``
+handshake is answered and the time until ``tools/list`` returns. It also
+reports which heavy dependencies were imported before the first tool call,
+since those should only load when a tool needs them.
+
+Usage:
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --runs 10 --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should not be imported until a tool is called
+DEFERRED_MODULES = ("docx", "lxml.etree", "msoffcrypto", "word_document_server.core.conversion")
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "from word_document_server.main import register_tools\n"
+    "register_tools()\n"
+    "elapsed = time.perf_counter() - start\n"
+    "import json\n"
+    "print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))\n"
+) % (DEFERRED_MODULES,)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_import() -> Dict[str, Any]:
+    """Import the server and register its tools in a fresh interpreter."""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=_environment(),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _send(process: subprocess.Popen, message: Dict[str, Any]) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process: subprocess.Popen, request_id: int) -> Dict[str, Any]:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited before answering")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_handshake() -> Dict[str, float]:
+    """Spawn the server over stdio and time the handshake and tool listing."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "word_mcp_server.py")],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, env=_environment())
+    try:
+        _send(process, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "startup-benchmark", "version": "1.0"},
+            },
+        })
+        _receive(process, 1)
+        initialized = time.perf_counter() - start
+
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = _receive(process, 2)["result"]["tools"]
+        listed = time.perf_counter() - start
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    return {"initialize_seconds": initialized, "tools_list_seconds": listed, "tools": len(tools)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Word Document Server startup time.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of server spawns")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    imports, initializes, listings = [], [], []
+    loaded = set()
+    tools = 0
+    for _ in range(args.runs):
+        probe = measure_import()
+        imports.append(probe["seconds"])
+        loaded.update(probe["loaded"])
+
+        handshake = measure_handshake()
+        initializes.append(handshake["initialize_seconds"])
+        listings.append(handshake["tools_list_seconds"])
+        tools = handshake["tools"]
+
+    report = {"runs": args.runs, "tools": tools, "deferred_modules_loaded": sorted(loaded)}
+    for name, values in (("import", imports), ("initialize", initializes), ("tools_list", listings)):
+        report[name] = {
+            "p50_seconds": round(_percentile(values, 50), 4),
+            "p99_seconds": round(_percentile(values, 99), 4),
+        }
+
+    print(f"{'phase':<14}{'p50':>10}{'p99':>10}")
+    for name in ("import", "initialize", "tools_list"):
+        print(f"{name:<14}{report[name]['p50_seconds'] * 1000:>8.1f}ms{report[name]['p99_seconds'] * 1000:>8.1f}ms")
+    print(f"{tools} tools listed")
+    if loaded:
+        print(f"Imported before the first tool call: {', '.join(sorted(loaded))}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Synthetic document generator for the Word Document Server benchmarks.
+
+Builds .docx files of a configurable size with headings, paragraphs,
+tables, images and footnotes so tool performance can be measured on
+realistic inputs without shipping sample documents.
+"""
+import os
+import random
+import struct
+import zlib
+from typing import Optional
+
+from docx import Document
+from docx.shared import Inches
+
+
+WORDS = (
+    "agreement analysis annual budget client contract data delivery design "
+    "document estimate forecast growth impact market milestone operations "
+    "performance plan policy priority project quarter report requirement "
+    "resource revenue review risk schedule scope service strategy summary "
+    "support target team timeline update vendor workflow"
+).split()
+
+
+def write_png(path: str, width: int = 64, height: int = 64, seed: int = 0) -> str:
+    """
+    Write a small solid-color RGB PNG without any imaging dependency.
+
+    Args:
+        path: Output path
+        width: Image width in pixels
+        height: Image height in pixels
+        seed: Seed for the color
+
+    Returns:
+        The output path
+    """
+    rng = random.Random(seed)
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + pixel * width for _ in range(height))
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data +
+                struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw)))
+        f.write(chunk(b"IEND", b""))
+    return path
+
+
+def synthesize_document(path: str, paragraphs: int = 500, tables: int = 5, images: int = 2,
+                        footnotes: int = 10, seed: int = 42, image_path: Optional[str] = None) -> str:
+    """
+    Create a synthetic Word document.
+
+    Paragraphs are grouped into sections under level 1-3 headings, and the
+    tables, images and footnotes are spread evenly through the body.
+
+    Args:
+        path: Output path of the document
+        paragraphs: Number of body paragraphs (headings not included)
+        tables: Number of 5x4 tables
+        images: Number of inline images
+        footnotes: Number of footnote references
+        seed: Random seed, so runs with the same settings produce the same document
+        image_path: Optional PNG to embed; a generated one is used if not given
+
+    Returns:
+        The output path
+    """
+    rng = random.Random(seed)
+    doc = Document()
+    doc.core_properties.title = "Synthetic benchmark document"
+    doc.core_properties.author = "benchmarks"
+
+    if images and not image_path:
+        image_path = write_png(os.path.splitext(path)[0] + "_image.png", seed=seed)
+
+    table_every = paragraphs // tables if tables else 0
+    image_every = paragraphs // images if images else 0
+    footnote_every = paragraphs // footnotes if footnotes else 0
+    notes = []
+
+    for i in range(paragraphs):
+        if i % 20 == 0:
+            level = 1 if i % 100 == 0 else (2 if i % 40 == 0 else 3)
+            doc.add_heading(f"Section {i // 20 + 1}: {rng.choice(WORDS).title()}", level=level)
+
+        sentence_count = rng.randint(1, 4)
+        text = " ".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+            for _ in range(sentence_count)
+        )
+        paragraph = doc.add_paragraph(text)
+
+        if footnote_every and i % footnote_every == 0 and len(notes) < footnotes:
+            notes.append((paragraph, f"Note {len(notes) + 1} on {rng.choice(WORDS)}."))
+
+        if table_every and i % table_every == table_every - 1 and len(doc.tables) < tables:
+            table = doc.add_table(rows=5, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"{rng.choice(WORDS)} {rng.randint(1, 1000)}"
+
+        if image_every and i % image_every == image_every - 1 and len(doc.inline_shapes) < images:
+            doc.add_picture(image_path, width=Inches(1))
+
+    if notes:
+        from word_document_server.core.footnotes import add_notes
+        add_notes(doc, notes, "footnote")
+
+    doc.save(path)
+    return path
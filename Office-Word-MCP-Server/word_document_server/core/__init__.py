@@ -2,9 +2,69 @@
 Core functionality for the Word Document Server.
 
 This package contains the core functionality modules used by the Word Document Server.
+Re-exported functions are imported on first access, so the server can start
+without loading python-docx.
 """
+import importlib
 
-from word_document_server.core.styles import ensure_heading_style, ensure_table_style, create_style
-from word_document_server.core.protection import add_protection_info, verify_document_protection, is_section_editable, create_signature_info, verify_signature
-from word_document_server.core.footnotes import add_footnote, add_endnote, convert_footnotes_to_endnotes, find_footnote_references, get_format_symbols, customize_footnote_formatting
-from word_document_server.core.tables import set_cell_border, apply_table_style, copy_table
+_EXPORTS = {
+    "ensure_heading_style": "styles",
+    "ensure_table_style": "styles",
+    "create_style": "styles",
+    "StyleRegistry": "styles",
+    "get_style_registry": "styles",
+    "parse_style_definitions": "styles",
+    "build_document": "builder",
+    "BodyWriter": "builder",
+    "append_blocks": "builder",
+    "iter_markdown_blocks": "markdown",
+    "markdown_blocks": "markdown",
+    "add_protection_info": "protection",
+    "encrypt_file": "protection",
+    "decrypt_file": "protection",
+    "protect_file": "protection",
+    "verify_document_protection": "protection",
+    "encrypt_stream": "encryption",
+    "decrypt_stream": "encryption",
+    "EncryptionKey": "encryption",
+    "is_section_editable": "protection",
+    "create_signature_info": "protection",
+    "verify_signature": "protection",
+    "build_hash_tree": "signatures",
+    "compare_hash_trees": "signatures",
+    "verify_signature_file": "signatures",
+    "verify_directory": "signatures",
+    "add_footnote": "footnotes",
+    "add_endnote": "footnotes",
+    "convert_footnotes_to_endnotes": "footnotes",
+    "add_notes": "footnotes",
+    "get_note_store": "footnotes",
+    "ensure_note_styles": "footnotes",
+    "note_style_ids": "footnotes",
+    "set_note_numbering": "footnotes",
+    "set_cell_border": "tables",
+    "apply_table_style": "tables",
+    "copy_table": "tables",
+    "get_content_blocks": "diff",
+    "diff_content_blocks": "diff",
+    "delete_range": "ranges",
+    "move_range": "ranges",
+    "replace_range": "ranges",
+    "normalize_formatting": "runs",
+    "split_runs_at": "runs",
+    "format_paragraph_spans": "runs",
+    "format_document_spans": "runs",
+    "compile_search_pattern": "runs",
+    "format_pattern_matches": "runs",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
@@ -0,0 +1,674 @@
+"""
+Declarative document builder for Word Document Server.
+
+A document spec is a list of content blocks (headings, paragraphs, lists,
+tables, images and page breaks) with optional metadata and style
+definitions. Instead of adding python-docx paragraphs one call at a time,
+the blocks are rendered straight to WordprocessingML text and streamed into
+the main document part while the package is written, so a long document is
+produced in a single pass with one write. Styles, numbering and the other
+parts come from the python-docx document the body is written into.
+
+Block format (a plain string is a paragraph):
+
+    {"type": "heading", "text": "...", "level": 1}
+    {"type": "paragraph", "text": "...", "style": "...", "alignment": "center",
+     "bold": true, ...}
+    {"type": "paragraph", "runs": [{"text": "...", "italic": true, "link": "https://..."}]}
+    {"type": "list", "items": ["...", {"text": "...", "items": [...]}], "ordered": false,
+     "start": 1}
+    {"type": "table", "rows": [["...", "..."], ...], "header": true, "style": "Table Grid"}
+    {"type": "image", "path": "...", "width": 4.0}
+    {"type": "page_break"}
+
+Run formatting options are those of format_text: bold, italic, underline,
+color, font_size, font_name and highlight.
+
+Each ordered list, and each nested ordered list, is numbered from its own
+start. A paragraph with a numbered list style and "list_start": n begins a
+new list numbered from n; later paragraphs in that style continue it.
+"""
+import io
+import os
+import re
+import zipfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from word_document_server.core.runs import FORMAT_KEYS, normalize_formatting
+
+
+# Bytes of body XML buffered before they are written to the package
+WRITE_BUFFER_SIZE = 256 * 1024
+
+BLOCK_TYPES = ("heading", "paragraph", "list", "table", "image", "page_break")
+
+ALIGNMENTS = {"left": "left", "center": "center", "right": "right", "justify": "both"}
+
+# List styles of the default template, by nesting level
+LIST_STYLES = {
+    False: ("List Bullet", "List Bullet 2", "List Bullet 3"),
+    True: ("List Number", "List Number 2", "List Number 3"),
+}
+
+# Hyperlinks are shown like Word's built-in Hyperlink character style, which
+# the default template does not define
+LINK_COLOR = "0563C1"
+
+_DRAWINGML = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_PICTURE = "http://schemas.openxmlformats.org/drawingml/2006/picture"
+_HYPERLINK_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+# Characters XML 1.0 cannot represent; python-docx rejects them too
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_TEXT_BREAKS = re.compile(r"(\t|\r\n|\n|\r)")
+
+_BODY_MARKER = b"<!--body-->"
+
+
+class BodyWriter:
+    """Renders spec blocks as body XML for one python-docx document."""
+
+    def __init__(self, doc, strict_styles: bool = True):
+        """
+        Args:
+            doc: python-docx Document the body is written into; images and
+                 hyperlinks are added to its package as blocks are rendered
+            strict_styles: If True, a style the document does not have is an
+                           error; otherwise the element keeps the default style
+                           and the name is recorded in missing_styles
+        """
+        from word_document_server.core.styles import get_style_registry
+
+        self._doc = doc
+        self._registry = get_style_registry(doc)
+        self._style_ids: Dict[Tuple[str, str], str] = {}
+        self._run_properties: Dict[Tuple, str] = {}
+        self._drawing_id = _max_drawing_id(doc)
+        self._block_width = doc._block_width
+        self._strict_styles = strict_styles
+        # Relationship ids of the hyperlinks, by URL, and the next free id
+        self._links: Optional[Dict[str, str]] = None
+        self._next_rel = 1
+        # Numbering (numId, ilvl) of the list currently open in each list style
+        self._numbering: Dict[str, Optional[Tuple[str, str]]] = {}
+        self.missing_styles = set()
+        self.counts = {"paragraphs": 0, "tables": 0, "images": 0, "page_breaks": 0}
+
+    def render(self, block: Any, index: int) -> str:
+        """
+        Render one block.
+
+        Args:
+            block: Block dictionary, or a string for a plain paragraph
+            index: Position of the block in the spec, used in error messages
+
+        Returns:
+            XML of the body elements for the block
+
+        Raises:
+            ValueError: If the block is invalid
+        """
+        if isinstance(block, str):
+            block = {"type": "paragraph", "text": block}
+        if not isinstance(block, dict):
+            raise ValueError(f"block {index}: must be a string or a dictionary")
+        block_type = block.get("type")
+        if block_type not in BLOCK_TYPES:
+            raise ValueError(f"block {index}: type must be one of {', '.join(BLOCK_TYPES)}")
+        try:
+            return getattr(self, f"_render_{block_type}")(block)
+        except ValueError as e:
+            raise ValueError(f"block {index} ({block_type}): {e}")
+
+    def _render_heading(self, block: Dict[str, Any]) -> str:
+        try:
+            level = int(block.get("level", 1))
+        except (ValueError, TypeError):
+            raise ValueError("level must be an integer between 0 and 9")
+        if level < 0 or level > 9:
+            raise ValueError("level must be an integer between 0 and 9")
+        # Level 0 is the document title, as in python-docx's add_heading
+        style = "Title" if level == 0 else f"Heading {level}"
+        return self._paragraph(block, style)
+
+    def _render_paragraph(self, block: Dict[str, Any]) -> str:
+        return self._paragraph(block, block.get("style"))
+
+    def _render_list(self, block: Dict[str, Any]) -> str:
+        items = block.get("items")
+        if not isinstance(items, list):
+            raise ValueError("items must be a list")
+        ordered = bool(block.get("ordered", False))
+        start = _list_start(block.get("start", 1), "start") if ordered else None
+        parts = []
+        self._list_items(items, LIST_STYLES[ordered], 0, parts, start)
+        return "".join(parts)
+
+    def _list_items(self, items: List[Any], styles: Tuple[str, ...], depth: int, parts: List[str],
+                    start: Optional[int]) -> None:
+        style = styles[min(depth, len(styles) - 1)]
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                item = {"text": item}
+            if position == 0 and start is not None:
+                item = dict(item, list_start=start)
+            parts.append(self._paragraph(item, item.get("style") or style))
+            if item.get("items"):
+                if not isinstance(item["items"], list):
+                    raise ValueError("items must be a list")
+                # Nested ordered lists restart at 1
+                self._list_items(item["items"], styles, depth + 1, parts, None if start is None else 1)
+
+    def _render_table(self, block: Dict[str, Any]) -> str:
+        rows = block.get("rows")
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, list) for row in rows):
+            raise ValueError("rows must be a non-empty list of lists")
+        cols = max(len(row) for row in rows)
+        if cols == 0:
+            raise ValueError("rows must have at least one cell")
+        header = bool(block.get("header", False))
+
+        parts = ["<w:tbl><w:tblPr>"]
+        style_id = self._style_id(block.get("style", "Table Grid"), "table")
+        if style_id:
+            parts.append(f'<w:tblStyle w:val={quoteattr(style_id)}/>')
+        parts.append('<w:tblW w:type="auto" w:w="0"/><w:tblLook w:firstColumn="1" w:firstRow="1" '
+                     'w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+                     '</w:tblPr><w:tblGrid>')
+        # Same column widths as python-docx's add_table, in twentieths of a point
+        width = self._block_width // cols // 635
+        parts.append(f'<w:gridCol w:w="{width}"/>' * cols)
+        parts.append("</w:tblGrid>")
+
+        cell_start = f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+        for row_idx, row in enumerate(rows):
+            is_header = header and row_idx == 0
+            parts.append("<w:tr><w:trPr><w:tblHeader/></w:trPr>" if is_header else "<w:tr>")
+            for col_idx in range(cols):
+                cell = row[col_idx] if col_idx < len(row) else ""
+                if isinstance(cell, dict):
+                    content = dict(cell)
+                else:
+                    content = {"text": "" if cell is None else str(cell)}
+                if is_header and "bold" not in content:
+                    content["bold"] = True
+                parts.append(cell_start)
+                parts.append(self._paragraph(content, content.get("style"), count=False))
+                parts.append("</w:tc>")
+            parts.append("</w:tr>")
+        parts.append("</w:tbl>")
+        self.counts["tables"] += 1
+        return "".join(parts)
+
+    def _render_image(self, block: Dict[str, Any]) -> str:
+        from docx.shared import Inches
+
+        path = block.get("path")
+        if not path or not isinstance(path, str):
+            raise ValueError("path is required")
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            raise ValueError(f"image file not found: {path}")
+
+        sizes = {}
+        for key in ("width", "height"):
+            if block.get(key) is not None:
+                try:
+                    sizes[key] = Inches(float(block[key]))
+                except (ValueError, TypeError):
+                    raise ValueError(f"{key} must be a number of inches")
+
+        try:
+            rel_id, image = self._doc.part.get_or_add_image(path)
+        except Exception as e:
+            raise ValueError(f"cannot read image {path}: {e}")
+        cx, cy = image.scaled_dimensions(sizes.get("width"), sizes.get("height"))
+
+        self._drawing_id += 1
+        drawing_id = self._drawing_id
+        name = quoteattr(image.filename)
+        self.counts["images"] += 1
+        self.counts["paragraphs"] += 1
+        return (
+            f'<w:p>{self._paragraph_properties(None, block.get("alignment"))}<w:r><w:drawing>'
+            f'<wp:inline distT="0" distB="0" distL="0" distR="0">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/>'
+            f'<wp:docPr id="{drawing_id}" name="Picture {drawing_id}"/>'
+            f'<wp:cNvGraphicFramePr><a:graphicFrameLocks xmlns:a="{_DRAWINGML}" noChangeAspect="1"/>'
+            f'</wp:cNvGraphicFramePr>'
+            f'<a:graphic xmlns:a="{_DRAWINGML}"><a:graphicData uri="{_PICTURE}">'
+            f'<pic:pic xmlns:pic="{_PICTURE}"><pic:nvPicPr><pic:cNvPr id="0" name={name}/>'
+            f'<pic:cNvPicPr/></pic:nvPicPr><pic:blipFill><a:blip r:embed="{rel_id}"/>'
+            f'<a:stretch><a:fillRect/></a:stretch></pic:blipFill><pic:spPr><a:xfrm>'
+            f'<a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"/></pic:spPr></pic:pic></a:graphicData></a:graphic>'
+            f'</wp:inline></w:drawing></w:r></w:p>'
+        )
+
+    def _render_page_break(self, block: Dict[str, Any]) -> str:
+        self.counts["page_breaks"] += 1
+        return '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+    def _paragraph(self, block: Dict[str, Any], style: Optional[str], count: bool = True) -> str:
+        """Render a paragraph from text or runs, with block-level formatting."""
+        formatting = {key: block[key] for key in FORMAT_KEYS if block.get(key) is not None}
+        runs = block.get("runs")
+        if runs is None:
+            text = block.get("text", "")
+            runs = [{"text": "" if text is None else str(text)}]
+        elif not isinstance(runs, list):
+            raise ValueError("runs must be a list")
+
+        parts = ["<w:p>", self._paragraph_properties(style, block.get("alignment"), block.get("list_start"))]
+        for run in runs:
+            if isinstance(run, str):
+                run = {"text": run}
+            elif not isinstance(run, dict):
+                raise ValueError("each run must be a string or a dictionary")
+            run_formatting = dict(formatting)
+            run_formatting.update((key, run[key]) for key in FORMAT_KEYS if run.get(key) is not None)
+            link = run.get("link")
+            if link:
+                run_formatting.setdefault("color", LINK_COLOR)
+                run_formatting.setdefault("underline", True)
+            xml = self._run(str(run.get("text", "")), run_formatting)
+            if link:
+                xml = f'<w:hyperlink r:id="{self._hyperlink_id(str(link))}">{xml}</w:hyperlink>'
+            parts.append(xml)
+        parts.append("</w:p>")
+        if count:
+            self.counts["paragraphs"] += 1
+        return "".join(parts)
+
+    def _hyperlink_id(self, url: str) -> str:
+        """
+        Relationship id of a hyperlink, shared by all links to the same URL.
+
+        python-docx's relate_to() scans every relationship of the part for a
+        match and a free id, which is quadratic over thousands of links.
+        """
+        rels = self._doc.part.rels
+        if self._links is None:
+            self._links = {rel.target_ref: rel.rId for rel in rels.values()
+                           if rel.is_external and rel.reltype == _HYPERLINK_RELTYPE}
+        rel_id = self._links.get(url)
+        if rel_id is None:
+            while f"rId{self._next_rel}" in rels:
+                self._next_rel += 1
+            rel_id = f"rId{self._next_rel}"
+            rels.add_relationship(_HYPERLINK_RELTYPE, url, rel_id, is_external=True)
+            self._links[url] = rel_id
+        return rel_id
+
+    def _paragraph_properties(self, style: Optional[str], alignment: Optional[str],
+                              list_start: Optional[Any] = None) -> str:
+        style_id = self._style_id(style, "paragraph")
+        numbering = self._list_numbering(style_id, list_start) if style_id else None
+        if not style_id and not alignment:
+            return ""
+        parts = ["<w:pPr>"]
+        if style_id:
+            parts.append(f'<w:pStyle w:val={quoteattr(style_id)}/>')
+        if numbering:
+            num_id, ilvl = numbering
+            parts.append(f'<w:numPr><w:ilvl w:val="{ilvl}"/><w:numId w:val="{num_id}"/></w:numPr>')
+        if alignment:
+            value = ALIGNMENTS.get(str(alignment).lower())
+            if value is None:
+                raise ValueError(f"alignment must be one of {', '.join(ALIGNMENTS)}")
+            parts.append(f'<w:jc w:val="{value}"/>')
+        parts.append("</w:pPr>")
+        return "".join(parts)
+
+    def _list_numbering(self, style_id: str, list_start: Optional[Any]) -> Optional[Tuple[str, str]]:
+        """
+        Numbering of a paragraph in a list style.
+
+        The list styles share one numbering instance each, so every list
+        would continue the previous one; a paragraph starting a list gets a
+        new w:num restarting the style's level, which later paragraphs in
+        the style reuse.
+
+        Returns:
+            (numId, ilvl), or None to keep the style's own numbering
+        """
+        if list_start is None:
+            return self._numbering.get(style_id)
+        start = _list_start(list_start, "list_start")
+
+        numbering = None
+        style = self._registry.get_by_id(style_id)
+        # Follow basedOn for styles that inherit their numbering
+        for _ in range(10):
+            if style is None:
+                break
+            pPr = style.element.pPr
+            num_pr = pPr.numPr if pPr is not None else None
+            if num_pr is not None and num_pr.numId is not None:
+                numbering_root = self._doc.part.numbering_part.element
+                num = numbering_root.num_having_numId(num_pr.numId.val)
+                ilvl = num_pr.ilvl.val if num_pr.ilvl is not None else 0
+                new_num = numbering_root.add_num(num.abstractNumId.val)
+                new_num.add_lvlOverride(ilvl=ilvl).add_startOverride(start)
+                numbering = (str(new_num.numId), str(ilvl))
+                break
+            style = style.base_style
+        self._numbering[style_id] = numbering
+        return numbering
+
+    def _run(self, text: str, formatting: Dict[str, Any]) -> str:
+        """Render a run, with tabs and line breaks as python-docx writes them."""
+        properties = self._run_properties_xml(formatting) if formatting else ""
+        parts = ["<w:r>", properties]
+        for piece in _TEXT_BREAKS.split(_INVALID_XML_CHARS.sub("", text)):
+            if not piece:
+                continue
+            if piece == "\t":
+                parts.append("<w:tab/>")
+            elif piece in ("\n", "\r", "\r\n"):
+                parts.append("<w:br/>")
+            else:
+                space = ' xml:space="preserve"' if piece[0].isspace() or piece[-1].isspace() else ""
+                parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+        parts.append("</w:r>")
+        return "".join(parts)
+
+    def _run_properties_xml(self, formatting: Dict[str, Any]) -> str:
+        key = tuple(sorted((name, str(value)) for name, value in formatting.items()))
+        xml = self._run_properties.get(key)
+        if xml is not None:
+            return xml
+
+        values = normalize_formatting(formatting)
+        # Children in the order the schema requires
+        parts = ["<w:rPr>"]
+        if "font_name" in values:
+            name = quoteattr(values["font_name"])
+            parts.append(f"<w:rFonts w:ascii={name} w:hAnsi={name}/>")
+        for name, tag in (("bold", "b"), ("italic", "i")):
+            if name in values:
+                parts.append(f"<w:{tag}/>" if values[name] else f'<w:{tag} w:val="0"/>')
+        if "color" in values:
+            parts.append(f'<w:color w:val="{values["color"]}"/>')
+        if "font_size" in values:
+            parts.append(f'<w:sz w:val="{round(values["font_size"].pt * 2)}"/>')
+        if "highlight" in values:
+            parts.append(f'<w:highlight w:val="{values["highlight"].xml_value}"/>')
+        if "underline" in values:
+            parts.append(f'<w:u w:val="{"single" if values["underline"] else "none"}"/>')
+        parts.append("</w:rPr>")
+        xml = self._run_properties[key] = "".join(parts)
+        return xml
+
+    def _style_id(self, name: Optional[str], kind: str) -> Optional[str]:
+        if not name:
+            return None
+        if (name, kind) in self._style_ids:
+            return self._style_ids[(name, kind)]
+        style = self._registry.get(str(name))
+        if style is None:
+            if self._strict_styles:
+                raise ValueError(f"{kind} style '{name}' not found")
+            self.missing_styles.add(str(name))
+        style_id = self._style_ids[(name, kind)] = style.style_id if style is not None else None
+        return style_id
+
+
+def _list_start(value: Any, name: str) -> int:
+    """Validate the number a list starts at."""
+    try:
+        start = int(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"{name} must be a non-negative integer")
+    if start < 0:
+        raise ValueError(f"{name} must be a non-negative integer")
+    return start
+
+
+def _max_drawing_id(doc) -> int:
+    """Highest drawing object id already used in the document body."""
+    ids = doc.element.body.xpath("//wp:docPr/@id")
+    return max((int(value) for value in ids if value.isdigit()), default=0)
+
+
+def split_document_xml(doc) -> Tuple[bytes, bytes]:
+    """
+    Serialize the main document part around the point where new body
+    content goes: after the last block, before the final section properties.
+
+    Args:
+        doc: python-docx Document
+
+    Returns:
+        Tuple of (head, tail) bytes
+    """
+    from lxml import etree
+    from docx.opc.oxml import serialize_part_xml
+
+    body = doc.element.body
+    marker = etree.Comment("body")
+    sectPr = body.sectPr
+    if sectPr is not None:
+        sectPr.addprevious(marker)
+    else:
+        body.append(marker)
+    try:
+        xml = serialize_part_xml(doc.element)
+    finally:
+        body.remove(marker)
+    head, tail = xml.split(_BODY_MARKER, 1)
+    return head, tail
+
+
+def write_document_package(doc, outfile, write_body: Callable[[Callable[[bytes], None]], None]) -> None:
+    """
+    Write a document's package, streaming new body content into the main
+    document part.
+
+    The body content is written before the other parts, so images,
+    hyperlinks and list numbering it adds to the package are included.
+
+    Args:
+        doc: python-docx Document
+        outfile: Binary file object to write the package to
+        write_body: Function called with a write function, which it calls
+                    with chunks of body XML to append to the document
+    """
+    from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+    # python-docx has no public API for the content types item
+    from docx.opc.pkgwriter import _ContentTypesItem
+
+    head, tail = split_document_xml(doc)
+    document_part = doc.part
+    with zipfile.ZipFile(outfile, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        # The body goes first: images, hyperlinks and numbering added while
+        # rendering it must be in the parts and relationships written after it
+        with zip_file.open(document_part.partname.membername, "w") as stream:
+            stream.write(head)
+            write_body(stream.write)
+            stream.write(tail)
+
+        package = document_part.package
+        parts = list(package.iter_parts())
+        zip_file.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        zip_file.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            if part is not document_part:
+                zip_file.writestr(part.partname.membername, part.blob)
+            if len(part.rels):
+                zip_file.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+
+def stream_blocks(writer: BodyWriter, blocks: Iterable[Any], write: Callable[[bytes], None]) -> None:
+    """
+    Render blocks and write their XML in buffered chunks.
+
+    Args:
+        writer: BodyWriter
+        blocks: Spec blocks
+        write: Function taking a chunk of UTF-8 XML
+    """
+    pending: List[str] = []
+    size = 0
+    for index, block in enumerate(blocks):
+        xml = writer.render(block, index)
+        pending.append(xml)
+        size += len(xml)
+        if size >= WRITE_BUFFER_SIZE:
+            write("".join(pending).encode("utf-8"))
+            pending, size = [], 0
+    if pending:
+        write("".join(pending).encode("utf-8"))
+
+
+def save_package(path: str, write: Callable[[Any], None]) -> None:
+    """
+    Write a package to a path atomically, journaling the edit when it
+    replaces an existing document.
+
+    Args:
+        path: Destination path
+        write: Function that writes the package to a binary file object
+    """
+    from word_document_server.core.protection import replace_file_atomically
+    from word_document_server.utils.edit_journal import get_edit_journal
+    from word_document_server.utils.metrics import get_current_tool
+
+    journal = get_edit_journal()
+    if journal.enabled and os.path.exists(path):
+        buffer = io.BytesIO()
+        write(buffer)
+        journal.save_package(buffer.getvalue(), path, label=get_current_tool())
+    else:
+        replace_file_atomically(path, write)
+
+
+def parse_spec(spec: Any) -> Dict[str, Any]:
+    """
+    Validate the top level of a document spec.
+
+    Args:
+        spec: List of blocks, a dictionary with 'blocks' and optional 'title',
+              'author' and 'styles' (definitions as for create_styles), or
+              either of these as a JSON string
+
+    Returns:
+        Dictionary with blocks, title, author and styles
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    import json
+
+    if isinstance(spec, str):
+        try:
+            spec = json.loads(spec)
+        except ValueError as e:
+            raise ValueError(f"spec is not valid JSON: {e}")
+    if isinstance(spec, list):
+        spec = {"blocks": spec}
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be a list of blocks or a dictionary with blocks")
+    unknown = sorted(set(spec) - {"blocks", "title", "author", "styles"})
+    if unknown:
+        raise ValueError(f"unknown spec key(s): {', '.join(unknown)}")
+    blocks = spec.get("blocks")
+    if not isinstance(blocks, list):
+        raise ValueError("blocks must be a list")
+    styles = spec.get("styles") or []
+    if not isinstance(styles, list):
+        raise ValueError("styles must be a list")
+    return {"blocks": blocks, "title": spec.get("title"), "author": spec.get("author"), "styles": styles}
+
+
+def build_document(path: str, spec: Any) -> Dict[str, Any]:
+    """
+    Create a document from a spec in one pass.
+
+    Args:
+        path: Path of the document to create or replace
+        spec: Document spec (see parse_spec)
+
+    Returns:
+        Counts of the paragraphs, tables, images and page breaks written
+
+    Raises:
+        ValueError: If the spec or one of its blocks is invalid; nothing is written
+    """
+    from docx import Document
+    from word_document_server.core.styles import (
+        create_style, ensure_heading_style, ensure_table_style, get_style_registry,
+        parse_style_definitions
+    )
+
+    spec = parse_spec(spec)
+    definitions = parse_style_definitions(spec["styles"])
+
+    doc = Document()
+    if spec["title"]:
+        doc.core_properties.title = str(spec["title"])
+    if spec["author"]:
+        doc.core_properties.author = str(spec["author"])
+    ensure_heading_style(doc)
+    ensure_table_style(doc)
+
+    registry = get_style_registry(doc)
+    for style_name, style_type, base_style, font_properties in definitions:
+        if style_name in registry:
+            continue
+        if base_style and base_style not in registry:
+            raise ValueError(f"style '{style_name}': base style '{base_style}' not found")
+        create_style(doc, style_name, style_type, base_style=base_style, font_properties=font_properties)
+
+    writer = BodyWriter(doc)
+    save_package(path, lambda outfile: write_document_package(
+        doc, outfile, lambda write: stream_blocks(writer, spec["blocks"], write)
+    ))
+    return dict(writer.counts)
+
+
+def append_blocks(path: str, blocks: Iterable[Any], strict_styles: bool = True) -> Dict[str, Any]:
+    """
+    Append blocks to the end of an existing document in one pass.
+
+    The existing body is written out unchanged, followed by the rendered
+    blocks, in a single write of the package. Blocks are consumed lazily, so
+    a generator keeps memory bounded however much content it produces.
+
+    Args:
+        path: Path to the document
+        blocks: Spec blocks
+        strict_styles: If False, styles the document lacks are skipped instead
+                       of failing the whole append
+
+    Returns:
+        Counts of the paragraphs, tables, images and page breaks written, and
+        'missing_styles', the style names that were not found
+
+    Raises:
+        ValueError: If a block is invalid; nothing is written
+    """
+    from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+    from word_document_server.utils.document_cache import load_document
+    from word_document_server.utils.protected_sessions import get_session
+
+    session = get_session(path)
+    doc = load_document(path, for_update=True)
+    ensure_heading_style(doc)
+    ensure_table_style(doc)
+    writer = BodyWriter(doc, strict_styles=strict_styles)
+
+    def write(outfile):
+        write_document_package(doc, outfile, lambda chunk: stream_blocks(writer, blocks, chunk))
+
+    if session is not None:
+        buffer = io.BytesIO()
+        write(buffer)
+        session.store_package(buffer.getvalue())
+    else:
+        save_package(path, write)
+
+    result: Dict[str, Any] = dict(writer.counts)
+    result["missing_styles"] = sorted(writer.missing_styles)
+    return result
@@ -0,0 +1,659 @@
+"""
+PDF conversion functionality for Word Document Server.
+
+Conversion goes through a small pool of LibreOffice workers. Each worker has
+its own user profile so several instances can run side by side. Workers keep
+a headless LibreOffice running between conversions, so only the first
+conversion pays the start-up cost: over UNO when the LibreOffice Python bridge
+(``uno``) is importable in this process, or through a ``unoserver`` listener
+driven by ``unoconvert`` when those are on the PATH (``pip install unoserver``
+with the Python that ships with LibreOffice). Without either, each worker
+converts a whole batch of documents in a single ``--convert-to`` run, reusing
+its already initialized profile, and a warning is logged.
+
+Converted PDFs are kept in an on-disk cache keyed by the SHA-256 of the
+input document, so converting an unchanged document again is a file copy.
+"""
+import os
+import time
+import queue
+import shutil
+import socket
+import atexit
+import logging
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Any
+
+from word_document_server.utils.batch_utils import hash_file
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds allowed per document before a conversion is considered hung
+DEFAULT_TIMEOUT = 60
+
+# Seconds to wait for a listening soffice process to accept connections
+STARTUP_TIMEOUT = 30
+
+# Worker modes, in order of preference
+MODE_UNO = "uno"
+MODE_UNOSERVER = "unoserver"
+MODE_BATCH = "batch"
+
+DEFAULT_POOL_SIZE = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "word_mcp_server", "pdf")
+DEFAULT_CACHE_MB = 512
+
+
+def find_libreoffice() -> Optional[str]:
+    """
+    Find the LibreOffice executable.
+
+    Returns:
+        Path to soffice/libreoffice, or None if LibreOffice is not installed
+    """
+    if platform.system() == "Darwin":
+        candidates = ["soffice", "/Applications/LibreOffice.app/Contents/MacOS/soffice"]
+    else:
+        candidates = ["libreoffice", "soffice"]
+
+    for candidate in candidates:
+        path = shutil.which(candidate)
+        if path:
+            return path
+    return None
+
+
+def uno_available() -> bool:
+    """Check whether the LibreOffice Python bridge can be imported."""
+    try:
+        import uno
+        return True
+    except ImportError:
+        return False
+
+
+def find_unoserver() -> Optional[Tuple[str, str]]:
+    """
+    Find the unoserver listener and its unoconvert client.
+
+    Returns:
+        Paths to unoserver and unoconvert, or None if either is missing
+    """
+    server = shutil.which("unoserver")
+    client = shutil.which("unoconvert")
+    if server and client:
+        return server, client
+    return None
+
+
+def detect_worker_mode() -> str:
+    """
+    Choose how workers talk to LibreOffice.
+
+    Returns:
+        MODE_UNO, MODE_UNOSERVER or MODE_BATCH
+    """
+    if uno_available():
+        return MODE_UNO
+    if find_unoserver():
+        return MODE_UNOSERVER
+    return MODE_BATCH
+
+
+class LibreOfficeWorker:
+    """
+    A LibreOffice instance with an isolated user profile.
+
+    In the listener modes the soffice process is started once and kept
+    running; documents are converted over UNO (MODE_UNO) or by unoconvert
+    calls to a unoserver listener (MODE_UNOSERVER). In batch mode every call
+    to convert() runs one ``--convert-to`` process for all given documents.
+    """
+
+    def __init__(self, command: str, mode: str, timeout: int = DEFAULT_TIMEOUT):
+        self.command = command
+        self.mode = mode
+        self.timeout = timeout
+        self.profile_dir = tempfile.mkdtemp(prefix="word_mcp_lo_profile_")
+        self._process = None
+        self._desktop = None
+        self._port = None
+        self._unoconvert = None
+
+    @property
+    def profile_url(self) -> str:
+        return "file://" + self.profile_dir.replace(os.sep, "/")
+
+    def convert(self, jobs: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+        """
+        Convert documents to PDF.
+
+        Args:
+            jobs: List of (source_path, output_path) tuples
+
+        Returns:
+            Dictionary mapping each source path to None on success or an error message
+        """
+        if self.mode == MODE_UNO:
+            return {source: self._convert_uno(source, output) for source, output in jobs}
+        if self.mode == MODE_UNOSERVER:
+            return {source: self._convert_unoserver(source, output) for source, output in jobs}
+        return self._convert_batch(jobs)
+
+    def close(self) -> None:
+        """Stop the soffice process and remove the profile directory."""
+        if self._desktop is not None:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                pass
+            self._desktop = None
+        if self._process is not None:
+            if self.mode == MODE_UNOSERVER:
+                self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _convert_uno(self, source: str, output: str) -> Optional[str]:
+        """Convert one document through the listening soffice process."""
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        for attempt in range(2):
+            timed_out = threading.Event()
+            watchdog = None
+            try:
+                desktop = self._get_desktop()
+
+                # UNO calls block until soffice answers, so a hung conversion
+                # is ended by killing the listener, which fails the call
+                def expire(process=self._process):
+                    timed_out.set()
+                    process.kill()
+
+                watchdog = threading.Timer(self.timeout, expire)
+                watchdog.daemon = True
+                watchdog.start()
+                document = desktop.loadComponentFromURL(
+                    uno.systemPathToFileUrl(os.path.abspath(source)), "_blank", 0,
+                    (prop("Hidden", True), prop("ReadOnly", True))
+                )
+                if document is None:
+                    return f"LibreOffice could not open {source}"
+                try:
+                    document.storeToURL(
+                        uno.systemPathToFileUrl(os.path.abspath(output)),
+                        (prop("FilterName", "writer_pdf_Export"),)
+                    )
+                finally:
+                    document.close(True)
+                return None
+            except Exception as e:
+                # The listener may have died; restart it once before giving up,
+                # unless the document itself hung it
+                self._stop_listener()
+                if timed_out.is_set():
+                    return f"LibreOffice conversion timed out after {self.timeout} seconds"
+                if attempt == 1:
+                    return f"LibreOffice conversion failed: {str(e)}"
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+        return None
+
+    def _get_desktop(self):
+        """Start the listening soffice process if needed and return its Desktop."""
+        if self._desktop is not None and self._process is not None and self._process.poll() is None:
+            return self._desktop
+
+        import uno
+
+        self._stop_listener()
+        self._port = _get_free_port()
+        self._process = subprocess.Popen(
+            [
+                self.command, "--headless", "--invisible", "--nologo", "--nodefault",
+                "--norestore", "--nolockcheck",
+                f"-env:UserInstallation={self.profile_url}",
+                f"--accept=socket,host=127.0.0.1,port={self._port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self._port};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self._stop_listener()
+                    raise RuntimeError("LibreOffice listener did not start")
+                time.sleep(0.2)
+
+        self._desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+        return self._desktop
+
+    def _convert_unoserver(self, source: str, output: str) -> Optional[str]:
+        """Convert one document through the unoserver listener."""
+        for attempt in range(2):
+            try:
+                port = self._start_unoserver()
+                result = subprocess.run(
+                    [self._unoconvert, "--host", "127.0.0.1", "--port", str(port), "--convert-to", "pdf",
+                     os.path.abspath(source), os.path.abspath(output)],
+                    capture_output=True, text=True, timeout=self.timeout
+                )
+            except subprocess.TimeoutExpired:
+                # The listener may be stuck on the document; start a fresh one next time
+                self._stop_listener()
+                return f"LibreOffice conversion timed out after {self.timeout} seconds"
+            except (RuntimeError, OSError) as e:
+                return f"LibreOffice conversion failed: {str(e)}"
+            if result.returncode == 0 and os.path.exists(output):
+                return None
+            if self._process.poll() is None:
+                return f"LibreOffice could not convert {source}: {result.stderr.strip()}"
+            # The listener died; restart it once before giving up
+            self._stop_listener()
+            if attempt == 1:
+                return f"LibreOffice conversion failed: {result.stderr.strip()}"
+        return None
+
+    def _start_unoserver(self) -> int:
+        """Start the unoserver listener if needed and return its port."""
+        if self._process is not None and self._process.poll() is None:
+            return self._port
+
+        self._stop_listener()
+        server, self._unoconvert = find_unoserver() or ("unoserver", "unoconvert")
+        self._port = _get_free_port()
+        self._process = subprocess.Popen(
+            [
+                server, "--interface", "127.0.0.1", "--port", str(self._port),
+                "--uno-port", str(_get_free_port()), "--executable", self.command,
+                "--user-installation", self.profile_dir,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self._port), timeout=1).close()
+                return self._port
+            except OSError:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    self._stop_listener()
+                    raise RuntimeError("unoserver listener did not start")
+                time.sleep(0.2)
+
+    def _stop_listener(self) -> None:
+        """Terminate the listening soffice process, keeping the profile."""
+        self._desktop = None
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+            self._process = None
+
+    def _convert_batch(self, jobs: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+        """Convert documents with one --convert-to run per group of unique file names."""
+        results = {}
+        remaining = list(jobs)
+        while remaining:
+            # LibreOffice names outputs after the input file, so a run can
+            # only contain inputs with distinct base names
+            group, names, deferred = [], set(), []
+            for source, output in remaining:
+                name = os.path.splitext(os.path.basename(source))[0]
+                if name in names:
+                    deferred.append((source, output))
+                else:
+                    names.add(name)
+                    group.append((source, output))
+            remaining = deferred
+
+            out_dir = tempfile.mkdtemp(prefix="word_mcp_pdf_")
+            try:
+                cmd = [
+                    self.command, "--headless", "--norestore", "--nolockcheck",
+                    f"-env:UserInstallation={self.profile_url}",
+                    "--convert-to", "pdf", "--outdir", out_dir,
+                ] + [source for source, _ in group]
+                try:
+                    result = subprocess.run(cmd, capture_output=True, text=True,
+                                            timeout=self.timeout * len(group))
+                    error = None if result.returncode == 0 else f"{os.path.basename(self.command)} error: {result.stderr}"
+                except (subprocess.SubprocessError, OSError) as e:
+                    error = f"{os.path.basename(self.command)} error: {str(e)}"
+
+                for source, output in group:
+                    created = os.path.join(out_dir, os.path.splitext(os.path.basename(source))[0] + ".pdf")
+                    if os.path.exists(created):
+                        shutil.move(created, output)
+                        results[source] = None
+                    else:
+                        results[source] = error or f"LibreOffice did not produce a PDF for {source}"
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+        return results
+
+
+class PdfCache:
+    """
+    A size-bounded cache of converted PDFs keyed by the input's SHA-256.
+
+    Entries are plain files named ``<sha256>.pdf`` in the cache directory.
+    Their modification time records the last use, and the least recently
+    used entries are evicted once the total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Tuple[float, int]]] = None
+        self._total = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def fetch(self, digest: str, output: str) -> bool:
+        """
+        Copy the cached PDF for a document hash to the output path.
+
+        Args:
+            digest: SHA-256 of the input document
+            output: Path to write the PDF to
+
+        Returns:
+            True on a cache hit, False otherwise
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._load()
+            if digest not in self._entries:
+                return False
+            path = self._path(digest)
+            try:
+                shutil.copyfile(path, output)
+                os.utime(path)
+            except OSError:
+                self._forget(digest)
+                return False
+            self._entries[digest] = (time.time(), self._entries[digest][1])
+            return True
+
+    def store(self, digest: str, pdf_path: str) -> None:
+        """
+        Add a converted PDF to the cache, evicting old entries if needed.
+
+        Args:
+            digest: SHA-256 of the input document
+            pdf_path: Path of the converted PDF
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()
+            try:
+                size = os.path.getsize(pdf_path)
+                if size > self.max_bytes:
+                    return
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = self._path(digest) + ".tmp"
+                shutil.copyfile(pdf_path, temp_path)
+                os.replace(temp_path, self._path(digest))
+            except OSError:
+                return
+
+            self._forget(digest, remove=False)
+            self._entries[digest] = (time.time(), size)
+            self._total += size
+            self._evict()
+
+    def _load(self) -> None:
+        """Index the cache directory on first use."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._total = 0
+        if not os.path.isdir(self.directory):
+            return
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    self._entries[entry.name[:-4]] = (stat.st_mtime, stat.st_size)
+                    self._total += stat.st_size
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits."""
+        if self._total <= self.max_bytes:
+            return
+        for digest, _ in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if self._total <= self.max_bytes:
+                break
+            self._forget(digest)
+
+    def _forget(self, digest: str, remove: bool = True) -> None:
+        """Drop an entry from the index, and optionally its file."""
+        entry = self._entries.pop(digest, None)
+        if entry:
+            self._total -= entry[1]
+        if remove:
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.pdf")
+
+
+class ConversionPool:
+    """
+    A bounded pool of LibreOffice workers shared by all conversion requests.
+
+    Workers are created lazily, up to ``size``. Callers block until a worker
+    is free, which caps the number of concurrent soffice processes. Documents
+    found in the PDF cache are not converted at all.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, timeout: int = DEFAULT_TIMEOUT,
+                 cache: Optional[PdfCache] = None):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cache = cache or PdfCache(DEFAULT_CACHE_DIR, 0)
+        self._command = None
+        self._mode = None
+        self._idle = queue.Queue()
+        self._workers: List[LibreOfficeWorker] = []
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether LibreOffice is installed."""
+        if self._command is None:
+            self._command = find_libreoffice() or ""
+            self._mode = detect_worker_mode()
+            if self._command and self._mode == MODE_BATCH:
+                logger.warning(
+                    "Neither the LibreOffice Python bridge (uno) nor unoserver/unoconvert is available; "
+                    "PDF conversion starts LibreOffice for every batch instead of keeping warm workers"
+                )
+        return bool(self._command)
+
+    @property
+    def mode(self) -> Optional[str]:
+        """How workers talk to LibreOffice, or None if LibreOffice is not installed."""
+        return self._mode if self.available else None
+
+    def convert_documents(self, jobs: List[Tuple[str, str]],
+                          digests: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Convert documents to PDF using the worker pool.
+
+        Args:
+            jobs: List of (source_path, output_path) tuples
+            digests: SHA-256 of each source, if the caller already computed them
+
+        Returns:
+            List of result dictionaries (source, output, success, cached, error) in input order
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+        pending: Dict[str, List[Tuple[int, str, str]]] = {}
+        for i, (source, output) in enumerate(jobs):
+            digest = digests[i] if digests else hash_file(source)
+            if digest not in pending and self.cache.fetch(digest, output):
+                results[i] = {"source": source, "output": output, "success": True, "cached": True, "error": None}
+            else:
+                # Identical inputs in the same request are converted once
+                pending.setdefault(digest, []).append((i, source, output))
+
+        if pending and not self.available:
+            for entries in pending.values():
+                for i, source, output in entries:
+                    results[i] = {"source": source, "output": output, "success": False, "cached": False,
+                                  "error": "LibreOffice is not installed"}
+            pending = {}
+
+        unique = [(digest, entries[0]) for digest, entries in pending.items()]
+        if unique:
+            worker_count = min(self.size, len(unique))
+            groups = [unique[k::worker_count] for k in range(worker_count)]
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                for group, errors in zip(groups, executor.map(self._run_group, groups)):
+                    for digest, (i, source, output) in group:
+                        error = errors.get(source)
+                        if error is None:
+                            self.cache.store(digest, output)
+                        results[i] = {"source": source, "output": output, "success": error is None,
+                                      "cached": False, "error": error}
+                        for j, dup_source, dup_output in pending[digest][1:]:
+                            if error is None and os.path.abspath(dup_output) != os.path.abspath(output):
+                                shutil.copyfile(output, dup_output)
+                            results[j] = {"source": dup_source, "output": dup_output, "success": error is None,
+                                          "cached": error is None, "error": error}
+
+        return [results[i] for i in range(len(jobs))]
+
+    def shutdown(self) -> None:
+        """Stop all workers."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.close()
+
+    def _run_group(self, group) -> Dict[str, Optional[str]]:
+        """Convert a group of documents on one worker."""
+        worker = self._acquire()
+        try:
+            return worker.convert([(source, output) for _, (_, source, output) in group])
+        finally:
+            self._idle.put(worker)
+
+    def _acquire(self) -> LibreOfficeWorker:
+        """Take an idle worker, starting a new one if the pool is not full."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = LibreOfficeWorker(self._command, self._mode, self.timeout)
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+
+_pool: Optional[ConversionPool] = None
+_cache: Optional[PdfCache] = None
+_pool_lock = threading.RLock()
+
+
+def get_conversion_pool() -> ConversionPool:
+    """
+    Get the process-wide conversion pool.
+
+    The pool size can be set with the WORD_MCP_PDF_WORKERS environment variable.
+
+    Returns:
+        The shared ConversionPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            size = _get_int_env("WORD_MCP_PDF_WORKERS", DEFAULT_POOL_SIZE)
+            _pool = ConversionPool(size, cache=get_pdf_cache())
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def get_pdf_cache() -> PdfCache:
+    """
+    Get the process-wide PDF cache.
+
+    The cache directory and size limit can be set with the
+    WORD_MCP_PDF_CACHE_DIR and WORD_MCP_PDF_CACHE_MB environment variables;
+    a size of 0 disables the cache.
+
+    Returns:
+        The shared PdfCache
+    """
+    global _cache
+    with _pool_lock:
+        if _cache is None:
+            directory = os.environ.get("WORD_MCP_PDF_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_mb = _get_int_env("WORD_MCP_PDF_CACHE_MB", DEFAULT_CACHE_MB)
+            _cache = PdfCache(directory, max(0, max_mb) * 1024 * 1024)
+        return _cache
+
+
+def _get_int_env(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _get_free_port() -> int:
+    """Ask the OS for a free local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,116 @@
+"""
+Document comparison functionality for Word Document Server.
+"""
+import hashlib
+from difflib import SequenceMatcher
+from typing import Dict, List, Any
+
+from word_document_server.utils.xml_utils import (
+    W_P, W_TBL, get_paragraph_element_text, get_cell_element_text, iter_table_cells
+)
+
+
+def get_content_blocks(doc) -> List[Dict[str, Any]]:
+    """
+    Collect the comparable content blocks of a document in body order.
+
+    Body paragraphs and table cells each form one block. Paragraph and table
+    indices match ``doc.paragraphs`` and ``doc.tables``.
+
+    Args:
+        doc: Document object
+
+    Returns:
+        List of blocks, each with a location, its text and a content hash
+    """
+    blocks = []
+    paragraph_index = 0
+    table_index = 0
+
+    for element in doc.element.body.iterchildren(W_P, W_TBL):
+        if element.tag == W_P:
+            text = get_paragraph_element_text(element)
+            blocks.append({
+                "paragraph_index": paragraph_index,
+                "text": text,
+                "hash": _hash_block("p", text)
+            })
+            paragraph_index += 1
+        else:
+            # Cells are keyed by table and column so that repeated values
+            # (typically empty cells) still line up with their own column
+            for row_idx, col_idx, tc in iter_table_cells(element):
+                text = get_cell_element_text(tc)
+                blocks.append({
+                    "location": f"Table {table_index}, Row {row_idx}, Column {col_idx}",
+                    "text": text,
+                    "hash": _hash_block(f"t{table_index}c{col_idx}", text)
+                })
+            table_index += 1
+
+    return blocks
+
+
+def diff_content_blocks(original_blocks: List[Dict[str, Any]],
+                        revised_blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compute change hunks between two lists of content blocks.
+
+    Blocks are compared by hash only. The common prefix and suffix are
+    stripped before running the sequence matcher, so documents that differ
+    in a few places are compared in linear time.
+
+    Args:
+        original_blocks: Blocks from get_content_blocks() for the original document
+        revised_blocks: Blocks from get_content_blocks() for the revised document
+
+    Returns:
+        List of hunks with the changed block ranges and their content
+    """
+    original_hashes = [block["hash"] for block in original_blocks]
+    revised_hashes = [block["hash"] for block in revised_blocks]
+
+    # Strip the unchanged head and tail
+    prefix = 0
+    max_prefix = min(len(original_hashes), len(revised_hashes))
+    while prefix < max_prefix and original_hashes[prefix] == revised_hashes[prefix]:
+        prefix += 1
+
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while (suffix < max_suffix and
+           original_hashes[-1 - suffix] == revised_hashes[-1 - suffix]):
+        suffix += 1
+
+    original_middle = original_hashes[prefix:len(original_hashes) - suffix]
+    revised_middle = revised_hashes[prefix:len(revised_hashes) - suffix]
+
+    hunks = []
+    if not original_middle and not revised_middle:
+        return hunks
+
+    matcher = SequenceMatcher(None, original_middle, revised_middle, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+
+        i1, i2, j1, j2 = i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix
+        hunks.append({
+            "type": tag,
+            "original_range": [i1, i2],
+            "revised_range": [j1, j2],
+            "removed": [_describe_block(block) for block in original_blocks[i1:i2]],
+            "added": [_describe_block(block) for block in revised_blocks[j1:j2]]
+        })
+
+    return hunks
+
+
+def _hash_block(kind: str, text: str) -> bytes:
+    """Hash a block's kind and text into a short digest."""
+    return hashlib.blake2b(f"{kind}\x00{text}".encode(), digest_size=16).digest()
+
+
+def _describe_block(block: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip internal fields from a block for output."""
+    return {key: value for key, value in block.items() if key != "hash"}
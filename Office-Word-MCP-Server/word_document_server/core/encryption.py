@@ -0,0 +1,122 @@
+"""
+Password encryption for Word Document Server.
+
+ECMA-376 agile encryption derives the key that protects a document from the
+password with 100,000 hash iterations, which costs far more than encrypting
+or decrypting a typical document. Every newly protected document gets its
+own password salt and data key. Decrypting an agile document returns its
+key, so an editing session can encrypt the document again on save without
+deriving the key a second time; the session holds that key and wipes it
+when it is closed. Keys are never cached process-wide or written to disk.
+"""
+import os
+import copy
+from typing import Any, BinaryIO, Optional
+
+
+# Key encryptor parameters msoffcrypto writes; files using others are decrypted
+# normally but re-encrypted with freshly derived parameters
+AGILE_HASH_ALGORITHM = "SHA512"
+AGILE_KEY_BITS = 256
+
+
+class EncryptionKey:
+    """Key encryptor parameters and data key of one encrypted document."""
+
+    __slots__ = ("params", "secret_key")
+
+    def __init__(self, params: Any, secret_key: bytes):
+        """
+        Args:
+            params: msoffcrypto ECMA376AgileEncryptionInfo of the document
+            secret_key: Data key derived from the password
+        """
+        self.params = params
+        self.secret_key = secret_key
+
+    def wipe(self) -> None:
+        """Drop the references to the key material."""
+        self.params = None
+        self.secret_key = None
+
+
+def _encryptor_from_info(info) -> Optional[Any]:
+    """
+    Rebuild the encryption parameters of a decrypted document, so it can be
+    encrypted again with the same key encryptor and no key derivation.
+    """
+    from msoffcrypto.method.ecma376_agile import ECMA376AgileEncryptionInfo
+
+    params = ECMA376AgileEncryptionInfo()
+    if (info["passwordHashAlgorithm"] != AGILE_HASH_ALGORITHM
+            or info["passwordKeyBits"] != AGILE_KEY_BITS
+            or len(info["passwordSalt"]) != params.encryptedKey.saltSize):
+        return None
+    params.spinCount = info["spinValue"]
+    params.encryptedKey.saltValue = info["passwordSalt"]
+    params.encryptedVerifierHashInput = info["encryptedVerifierHashInput"]
+    params.encryptedVerifierHashValue = info["encryptedVerifierHashValue"]
+    params.encryptedKeyValue = info["encryptedKeyValue"]
+    return params
+
+
+def encrypt_stream(infile: BinaryIO, outfile: BinaryIO, password: str,
+                   key: Optional[EncryptionKey] = None) -> None:
+    """
+    Encrypt a Word document with a password.
+
+    Args:
+        infile: Binary file object positioned at the start of the document
+        outfile: Binary file object the encrypted document is written to
+        password: Password to encrypt the document with
+        key: Key returned by decrypt_stream() for this document; without one,
+             a new salt and data key are generated from the password
+    """
+    from msoffcrypto.method.ecma376_agile import ECMA376Agile
+    from msoffcrypto.method.container.ecma376_encrypted import ECMA376Encrypted
+
+    if key is None or key.params is None:
+        info, secret_key = ECMA376Agile.generate_encryption_parameters(password)
+    else:
+        info = copy.deepcopy(key.params)
+        secret_key = key.secret_key
+        # Fresh key data salt, so no initialization vector is reused
+        info.keyData.saltValue = os.urandom(info.keyData.saltSize)
+
+    encrypted_data = ECMA376Agile.encrypt_payload(infile, info.encryptedKey, secret_key,
+                                                  info.keyData.saltValue)
+    encryption_info = ECMA376Agile.get_encryption_information(info, encrypted_data, secret_key)
+    ECMA376Encrypted(encrypted_data, encryption_info).write_to(outfile)
+
+
+def decrypt_stream(infile: BinaryIO, outfile: BinaryIO, password: str) -> Optional[EncryptionKey]:
+    """
+    Decrypt a password-protected Word document.
+
+    Args:
+        infile: Binary file object holding the encrypted document
+        outfile: Binary file object the decrypted document is written to
+        password: Password the document was encrypted with
+
+    Returns:
+        The document's key, for encrypting it again with encrypt_stream(),
+        or None if the document does not use agile encryption with
+        parameters msoffcrypto can write
+
+    Raises:
+        msoffcrypto.exceptions.InvalidKeyError: If the password is incorrect
+        msoffcrypto.exceptions.DecryptionError: If the document is not encrypted
+        msoffcrypto.exceptions.FileFormatError: If the file is not an Office document
+    """
+    import msoffcrypto
+
+    office_file = msoffcrypto.OfficeFile(infile)
+    office_file.load_key(password=password)
+    office_file.decrypt(outfile)
+
+    if getattr(office_file, "type", None) != "agile":
+        return None
+    params = _encryptor_from_info(office_file.info)
+    if params is None:
+        return None
+    return EncryptionKey(params, office_file.secret_key)
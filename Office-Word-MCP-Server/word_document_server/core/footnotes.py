@@ -1,213 +1,414 @@
 """
 Footnote and endnote functionality for Word Document Server.
+
+Notes are stored the way Word stores them: in the footnotes and endnotes
+parts of the package, referenced from the body by w:footnoteReference and
+w:endnoteReference runs. Each note part is parsed once and kept with the
+document together with its next free note id, so adding a note takes the
+same time however many notes the document already has.
 """
-from docx import Document
-from typing import List, Tuple
+from copy import deepcopy
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.packuri import PackURI
+from docx.opc.part import XmlPart
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.shared import Pt
+
+from word_document_server.core.styles import get_style_registry
+
+
+class NoteKind(NamedTuple):
+    """Package names and styles of one kind of note."""
+    name: str
+    partname: str
+    content_type: str
+    reltype: str
+    root_tag: str
+    note_tag: str
+    reference_tag: str
+    mark_tag: str
+    properties_tag: str
+    text_style_id: str
+    text_style_name: str
+    reference_style_id: str
+    reference_style_name: str
+
+
+FOOTNOTE = NoteKind(
+    "footnote", "/word/footnotes.xml", CT.WML_FOOTNOTES, RT.FOOTNOTES,
+    "footnotes", "footnote", "footnoteReference", "footnoteRef", "footnotePr",
+    "FootnoteText", "footnote text", "FootnoteReference", "footnote reference"
+)
+ENDNOTE = NoteKind(
+    "endnote", "/word/endnotes.xml", CT.WML_ENDNOTES, RT.ENDNOTES,
+    "endnotes", "endnote", "endnoteReference", "endnoteRef", "endnotePr",
+    "EndnoteText", "endnote text", "EndnoteReference", "endnote reference"
+)
+NOTE_KINDS = {"footnote": FOOTNOTE, "endnote": ENDNOTE}
+
+# Numbering formats accepted by customize_footnote_style, as w:numFmt values
+NUMBER_FORMATS = {
+    "1, 2, 3": "decimal",
+    "i, ii, iii": "lowerRoman",
+    "I, II, III": "upperRoman",
+    "a, b, c": "lowerLetter",
+    "A, B, C": "upperLetter",
+    "*, †, ‡": "chicago",
+}
+
+# Children of w:sectPr that follow w:footnotePr and w:endnotePr
+SECT_PR_SUCCESSORS = (
+    "w:type", "w:pgSz", "w:pgMar", "w:paperSrc", "w:pgBorders", "w:lnNumType",
+    "w:pgNumType", "w:cols", "w:formProt", "w:vAlign", "w:noEndnote", "w:titlePg",
+    "w:textDirection", "w:bidi", "w:rtlGutter", "w:docGrid", "w:printerSettings",
+    "w:sectPrChange",
+)
+
+
+def _empty_notes_xml(kind: NoteKind) -> str:
+    """Note part with the separator notes Word expects."""
+    notes = "".join(
+        f'<w:{kind.note_tag} w:type="{note_type}" w:id="{note_id}"><w:p><w:pPr>'
+        f'<w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+        f'<w:r><w:{separator}/></w:r></w:p></w:{kind.note_tag}>'
+        for note_type, note_id, separator in (
+            ("separator", -1, "separator"),
+            ("continuationSeparator", 0, "continuationSeparator"),
+        )
+    )
+    return f'<w:{kind.root_tag} {nsdecls("w")}>{notes}</w:{kind.root_tag}>'
+
+
+def ensure_note_styles(doc, kind: NoteKind):
+    """
+    Add the note text and reference styles of a kind of note if the document lacks them.
+
+    Args:
+        doc: Document object
+        kind: FOOTNOTE or ENDNOTE
+
+    Returns:
+        The note text style
+    """
+    registry = get_style_registry(doc)
+    text_style = _find_note_style(registry, kind.text_style_id, kind.text_style_name)
+    if text_style is None:
+        text_style = registry.add(kind.text_style_name, WD_STYLE_TYPE.PARAGRAPH, kind.text_style_id)
+        normal = registry.get("Normal")
+        if normal is not None:
+            text_style.base_style = normal
+        text_style.font.size = Pt(10)
+        text_style.paragraph_format.space_after = Pt(0)
+    if _find_note_style(registry, kind.reference_style_id, kind.reference_style_name) is None:
+        style = registry.add(kind.reference_style_name, WD_STYLE_TYPE.CHARACTER, kind.reference_style_id)
+        style.font.superscript = True
+    return text_style
+
+
+def note_style_ids(doc, kind: NoteKind) -> Tuple[str, str]:
+    """
+    Get the ids of the note text and reference styles, adding the styles if needed.
+
+    Word localizes the ids of built-in styles (e.g. 'Funotentext' in German
+    documents) but not their names, so the ids are taken from the styles found.
+
+    Args:
+        doc: Document object
+        kind: FOOTNOTE or ENDNOTE
+
+    Returns:
+        Tuple of (text style id, reference style id)
+    """
+    text_style = ensure_note_styles(doc, kind)
+    registry = get_style_registry(doc)
+    reference_style = _find_note_style(registry, kind.reference_style_id, kind.reference_style_name)
+    return text_style.style_id, reference_style.style_id
+
+
+def _find_note_style(registry, style_id: str, name: str):
+    style = registry.get_by_id(style_id)
+    return style if style is not None else registry.get(name)
+
+
+class NoteStore:
+    """The notes of one kind in a document, with an id allocator."""
+
+    def __init__(self, doc, kind: NoteKind):
+        """
+        Args:
+            doc: Document object
+            kind: FOOTNOTE or ENDNOTE
+        """
+        self.doc = doc
+        self.kind = kind
+        self.part = self._find_part()
+        if self.part is None:
+            self.part = XmlPart(PackURI(kind.partname), kind.content_type,
+                                parse_xml(_empty_notes_xml(kind)), doc.part.package)
+            doc.part.relate_to(self.part, kind.reltype)
+        # python-docx has no part class for notes, so an existing note part is
+        # loaded as raw bytes; parse it once and write it back in flush()
+        if isinstance(self.part, XmlPart):
+            self.root = self.part.element
+            self._raw = False
+        else:
+            self.root = parse_xml(self.part.blob)
+            self._raw = True
+
+        ids = [int(note.get(qn("w:id"))) for note in self.root.iterchildren(qn(f"w:{kind.note_tag}"))]
+        self._next_id = max([0] + ids) + 1
+        self._templates = None
+
+    def _find_part(self):
+        for rel in self.doc.part.rels.values():
+            if rel.reltype == self.kind.reltype and not rel.is_external:
+                return rel.target_part
+        return None
+
+    def _build_templates(self):
+        kind = self.kind
+        text_style_id, reference_style_id = note_style_ids(self.doc, kind)
+        note = parse_xml(
+            f'<w:{kind.note_tag} {nsdecls("w")} w:id="0"><w:p>'
+            f'<w:pPr><w:pStyle w:val="{text_style_id}"/></w:pPr>'
+            f'<w:r><w:rPr><w:rStyle w:val="{reference_style_id}"/></w:rPr><w:{kind.mark_tag}/></w:r>'
+            f'<w:r><w:t xml:space="preserve"> </w:t></w:r>'
+            f'</w:p></w:{kind.note_tag}>'
+        )
+        reference = parse_xml(
+            f'<w:r {nsdecls("w")}><w:rPr><w:rStyle w:val="{reference_style_id}"/></w:rPr>'
+            f'<w:{kind.reference_tag} w:id="0"/></w:r>'
+        )
+        self._templates = (note, reference)
+
+    def allocate_id(self) -> int:
+        """Reserve the next free note id."""
+        note_id = self._next_id
+        self._next_id += 1
+        return note_id
+
+    def add(self, p, text: str) -> int:
+        """
+        Add a note and a reference to it at the end of a paragraph.
+
+        Args:
+            p: w:p element the reference is added to
+            text: Text of the note
+
+        Returns:
+            Id of the new note
+        """
+        if self._templates is None:
+            self._build_templates()
+        note_template, reference_template = self._templates
+        note_id = self.allocate_id()
+
+        note = deepcopy(note_template)
+        note.set(qn("w:id"), str(note_id))
+        # w:footnote/w:p/w:r[2]/w:t
+        note[0][2][0].text = f" {text}"
+        self.root.append(note)
+
+        reference = deepcopy(reference_template)
+        reference[1].set(qn("w:id"), str(note_id))
+        p.append(reference)
+        return note_id
+
+    def notes(self) -> List:
+        """Note elements, excluding the separators."""
+        return [note for note in self.root.iterchildren(qn(f"w:{self.kind.note_tag}"))
+                if note.get(qn("w:type")) in (None, "normal")]
+
+    def flush(self) -> None:
+        """Write a note part that was loaded as raw bytes back to the package."""
+        if self._raw:
+            self.part._blob = serialize_part_xml(self.root)
+
+
+def get_note_store(doc, note_type: str = "footnote") -> NoteStore:
+    """
+    Get the footnotes or endnotes of a document, creating the part if needed.
+
+    The store is kept with the document, so documents held in the document
+    cache reuse the parsed part and id allocator across tool calls.
+
+    Args:
+        doc: Document object
+        note_type: 'footnote' or 'endnote'
+
+    Returns:
+        NoteStore
+    """
+    kind = NOTE_KINDS[note_type]
+    stores = getattr(doc.part, "_note_stores", None)
+    if stores is None:
+        stores = doc.part._note_stores = {}
+    store = stores.get(kind.name)
+    if store is None:
+        store = stores[kind.name] = NoteStore(doc, kind)
+    return store
+
+
+def add_notes(doc, notes: List[Tuple[object, str]], note_type: str = "footnote") -> List[int]:
+    """
+    Add notes to paragraphs.
+
+    Args:
+        doc: Document object
+        notes: List of (paragraph, text) pairs
+        note_type: 'footnote' or 'endnote'
+
+    Returns:
+        Ids of the new notes
+    """
+    store = get_note_store(doc, note_type)
+    ids = [store.add(paragraph._p, text) for paragraph, text in notes]
+    store.flush()
+    return ids
 
 
 def add_footnote(doc, paragraph, text):
     """
     Add a footnote to a paragraph.
-    
+
     Args:
         doc: Document object
         paragraph: Paragraph to add footnote to
         text: Text content of the footnote
-    
+
     Returns:
-        The created footnote
+        Id of the created footnote
     """
-    return paragraph.add_footnote(text)
+    return add_notes(doc, [(paragraph, text)], "footnote")[0]
 
 
 def add_endnote(doc, paragraph, text):
     """
     Add an endnote to a paragraph.
-    This is a custom implementation since python-docx doesn't directly support endnotes.
-    
+
     Args:
         doc: Document object
         paragraph: Paragraph to add endnote to
         text: Text content of the endnote
-    
+
     Returns:
-        The paragraph containing the endnote reference
-    """
-  
-    run = paragraph.add_run()
-    run.text = "*"
-    run.font.superscript = True
-    
-    # Add endnote text at the end of the document
-    # create a section for endnotes if it doesn't exist
-    endnotes_found = False
-    for para in doc.paragraphs:
-        if para.text == "Endnotes:":
-            endnotes_found = True
-            break
-    
-    if not endnotes_found:
-        # Add a page break before endnotes section
-        doc.add_page_break()
-        doc.add_heading("Endnotes:", level=1)
-    
-    # Add the endnote text
-    endnote_text = f"* {text}"
-    doc.add_paragraph(endnote_text)
-    
-    return paragraph
+        Id of the created endnote
+    """
+    return add_notes(doc, [(paragraph, text)], "endnote")[0]
+
+
+def _retag(element, old_kind: NoteKind, new_kind: NoteKind, styles: Dict[str, str]) -> None:
+    """
+    Switch the tags and styles of a note or reference run to another kind of note.
+
+    Args:
+        element: Note or reference run element
+        old_kind: Kind of note the element belongs to
+        new_kind: Kind of note to switch to
+        styles: Old style id to new style id
+    """
+    renames = {
+        qn(f"w:{old_kind.note_tag}"): qn(f"w:{new_kind.note_tag}"),
+        qn(f"w:{old_kind.mark_tag}"): qn(f"w:{new_kind.mark_tag}"),
+        qn(f"w:{old_kind.reference_tag}"): qn(f"w:{new_kind.reference_tag}"),
+    }
+    style_tags = (qn("w:pStyle"), qn("w:rStyle"))
+    val = qn("w:val")
+    for child in element.iter():
+        if child.tag in renames:
+            child.tag = renames[child.tag]
+        elif child.tag in style_tags and child.get(val) in styles:
+            child.set(val, styles[child.get(val)])
 
 
 def convert_footnotes_to_endnotes(doc):
     """
     Convert all footnotes to endnotes in a document.
-    
+
     Args:
         doc: Document object
-    
+
     Returns:
         Number of footnotes converted
     """
-    # This is a complex operation not fully supported by python-docx
-    # Implementing a simplified version
-    
-    # Collect all footnotes
-    footnotes = []
-    for para in doc.paragraphs:
-        
-        # This is a simplified implementation
-        for run in para.runs:
-            if run.font.superscript and run.text.isdigit():
-                # This might be a footnote reference
-                footnotes.append((para, run.text))
-    
-    # Add endnotes section
-    if footnotes:
-        doc.add_page_break()
-        doc.add_heading("Endnotes:", level=1)
-        
-        # Add each footnote as an endnote
-        for idx, (para, footnote_num) in enumerate(footnotes):
-            doc.add_paragraph(f"{idx+1}. Converted from footnote {footnote_num}")
-    
-    return len(footnotes)
-
-
-def find_footnote_references(doc) -> List[Tuple[int, int, str]]:
-    """
-    Find all footnote references in a document.
-    
-    Args:
-        doc: Document object
-        
-    Returns:
-        List of tuples (paragraph_index, run_index, text) for each footnote reference
-    """
-    footnote_references = []
-    
-    for para_idx, para in enumerate(doc.paragraphs):
-        for run_idx, run in enumerate(para.runs):
-           
-            if run.font.superscript and (run.text.isdigit() or run.text in "¹²³⁴⁵⁶⁷⁸⁹"):
-                footnote_references.append((para_idx, run_idx, run.text))
-    
-    return footnote_references
+    footnotes = get_note_store(doc, "footnote")
+    notes = footnotes.notes()
+    if not notes:
+        return 0
+    endnotes = get_note_store(doc, "endnote")
+    text_style_id, reference_style_id = note_style_ids(doc, ENDNOTE)
+    styles = {FOOTNOTE.text_style_id: text_style_id, FOOTNOTE.reference_style_id: reference_style_id}
+    registry = get_style_registry(doc)
+    for style_id, name, new_id in (
+        (FOOTNOTE.text_style_id, FOOTNOTE.text_style_name, text_style_id),
+        (FOOTNOTE.reference_style_id, FOOTNOTE.reference_style_name, reference_style_id),
+    ):
+        old_style = _find_note_style(registry, style_id, name)
+        if old_style is not None:
+            styles[old_style.style_id] = new_id
+
+    new_ids: Dict[str, str] = {}
+    for note in notes:
+        new_id = str(endnotes.allocate_id())
+        new_ids[note.get(qn("w:id"))] = new_id
+        _retag(note, FOOTNOTE, ENDNOTE, styles)
+        note.set(qn("w:id"), new_id)
+        endnotes.root.append(note)
+
+    for reference in list(doc.element.body.iter(qn("w:footnoteReference"))):
+        new_id = new_ids.get(reference.get(qn("w:id")))
+        if new_id is None:
+            continue
+        run = reference.getparent()
+        _retag(run, FOOTNOTE, ENDNOTE, styles)
+        reference.set(qn("w:id"), new_id)
 
+    footnotes.flush()
+    endnotes.flush()
+    return len(notes)
 
-def get_format_symbols(numbering_format: str, count: int) -> List[str]:
+
+def set_note_numbering(doc, note_type: str = "footnote", number_format: Optional[str] = None,
+                       start_number: Optional[int] = None) -> None:
     """
-    Get a list of formatting symbols based on the specified numbering format.
-    
-    Args:
-        numbering_format: Format for footnote/endnote numbers (e.g., "1, 2, 3", "i, ii, iii", "a, b, c")
-        count: Number of symbols needed
-        
-    Returns:
-        List of formatting symbols
-    """
-    if numbering_format == "i, ii, iii":
-        roman_numerals = ["i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x", 
-                         "xi", "xii", "xiii", "xiv", "xv", "xvi", "xvii", "xviii", "xix", "xx"]
-        return roman_numerals[:count] + [str(i) for i in range(count - len(roman_numerals) + 1, count + 1) if i > len(roman_numerals)]
-    
-    elif numbering_format == "a, b, c":
-        alphabet = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j",
-                   "k", "l", "m", "n", "o", "p", "q", "r", "s", "t",
-                   "u", "v", "w", "x", "y", "z"]
-        return alphabet[:count] + [str(i) for i in range(count - len(alphabet) + 1, count + 1) if i > len(alphabet)]
-    
-    elif numbering_format == "*, †, ‡":
-        symbols = ["*", "†", "‡", "§", "¶", "||", "**", "††", "‡‡", "§§"]
-        return symbols[:count] + [str(i) for i in range(count - len(symbols) + 1, count + 1) if i > len(symbols)]
-    
-    else:  # Default to numbers
-        return [str(i) for i in range(1, count + 1)]
-
-
-def customize_footnote_formatting(doc, footnote_refs, format_symbols, start_number, style=None):
-    """
-    Apply custom formatting to footnote references and text.
-    
+    Set the numbering format and start number of notes in every section.
+
     Args:
         doc: Document object
-        footnote_refs: List of footnote references from find_footnote_references()
-        format_symbols: List of formatting symbols to use
-        start_number: Number to start footnote numbering from
-        style: Optional style to apply to footnote text
-        
-    Returns:
-        Number of footnotes formatted
-    """
-    # Update footnote references with new format
-    for i, (para_idx, run_idx, _) in enumerate(footnote_refs):
-        try:
-            idx = i + start_number - 1
-            if idx < len(format_symbols):
-                symbol = format_symbols[idx]
-            else:
-                symbol = str(idx + 1)  # Fall back to numbers if we run out of symbols
-            
-            paragraph = doc.paragraphs[para_idx]
-            paragraph.runs[run_idx].text = symbol
-        except IndexError:
-            # Skip if we can't locate the reference
-            pass
-    
-    # Find footnote section and update
-    found_footnote_section = False
-    for para_idx, para in enumerate(doc.paragraphs):
-        if para.text.startswith("Footnotes:") or para.text == "Footnotes":
-            found_footnote_section = True
-            
-            # Update footnotes with new symbols
-            for i in range(len(footnote_refs)):
-                try:
-                    footnote_para_idx = para_idx + i + 1
-                    if footnote_para_idx < len(doc.paragraphs):
-                        para = doc.paragraphs[footnote_para_idx]
-                        
-                        # Extract and preserve footnote text
-                        footnote_text = para.text
-                        if " " in footnote_text and len(footnote_text) > 2:
-                            # Remove the old footnote number/symbol
-                            footnote_text = footnote_text.split(" ", 1)[1]
-                        
-                        # Add new format
-                        idx = i + start_number - 1
-                        if idx < len(format_symbols):
-                            symbol = format_symbols[idx]
-                        else:
-                            symbol = str(idx + 1)
-                        
-                        # Apply new formatting
-                        para.text = f"{symbol} {footnote_text}"
-                        
-                        # Apply style
-                        if style:
-                            para.style = style
-                except IndexError:
-                    pass
-            
-            break
-    
-    return len(footnote_refs)
+        note_type: 'footnote' or 'endnote'
+        number_format: w:numFmt value, e.g. 'decimal' or 'lowerRoman'
+        start_number: Number of the first note
+    """
+    from docx.oxml import OxmlElement
+
+    kind = NOTE_KINDS[note_type]
+    successors = SECT_PR_SUCCESSORS if kind is ENDNOTE else ("w:endnotePr",) + SECT_PR_SUCCESSORS
+    for section in doc.sections:
+        sect_pr = section._sectPr
+        properties = sect_pr.find(qn(f"w:{kind.properties_tag}"))
+        if properties is None:
+            properties = OxmlElement(f"w:{kind.properties_tag}")
+            sect_pr.insert_element_before(properties, *successors)
+
+        # w:pos, w:numFmt, w:numStart and w:numRestart must stay in this order
+        values = {"numFmt": number_format, "numStart": start_number}
+        for tag in values:
+            existing = properties.find(qn(f"w:{tag}"))
+            if existing is not None:
+                if values[tag] is None:
+                    values[tag] = existing.get(qn("w:val"))
+                properties.remove(existing)
+        anchor = properties.find(qn("w:pos"))
+        index = 0 if anchor is None else properties.index(anchor) + 1
+        for tag, value in values.items():
+            if value is None:
+                continue
+            element = OxmlElement(f"w:{tag}")
+            element.set(qn("w:val"), str(value))
+            properties.insert(index, element)
+            index += 1
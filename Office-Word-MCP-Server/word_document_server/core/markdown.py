@@ -0,0 +1,532 @@
+"""
+Streaming Markdown reader for Word Document Server.
+
+Markdown is read line by line and turned into document builder blocks (see
+core.builder) as soon as each block is complete, so an import holds one
+block at a time however long the input is. The subset understood is the
+one documents are usually written in:
+
+- ATX (``# Title``) and setext (underlined) headings
+- paragraphs, with hard line breaks from two trailing spaces, a trailing
+  backslash or ``<br>``
+- bullet and ordered lists, nested by indentation
+- fenced and indented code blocks
+- block quotes
+- GFM tables, with column alignment
+- emphasis, strong emphasis, code spans, links, autolinks and images
+
+Thematic breaks are dropped, strikethrough markers are removed and raw HTML
+is kept as text.
+"""
+import io
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from urllib.parse import unquote
+
+from word_document_server.core.builder import LIST_STYLES
+
+
+# Styles markdown elements are mapped to; all are in the default template
+QUOTE_STYLE = "Quote"
+CODE_STYLE = "No Spacing"
+LIST_CONTINUE_STYLES = ("List Continue", "List Continue 2", "List Continue 3")
+
+CODE_FONT = "Courier New"
+
+# Image formats python-docx can embed; other images keep their alternative text
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff")
+
+_ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t]*$")
+_ATX_CLOSING = re.compile(r"(?:^|[ \t]+)#+$")
+_SETEXT_UNDERLINE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+_THEMATIC_BREAK = re.compile(r"^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+_FENCE = re.compile(r"^( *)(`{3,}|~{3,})(.*)$")
+_LIST_ITEM = re.compile(r"^( *)([-*+]|\d{1,9}[.)])(?:[ \t]+(.*)|$)")
+_BLOCK_QUOTE = re.compile(r"^ {0,3}> ?(.*)$")
+_TABLE_DELIMITER = re.compile(r"^ {0,3}\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$")
+_CELL_SEPARATOR = re.compile(r"(?<!\\)\|")
+_LONE_IMAGE = re.compile(r'^!\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)$')
+
+_INLINE = re.compile(
+    r"\\(?P<escaped>[!-/:-@\[-`{-~])"
+    r"|(?P<ticks>`+)"
+    r'|!\[(?P<alt>[^\]]*)\]\(\s*<?(?P<src>[^)\s>]*)>?(?:\s+"[^"]*")?\s*\)'
+    r'|\[(?P<label>(?:[^\[\]]|\[[^\]]*\])*)\]\(\s*<?(?P<href>[^)\s>]*)>?(?:\s+"[^"]*")?\s*\)'
+    r"|<(?P<autolink>(?:https?|ftp|mailto):[^\s<>]+)>"
+    r"|(?P<br><br\s*/?>)"
+    r"|(?P<delimiter>\*{1,3}|_{1,3}|~~)"
+)
+
+_REMOTE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+def parse_inline(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse inline Markdown into builder runs.
+
+    Emphasis markers only open when a matching closer follows, so stray
+    asterisks and underscores (``2 * 3``, ``snake_case``) stay literal.
+
+    Args:
+        text: Inline Markdown
+
+    Returns:
+        List of run dictionaries with text and bold, italic, font_name or
+        link where they apply; adjacent runs with the same formatting are
+        merged
+    """
+    runs: List[Dict[str, Any]] = []
+    _parse_inline(text, {}, runs)
+    return _merge_runs(runs)
+
+
+def _parse_inline(text: str, formatting: Dict[str, Any], runs: List[Dict[str, Any]]) -> None:
+    bold = bool(formatting.get("bold"))
+    italic = bool(formatting.get("italic"))
+    strike = False
+    pending: List[str] = []
+
+    def current() -> Dict[str, Any]:
+        values = {key: value for key, value in formatting.items() if key not in ("bold", "italic")}
+        if bold:
+            values["bold"] = True
+        if italic:
+            values["italic"] = True
+        return values
+
+    def flush():
+        if pending:
+            runs.append(dict(current(), text="".join(pending)))
+            pending.clear()
+
+    pos = 0
+    while pos < len(text):
+        match = _INLINE.search(text, pos)
+        if match is None:
+            pending.append(text[pos:])
+            break
+        pending.append(text[pos:match.start()])
+        pos = match.end()
+        kind = match.lastgroup
+
+        if kind == "escaped":
+            pending.append(match.group("escaped"))
+        elif kind == "ticks":
+            ticks = match.group("ticks")
+            close = _find_code_close(text, ticks, pos)
+            if close == -1:
+                pending.append(ticks)
+                continue
+            code = text[pos:close].replace("\n", " ")
+            if code.strip() and code[0] == " " and code[-1] == " ":
+                code = code[1:-1]
+            flush()
+            runs.append(dict(current(), text=code, font_name=CODE_FONT))
+            pos = close + len(ticks)
+        elif kind == "src":
+            # Inline images keep their alternative text
+            flush()
+            _parse_inline(match.group("alt"), current(), runs)
+        elif kind == "href":
+            flush()
+            start = len(runs)
+            _parse_inline(match.group("label"), current(), runs)
+            href = match.group("href")
+            if href:
+                for run in runs[start:]:
+                    run["link"] = href
+        elif kind == "autolink":
+            flush()
+            url = match.group("autolink")
+            runs.append(dict(current(), text=url[7:] if url.startswith("mailto:") else url, link=url))
+        elif kind == "br":
+            pending.append("\n")
+        elif match.group("delimiter") == "~~":
+            # Runs have no strikethrough option; the markers are dropped
+            if strike or text.find("~~", pos) != -1:
+                strike = not strike
+            else:
+                pending.append("~~")
+        else:
+            marker = match.group("delimiter")
+            if marker[0] == "_" and _is_intraword(text, match.start(), pos):
+                pending.append(marker)
+                continue
+            strong = len(marker) >= 2
+            emphasis = len(marker) != 2
+            if (not strong or bold) and (not emphasis or italic) and _closes(text, match.start()):
+                flush()
+                bold = bold and not strong
+                italic = italic and not emphasis
+            elif (not strong or not bold) and (not emphasis or not italic) \
+                    and _opens(text, pos) and _has_closer(text, marker, pos):
+                flush()
+                bold = bold or strong
+                italic = italic or emphasis
+            else:
+                pending.append(marker)
+    flush()
+
+
+def _find_code_close(text: str, ticks: str, start: int) -> int:
+    """Position of the backtick run closing a code span, or -1."""
+    pos = text.find(ticks, start)
+    while pos != -1:
+        end = pos + len(ticks)
+        if (pos == 0 or text[pos - 1] != "`") and (end >= len(text) or text[end] != "`"):
+            return pos
+        while end < len(text) and text[end] == "`":
+            end += 1
+        pos = text.find(ticks, end)
+    return -1
+
+
+def _opens(text: str, end: int) -> bool:
+    """Whether a delimiter ending at end is followed by text."""
+    return end < len(text) and not text[end].isspace()
+
+
+def _closes(text: str, start: int) -> bool:
+    """Whether a delimiter starting at start follows text."""
+    return start > 0 and not text[start - 1].isspace()
+
+
+def _is_intraword(text: str, start: int, end: int) -> bool:
+    return (start > 0 and text[start - 1].isalnum()) and (end < len(text) and text[end].isalnum())
+
+
+def _has_closer(text: str, marker: str, start: int) -> bool:
+    """Whether a delimiter run that could close marker follows start."""
+    pos = text.find(marker[0] * len(marker), start)
+    while pos != -1:
+        if _closes(text, pos):
+            return True
+        pos = text.find(marker[0] * len(marker), pos + 1)
+    return False
+
+
+def _merge_runs(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged: List[Dict[str, Any]] = []
+    for run in runs:
+        if not run["text"]:
+            continue
+        if merged:
+            last = merged[-1]
+            if len(last) == len(run) and all(last.get(key) == value for key, value in run.items() if key != "text"):
+                last["text"] += run["text"]
+                continue
+        merged.append(run)
+    return merged
+
+
+def _split_row(line: str) -> List[str]:
+    """Cells of a table row, without the outer pipes."""
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [cell.strip().replace("\\|", "|") for cell in _CELL_SEPARATOR.split(line)]
+
+
+def _column_alignment(cell: str) -> Optional[str]:
+    left, right = cell.startswith(":"), cell.endswith(":")
+    if left and right:
+        return "center"
+    if right:
+        return "right"
+    if left:
+        return "left"
+    return None
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+class _MarkdownReader:
+    """Line-by-line state machine turning Markdown into builder blocks."""
+
+    def __init__(self, base_dir: Optional[str]):
+        self.base_dir = base_dir
+        # Lines of the paragraph being read, and its style
+        self.lines: List[str] = []
+        self.style: Optional[str] = None
+        # Marker indents of the open lists, outermost first, and the content
+        # column of the last item
+        self.list_indents: List[int] = []
+        self.content_indent = 0
+        # Marker delimiter of the last item at each depth, and the number the
+        # paragraph being read starts a new ordered list at
+        self.list_markers: Dict[int, str] = {}
+        self.list_start: Optional[int] = None
+        self.blank = False
+        # Open fenced code block: fence and indent
+        self.fence: Optional[Tuple[str, int]] = None
+        # Indent of an open indented code block, and blank lines held back
+        # from it until more code follows
+        self.code_indent: Optional[int] = None
+        self.held_blanks = 0
+        # Table being read: column alignments and rows
+        self.alignments: Optional[List[Optional[str]]] = None
+        self.rows: List[List[Dict[str, Any]]] = []
+
+    def feed(self, line: str) -> Iterator[Dict[str, Any]]:
+        """Read one line, yielding the blocks it completes."""
+        line = line.rstrip("\r\n")
+        if "\t" in line:
+            line = line.expandtabs(4)
+
+        if self.fence is not None:
+            yield from self._fenced_line(line)
+            return
+
+        if not line.strip():
+            self.blank = True
+            if self.code_indent is not None:
+                self.held_blanks += 1
+                return
+            yield from self._flush_table()
+            yield from self._flush_paragraph()
+            return
+
+        blank_before, self.blank = self.blank, False
+        indent = _indent(line)
+
+        if self.code_indent is not None:
+            if indent >= self.code_indent + 4:
+                for _ in range(self.held_blanks):
+                    yield _code_block("")
+                self.held_blanks = 0
+                yield _code_block(line[self.code_indent + 4:])
+                return
+            self.code_indent = None
+            self.held_blanks = 0
+
+        if self.alignments is not None:
+            if "|" in line:
+                self._add_row(_split_row(line))
+                return
+            yield from self._flush_table()
+
+        base = self.content_indent if self.list_indents else 0
+        if blank_before and self.list_indents and indent <= self.list_indents[0] \
+                and not _LIST_ITEM.match(line):
+            self.list_indents = []
+            base = 0
+
+        fence = _FENCE.match(line)
+        if fence and len(fence.group(1)) <= base + 3 and not (
+                fence.group(2)[0] == "`" and "`" in fence.group(3)):
+            yield from self._flush_paragraph()
+            self.fence = (fence.group(2), len(fence.group(1)))
+            return
+
+        if indent >= base + 4 and not self.lines:
+            self.code_indent = base
+            yield _code_block(line[base + 4:])
+            return
+
+        heading = _ATX_HEADING.match(line)
+        if heading:
+            yield from self._flush_paragraph()
+            self.list_indents = []
+            text = _ATX_CLOSING.sub("", heading.group(2) or "").strip()
+            yield {"type": "heading", "level": len(heading.group(1)), "runs": parse_inline(text)}
+            return
+
+        underline = _SETEXT_UNDERLINE.match(line)
+        if underline and self.lines and self.style is None:
+            text = self._paragraph_text()
+            self.lines = []
+            yield {"type": "heading", "level": 1 if underline.group(1)[0] == "=" else 2,
+                   "runs": parse_inline(text)}
+            return
+
+        if _THEMATIC_BREAK.match(line):
+            yield from self._flush_paragraph()
+            self.list_indents = []
+            return
+
+        if (len(self.lines) == 1 and self.style is None and "|" in self.lines[0]
+                and "|" in line and _TABLE_DELIMITER.match(line)):
+            header = _split_row(self.lines[0])
+            delimiters = _split_row(line)
+            if len(header) == len(delimiters):
+                self.lines = []
+                self.alignments = [_column_alignment(cell) for cell in delimiters]
+                self._add_row(header)
+                return
+
+        item = _LIST_ITEM.match(line)
+        # Only a non-empty bullet or an item numbered 1 can interrupt a paragraph
+        if item and (not self.lines or self.list_indents or (
+                item.group(3) and item.group(2)[:-1] in ("", "1"))):
+            yield from self._flush_paragraph()
+            self._start_item(item)
+            return
+
+        quote = _BLOCK_QUOTE.match(line)
+        if quote:
+            if self.style != QUOTE_STYLE or not self.lines:
+                yield from self._flush_paragraph()
+                self.list_indents = []
+                self.style = QUOTE_STYLE
+            text = quote.group(1)
+            while _BLOCK_QUOTE.match(text):
+                text = _BLOCK_QUOTE.match(text).group(1)
+            if text.strip():
+                self.lines.append(text.strip() if not self.lines else text.lstrip())
+            else:
+                yield from self._flush_paragraph(keep_style=True)
+            return
+
+        if blank_before and self.list_indents:
+            # A further paragraph of the last item
+            depth = sum(1 for list_indent in self.list_indents if list_indent < indent)
+            self.style = LIST_CONTINUE_STYLES[min(max(depth, 1), len(LIST_CONTINUE_STYLES)) - 1]
+        self.lines.append(line.strip() if not self.lines else line.lstrip())
+
+    def finish(self) -> Iterator[Dict[str, Any]]:
+        """Yield the blocks still open at the end of the input."""
+        yield from self._flush_table()
+        yield from self._flush_paragraph()
+
+    def _fenced_line(self, line: str) -> Iterator[Dict[str, Any]]:
+        fence, fence_indent = self.fence
+        stripped = line.strip()
+        if (_indent(line) <= fence_indent + 3 and stripped.startswith(fence)
+                and stripped == fence[0] * len(stripped)):
+            self.fence = None
+            return
+        # Content loses as much indentation as the opening fence had
+        yield _code_block(line[min(fence_indent, _indent(line)):])
+
+    def _start_item(self, item) -> None:
+        indent = len(item.group(1))
+        while self.list_indents and self.list_indents[-1] > indent:
+            self.list_indents.pop()
+        new_list = not self.list_indents or self.list_indents[-1] < indent
+        if new_list:
+            self.list_indents.append(indent)
+        # A different bullet character or number delimiter starts a new list
+        marker = item.group(2)[-1]
+        depth = len(self.list_indents)
+        new_list = new_list or self.list_markers.get(depth) != marker
+        self.list_markers[depth] = marker
+        ordered = marker in ".)"
+        self.list_start = int(item.group(2)[:-1]) if ordered and new_list else None
+        styles = LIST_STYLES[ordered]
+        self.style = styles[min(len(self.list_indents), len(styles)) - 1]
+        self.content_indent = indent + len(item.group(2)) + 1
+        self.lines = [(item.group(3) or "").strip()]
+
+    def _add_row(self, cells: List[str]) -> None:
+        row = []
+        for cell, alignment in zip(cells, self.alignments):
+            content: Dict[str, Any] = {"runs": parse_inline(cell)}
+            if alignment:
+                content["alignment"] = alignment
+            row.append(content)
+        self.rows.append(row)
+
+    def _flush_table(self) -> Iterator[Dict[str, Any]]:
+        if self.alignments is not None:
+            yield {"type": "table", "rows": self.rows, "header": True}
+            self.alignments = None
+            self.rows = []
+
+    def _flush_paragraph(self, keep_style: bool = False) -> Iterator[Dict[str, Any]]:
+        if self.lines:
+            text = self._paragraph_text()
+            image = _LONE_IMAGE.match(text)
+            if image and self.style is None:
+                yield self._image_block(image.group(1), image.group(2))
+            else:
+                runs = parse_inline(text)
+                if runs:
+                    block: Dict[str, Any] = {"type": "paragraph", "runs": runs}
+                    if self.style:
+                        block["style"] = self.style
+                    if self.list_start is not None:
+                        block["list_start"] = self.list_start
+                    yield block
+            self.lines = []
+        self.list_start = None
+        if not keep_style:
+            self.style = None
+
+    def _paragraph_text(self) -> str:
+        """Join the paragraph's lines, keeping hard line breaks."""
+        last = len(self.lines) - 1
+        parts = []
+        for index, line in enumerate(self.lines):
+            if index == last:
+                parts.append(line.rstrip())
+            elif line.endswith("  "):
+                parts.append(line.rstrip() + "\n")
+            elif line.endswith("\\") and not line.endswith("\\\\"):
+                parts.append(line[:-1] + "\n")
+            else:
+                parts.append(line.rstrip() + " ")
+        return "".join(parts)
+
+    def _image_block(self, alt: str, source: str) -> Dict[str, Any]:
+        """Image block for a local image, or a paragraph with its alternative text."""
+        if not _REMOTE.match(source):
+            path = unquote(source)
+            if not os.path.isabs(path):
+                path = os.path.join(self.base_dir or os.getcwd(), path)
+            if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS and os.path.isfile(path):
+                return {"type": "image", "path": path}
+            return {"type": "paragraph", "runs": parse_inline(alt) or [{"text": source}]}
+        runs = parse_inline(alt) or [{"text": source}]
+        for run in runs:
+            run["link"] = source
+        return {"type": "paragraph", "runs": runs}
+
+
+def _code_block(text: str) -> Dict[str, Any]:
+    """One line of a code block, as a paragraph."""
+    return {"type": "paragraph", "style": CODE_STYLE,
+            "runs": [{"text": text, "font_name": CODE_FONT}] if text else []}
+
+
+def iter_markdown_blocks(lines: Iterable[str], base_dir: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Convert Markdown to document builder blocks as it is read.
+
+    Args:
+        lines: Markdown lines, e.g. an open file
+        base_dir: Directory relative image paths are resolved against
+                  (defaults to the working directory)
+
+    Yields:
+        Builder blocks, each as soon as the lines completing it are read
+    """
+    reader = _MarkdownReader(base_dir)
+    for line in lines:
+        yield from reader.feed(line)
+    yield from reader.finish()
+
+
+def markdown_blocks(markdown_or_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Convert Markdown text or a Markdown file to builder blocks.
+
+    Files are read lazily, one line at a time.
+
+    Args:
+        markdown_or_path: Markdown text, or the path of a Markdown file
+
+    Yields:
+        Builder blocks
+    """
+    if "\n" not in markdown_or_path and os.path.isfile(markdown_or_path):
+        base_dir = os.path.dirname(os.path.abspath(markdown_or_path))
+        with open(markdown_or_path, encoding="utf-8-sig") as f:
+            yield from iter_markdown_blocks(f, base_dir)
+    else:
+        yield from iter_markdown_blocks(io.StringIO(markdown_or_path))
@@ -5,7 +5,107 @@ import os
 import json
 import hashlib
 import datetime
-from typing import Dict, List, Tuple, Optional, Any
+import shutil
+import tempfile
+from typing import Callable, Dict, List, Tuple, Optional, Any
+
+from word_document_server.utils.package_reader import release_package_reader
+
+
+def replace_file_atomically(path: str, write: Callable[[Any], None]) -> None:
+    """
+    Replace a file with new content without ever leaving it half written.
+
+    The content is written to a temporary file in the same directory, flushed
+    to disk and then renamed over the original, so a failure at any point
+    leaves the original file untouched.
+
+    Args:
+        path: Path of the file to replace
+        write: Function that writes the new content to a binary file object
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        release_package_reader(path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def encrypt_file(path: str, password: str) -> None:
+    """
+    Encrypt a Word document in place with a password.
+
+    The document is read from the open file and the encrypted package is
+    written straight to a temporary file, which atomically replaces the
+    original. Each call generates a new salt and data key. The document's
+    edit journal is deleted, since it holds earlier content in plain form.
+
+    Args:
+        path: Path to the document
+        password: Password to encrypt the document with
+
+    Raises:
+        ValueError: If the document is already encrypted
+    """
+    import msoffcrypto
+    from word_document_server.core.encryption import encrypt_stream
+    from word_document_server.utils.edit_journal import get_edit_journal
+
+    with open(path, "rb") as infile:
+        if msoffcrypto.OfficeFile(infile).is_encrypted():
+            raise ValueError("document is already encrypted")
+        infile.seek(0)
+        replace_file_atomically(path, lambda outfile: encrypt_stream(infile, outfile, password))
+    get_edit_journal().purge(path)
+
+
+def decrypt_file(path: str, password: str) -> None:
+    """
+    Decrypt a password-protected Word document in place.
+
+    Args:
+        path: Path to the document
+        password: Password the document was encrypted with
+
+    Raises:
+        msoffcrypto.exceptions.InvalidKeyError: If the password is incorrect
+        msoffcrypto.exceptions.DecryptionError: If the file is not encrypted
+    """
+    from word_document_server.core.encryption import decrypt_stream
+
+    with open(path, "rb") as infile:
+        replace_file_atomically(path, lambda outfile: decrypt_stream(infile, outfile, password))
+
+
+def protect_file(path: str, password: str) -> str:
+    """
+    Encrypt a document and drop its protection metadata file.
+
+    Top-level so it can run in a worker process.
+
+    Args:
+        path: Path to the document
+        password: Password to encrypt the document with
+
+    Returns:
+        Path of the encrypted document
+    """
+    encrypt_file(path, password)
+    base_path, _ = os.path.splitext(path)
+    metadata_path = f"{base_path}.protection"
+    if os.path.exists(metadata_path):
+        os.remove(metadata_path)
+    return path
 
 
 def add_protection_info(doc_path: str, protection_type: str, password_hash: str, 
@@ -50,28 +150,8 @@ def add_protection_info(doc_path: str, protection_type: str, password_hash: str,
         
         # Apply actual document encryption if raw_password is provided
         if protection_type == "password" and raw_password:
-            import msoffcrypto
-            import tempfile
-            import shutil
-            
-            # Create a temporary file for the encrypted output
-            temp_fd, temp_path = tempfile.mkstemp(suffix='.docx')
-            os.close(temp_fd)
-            
             try:
-                # Open the document
-                with open(doc_path, 'rb') as f:
-                    office_file = msoffcrypto.OfficeFile(f)
-                    
-                    # Encrypt with password
-                    office_file.load_key(password=raw_password)
-                    
-                    # Write the encrypted file to the temp path
-                    with open(temp_path, 'wb') as out_file:
-                        office_file.encrypt(out_file)
-                
-                # Replace original with encrypted version
-                shutil.move(temp_path, doc_path)
+                encrypt_file(doc_path, raw_password)
                 
                 # Update metadata to note that true encryption was applied
                 protection_data["true_encryption"] = True
@@ -80,8 +160,6 @@ def add_protection_info(doc_path: str, protection_type: str, password_hash: str,
                     
             except Exception as e:
                 print(f"Encryption error: {str(e)}")
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
                 return False
         
         return True
@@ -165,7 +243,8 @@ def is_section_editable(doc_path: str, section_name: str) -> bool:
         return False
 
 
-def create_signature_info(doc, signer_name: str, reason: Optional[str] = None) -> Dict[str, Any]:
+def create_signature_info(doc, signer_name: str, reason: Optional[str] = None,
+                          hash_tree: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Create signature information for a document.
     
@@ -173,6 +252,9 @@ def create_signature_info(doc, signer_name: str, reason: Optional[str] = None) -
         doc: Document object
         signer_name: Name of the person signing the document
         reason: Optional reason for signing
+        hash_tree: Optional hash tree of the saved document (see
+                   core.signatures.build_hash_tree); when given, verification
+                   covers every part and reports changed sections
         
     Returns:
         Dictionary containing signature information
@@ -186,6 +268,11 @@ def create_signature_info(doc, signer_name: str, reason: Optional[str] = None) -
     if reason:
         signature_info["reason"] = reason
     
+    if hash_tree:
+        signature_info["content_hash"] = hash_tree["content_hash"]
+        signature_info["hash_tree"] = hash_tree
+        return signature_info
+    
     # Generate a simple signature hash based on document content and metadata
     text_content = "\n".join([p.text for p in doc.paragraphs])
     content_hash = hashlib.sha256(text_content.encode()).hexdigest()
@@ -204,39 +291,10 @@ def verify_signature(doc_path: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, message)
     """
-    from docx import Document
-    
-    base_path, _ = os.path.splitext(doc_path)
-    metadata_path = f"{base_path}.protection"
-    
-    if not os.path.exists(metadata_path):
-        return False, "Document is not signed"
+    from word_document_server.core.signatures import verify_signature_file
     
     try:
-        # Read protection data
-        with open(metadata_path, 'r') as f:
-            protection_data = json.load(f)
-        
-        if protection_data.get("type") != "signature":
-            return False, f"Document is protected with {protection_data.get('type')} protection, not a signature"
-        
-        # Get the original content hash
-        signature_info = protection_data.get("signature", {})
-        original_hash = signature_info.get("content_hash")
-        
-        if not original_hash:
-            return False, "Invalid signature: missing content hash"
-        
-        # Calculate current content hash
-        doc = Document(doc_path)
-        text_content = "\n".join([p.text for p in doc.paragraphs])
-        current_hash = hashlib.sha256(text_content.encode()).hexdigest()
-        
-        # Compare hashes
-        if current_hash != original_hash:
-            return False, f"Document has been modified since it was signed by {signature_info.get('signer')}"
-        
-        return True, f"Document signature is valid. Signed by {signature_info.get('signer')} on {signature_info.get('timestamp')}"
-    
+        result = verify_signature_file(doc_path)
+        return result["status"] == "valid", result["message"]
     except Exception as e:
         return False, f"Error verifying signature: {str(e)}"
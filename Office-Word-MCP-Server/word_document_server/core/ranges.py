@@ -0,0 +1,147 @@
+"""
+Paragraph range operations for Word Document Server.
+
+A range covers the body elements from one paragraph through another,
+including any tables between them, so it can be deleted, moved or replaced
+in a single pass over the body instead of one paragraph at a time.
+"""
+from typing import List, Optional, Tuple
+
+from docx.oxml.ns import qn
+
+
+W_SECT_PR = qn('w:sectPr')
+
+
+def validate_paragraph_range(doc, start_index: int, end_index: int) -> Optional[str]:
+    """
+    Check a paragraph range against a document.
+
+    Args:
+        doc: Document object
+        start_index: Index of the first paragraph (0-based)
+        end_index: Index of the last paragraph (inclusive)
+
+    Returns:
+        Error message, or None if the range is valid
+    """
+    count = len(doc.paragraphs)
+    if start_index < 0 or end_index >= count or start_index > end_index:
+        return (f"Invalid paragraph range {start_index}-{end_index}. "
+                f"Document has {count} paragraphs (0-{count - 1}).")
+    return None
+
+
+def get_range_elements(doc, start_index: int, end_index: int) -> List:
+    """
+    Get the body elements from one paragraph through another.
+
+    Args:
+        doc: Document object
+        start_index: Index of the first paragraph (0-based)
+        end_index: Index of the last paragraph (inclusive)
+
+    Returns:
+        List of body child elements in document order
+    """
+    paragraphs = doc.paragraphs
+    first = paragraphs[start_index]._p
+    last = paragraphs[end_index]._p
+
+    elements = []
+    element = first
+    while element is not None:
+        elements.append(element)
+        if element is last:
+            break
+        element = element.getnext()
+    return elements
+
+
+def count_tables(elements: List) -> int:
+    """Count the tables in a list of body elements."""
+    return sum(1 for element in elements if element.tag == qn('w:tbl'))
+
+
+def delete_range(doc, start_index: int, end_index: int) -> Tuple[int, int]:
+    """
+    Remove the body elements from one paragraph through another.
+
+    Args:
+        doc: Document object
+        start_index: Index of the first paragraph (0-based)
+        end_index: Index of the last paragraph (inclusive)
+
+    Returns:
+        Tuple of (paragraphs removed, tables removed)
+    """
+    elements = get_range_elements(doc, start_index, end_index)
+    body = elements[0].getparent()
+    for element in elements:
+        body.remove(element)
+    tables = count_tables(elements)
+    return len(elements) - tables, tables
+
+
+def move_range(doc, start_index: int, end_index: int, target_index: int) -> int:
+    """
+    Move the body elements from one paragraph through another.
+
+    Args:
+        doc: Document object
+        start_index: Index of the first paragraph (0-based)
+        end_index: Index of the last paragraph (inclusive)
+        target_index: Index (before the move) of the paragraph to insert the range
+                      before; the paragraph count moves the range to the end of
+                      the document
+
+    Returns:
+        Number of elements moved
+    """
+    paragraphs = doc.paragraphs
+    elements = get_range_elements(doc, start_index, end_index)
+    body = elements[0].getparent()
+
+    if target_index < len(paragraphs):
+        anchor = paragraphs[target_index]._p
+        for element in elements:
+            anchor.addprevious(element)
+    else:
+        # The section properties must stay the last body element
+        sect_pr = body.find(W_SECT_PR)
+        for element in elements:
+            if sect_pr is not None:
+                sect_pr.addprevious(element)
+            else:
+                body.append(element)
+    return len(elements)
+
+
+def replace_range(doc, start_index: int, end_index: int, texts: List[str],
+                  style: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Replace the body elements from one paragraph through another with new paragraphs.
+
+    Args:
+        doc: Document object
+        start_index: Index of the first paragraph (0-based)
+        end_index: Index of the last paragraph (inclusive)
+        texts: Text of each new paragraph
+        style: Optional style, or style name, for the new paragraphs; defaults
+               to the style of the first replaced paragraph
+
+    Returns:
+        Tuple of (elements removed, paragraphs inserted)
+    """
+    first = doc.paragraphs[start_index]
+    if style is None:
+        style = first.style
+
+    elements = get_range_elements(doc, start_index, end_index)
+    for text in texts:
+        first.insert_paragraph_before(text, style)
+
+    body = elements[0].getparent()
+    for element in elements:
+        body.remove(element)
+    return len(elements), len(texts)
@@ -0,0 +1,379 @@
+"""
+Run-splitting engine for Word Document Server.
+
+Character ranges within a paragraph are formatted by splitting only the runs
+that straddle a range boundary, so the text, formatting and other content of
+every other run is left untouched. All spans for a paragraph are split in a
+single pass over its runs.
+
+Character offsets follow Paragraph.text: run text inside hyperlinks counts,
+and tabs and line breaks count as one character each.
+"""
+import re
+import bisect
+from copy import deepcopy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+from docx.enum.text import WD_COLOR_INDEX
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+
+FORMAT_KEYS = ("bold", "italic", "underline", "color", "font_size", "font_name", "highlight")
+
+# Common color names accepted in addition to hex RGB values
+COLOR_MAP = {
+    'red': RGBColor(255, 0, 0),
+    'blue': RGBColor(0, 0, 255),
+    'green': RGBColor(0, 128, 0),
+    'yellow': RGBColor(255, 255, 0),
+    'black': RGBColor(0, 0, 0),
+    'gray': RGBColor(128, 128, 128),
+    'white': RGBColor(255, 255, 255),
+    'purple': RGBColor(128, 0, 128),
+    'orange': RGBColor(255, 165, 0)
+}
+
+# Run children that contribute to the run's text
+TEXT_TAGS = {qn('w:t'), qn('w:tab'), qn('w:br'), qn('w:cr'), qn('w:noBreakHyphen'), qn('w:ptab')}
+W_RPR = qn('w:rPr')
+W_P = qn('w:p')
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+def normalize_formatting(formatting: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate formatting options and convert them to python-docx values.
+
+    Args:
+        formatting: Dictionary with any of bold, italic, underline (bool), color
+                    (name or hex RGB), font_size (points), font_name and highlight
+                    (highlight color name, e.g. 'yellow' or 'bright_green')
+
+    Returns:
+        Dictionary of the options that are set
+
+    Raises:
+        ValueError: If an option is unknown or has an invalid value
+    """
+    unknown = sorted(set(formatting) - set(FORMAT_KEYS))
+    if unknown:
+        raise ValueError(f"unknown formatting option(s): {', '.join(unknown)}")
+
+    normalized = {}
+    for key in ("bold", "italic", "underline"):
+        if formatting.get(key) is not None:
+            normalized[key] = bool(formatting[key])
+
+    color = formatting.get("color")
+    if color:
+        if color.lower() in COLOR_MAP:
+            normalized["color"] = COLOR_MAP[color.lower()]
+        else:
+            try:
+                normalized["color"] = RGBColor.from_string(color.lstrip('#'))
+            except ValueError:
+                raise ValueError(f"invalid color '{color}'")
+
+    if formatting.get("font_size"):
+        try:
+            normalized["font_size"] = Pt(float(formatting["font_size"]))
+        except (ValueError, TypeError):
+            raise ValueError("font_size must be a number")
+
+    if formatting.get("font_name"):
+        normalized["font_name"] = str(formatting["font_name"])
+
+    highlight = formatting.get("highlight")
+    if highlight:
+        try:
+            normalized["highlight"] = WD_COLOR_INDEX[str(highlight).upper()]
+        except KeyError:
+            raise ValueError(f"invalid highlight color '{highlight}'")
+
+    return normalized
+
+
+def apply_run_formatting(run: Run, formatting: Dict[str, Any]) -> None:
+    """
+    Apply normalized formatting to a run.
+
+    Args:
+        run: python-docx Run
+        formatting: Output of normalize_formatting()
+    """
+    if "bold" in formatting:
+        run.bold = formatting["bold"]
+    if "italic" in formatting:
+        run.italic = formatting["italic"]
+    if "underline" in formatting:
+        run.underline = formatting["underline"]
+    if "color" in formatting:
+        run.font.color.rgb = formatting["color"]
+    if "font_size" in formatting:
+        run.font.size = formatting["font_size"]
+    if "font_name" in formatting:
+        run.font.name = formatting["font_name"]
+    if "highlight" in formatting:
+        run.font.highlight_color = formatting["highlight"]
+
+
+def _format_run(r, paragraph, formatting: Dict[str, Any], cache: Dict) -> None:
+    """
+    Apply formatting to a run element, reusing the run properties computed for an
+    earlier run that had the same properties.
+
+    Setting properties through python-docx costs a schema-ordered child lookup per
+    property, which dominates when thousands of runs are formatted; runs split
+    from the same original run share their properties, so most are cache hits.
+    """
+    rPr = r.find(W_RPR)
+    key = (id(formatting), b"" if rPr is None else etree.tostring(rPr))
+    if key in cache:
+        formatted = cache[key]
+        if rPr is not None:
+            r.remove(rPr)
+        if formatted is not None:
+            r.insert(0, deepcopy(formatted))
+        return
+    apply_run_formatting(Run(r, paragraph), formatting)
+    formatted = r.find(W_RPR)
+    cache[key] = None if formatted is None else deepcopy(formatted)
+
+
+def _text_length(element) -> int:
+    """Number of characters a run child contributes to the paragraph text."""
+    if element.tag in TEXT_TAGS:
+        return len(str(element))
+    return 0
+
+
+def _run_length(r) -> int:
+    return sum(_text_length(child) for child in r)
+
+
+def split_run(r, offset: int):
+    """
+    Split a run element in two at a character offset.
+
+    The run keeps the text before the offset; a copy with the same properties,
+    inserted directly after it, receives the rest.
+
+    Args:
+        r: w:r element
+        offset: Character offset within the run, greater than zero and less than
+                the run's text length
+
+    Returns:
+        The new w:r element holding the text from the offset on
+    """
+    right = deepcopy(r)
+    position = 0
+    for left_child, right_child in zip(list(r), list(right)):
+        if left_child.tag == W_RPR:
+            continue
+        length = _text_length(left_child)
+        if position + length <= offset and (length or position < offset):
+            # Entirely before the split
+            right.remove(right_child)
+        elif position >= offset:
+            # Entirely after the split
+            r.remove(left_child)
+        else:
+            # A w:t straddling the split
+            text = left_child.text or ""
+            cut = offset - position
+            left_child.text = text[:cut]
+            right_child.text = text[cut:]
+            left_child.set(XML_SPACE, 'preserve')
+            right_child.set(XML_SPACE, 'preserve')
+        position += length
+    r.addnext(right)
+    return right
+
+
+def split_runs_at(p, offsets: Iterable[int]) -> List[Tuple[int, int, Any]]:
+    """
+    Split the runs of a paragraph so that every offset falls on a run boundary.
+
+    Args:
+        p: w:p element
+        offsets: Character offsets within the paragraph text
+
+    Returns:
+        List of (start, end, w:r element) for the runs that hold text, in
+        document order
+    """
+    cuts = sorted(set(offsets))
+    segments = []
+    position = 0
+    for r in p.xpath("./w:r | ./w:hyperlink/w:r"):
+        length = _run_length(r)
+        end = position + length
+        # Cut points strictly inside this run, from last to first so earlier
+        # offsets stay valid
+        first = bisect.bisect_right(cuts, position)
+        last = bisect.bisect_left(cuts, end)
+        inner = cuts[first:last]
+        pieces = []
+        for cut in reversed(inner):
+            pieces.append((cut, split_run(r, cut - position)))
+        bounds = [position] + inner + [end]
+        runs = [r] + [piece for _, piece in reversed(pieces)]
+        for i, run in enumerate(runs):
+            if bounds[i + 1] > bounds[i]:
+                segments.append((bounds[i], bounds[i + 1], run))
+        position = end
+    return segments
+
+
+def format_paragraph_spans(paragraph, spans: List[Tuple[int, int, Dict[str, Any]]],
+                           cache: Optional[Dict] = None) -> int:
+    """
+    Format character ranges of a paragraph, splitting only the affected runs.
+
+    Spans are applied in order, so a later span overrides an earlier one where
+    they overlap.
+
+    Args:
+        paragraph: python-docx Paragraph
+        spans: List of (start, end, formatting) with formatting as returned by
+               normalize_formatting(); end is exclusive
+        cache: Optional dictionary of formatted run properties, shared across
+               paragraphs formatted in one operation
+
+    Returns:
+        Number of runs formatted
+    """
+    if cache is None:
+        cache = {}
+    offsets = [offset for start, end, _ in spans for offset in (start, end)]
+    segments = split_runs_at(paragraph._p, offsets)
+    starts = [segment[0] for segment in segments]
+
+    formatted = 0
+    for start, end, formatting in spans:
+        index = bisect.bisect_left(starts, start)
+        while index < len(segments) and segments[index][1] <= end:
+            _format_run(segments[index][2], paragraph, formatting, cache)
+            formatted += 1
+            index += 1
+    return formatted
+
+
+def validate_span(paragraphs, paragraph_index: int, start_pos: int, end_pos: int) -> Optional[str]:
+    """
+    Check a character range against the paragraphs of a document.
+
+    Args:
+        paragraphs: List of python-docx Paragraphs
+        paragraph_index: Index of the paragraph
+        start_pos: Start position within the paragraph text
+        end_pos: End position within the paragraph text (exclusive)
+
+    Returns:
+        Error message, or None if the range is valid
+    """
+    if paragraph_index < 0 or paragraph_index >= len(paragraphs):
+        return f"Invalid paragraph index {paragraph_index}. Document has {len(paragraphs)} paragraphs (0-{len(paragraphs)-1})."
+    length = len(paragraphs[paragraph_index].text)
+    if start_pos < 0 or end_pos > length or start_pos >= end_pos:
+        return f"Invalid text positions {start_pos}-{end_pos} in paragraph {paragraph_index}. Paragraph has {length} characters."
+    return None
+
+
+def format_document_spans(paragraphs, spans: List[Tuple[int, int, int, Dict[str, Any]]]) -> int:
+    """
+    Format character ranges across the paragraphs of a document.
+
+    Args:
+        paragraphs: List of python-docx Paragraphs
+        spans: List of (paragraph_index, start, end, formatting) with formatting as
+               returned by normalize_formatting()
+
+    Returns:
+        Number of runs formatted
+    """
+    by_paragraph: Dict[int, List[Tuple[int, int, Dict[str, Any]]]] = {}
+    for paragraph_index, start, end, formatting in spans:
+        by_paragraph.setdefault(paragraph_index, []).append((start, end, formatting))
+
+    formatted = 0
+    cache = {}
+    for paragraph_index, paragraph_spans in by_paragraph.items():
+        formatted += format_paragraph_spans(paragraphs[paragraph_index], paragraph_spans, cache)
+    return formatted
+
+
+def compile_search_pattern(pattern: str, regex: bool = False, match_case: bool = True,
+                           whole_word: bool = False):
+    """
+    Compile a search pattern.
+
+    Args:
+        pattern: Literal text, or a regular expression if regex is True
+        regex: Whether pattern is a regular expression
+        match_case: Whether to match case
+        whole_word: Whether matches must start and end at word boundaries
+
+    Returns:
+        Compiled regular expression
+
+    Raises:
+        re.error: If the regular expression is invalid
+    """
+    expression = pattern if regex else re.escape(pattern)
+    if whole_word:
+        expression = rf"\b(?:{expression})\b"
+    return re.compile(expression, 0 if match_case else re.IGNORECASE)
+
+
+def iter_document_paragraphs(doc, include_tables: bool = True):
+    """
+    Iterate over the paragraphs of a document body in document order.
+
+    Args:
+        doc: Document object
+        include_tables: Whether to include paragraphs inside tables, including
+                        nested tables, each merged cell counted once
+
+    Yields:
+        python-docx Paragraphs
+    """
+    if not include_tables:
+        yield from doc.paragraphs
+        return
+    body = doc._body
+    for p in list(doc.element.body.iter(W_P)):
+        yield Paragraph(p, body)
+
+
+def format_pattern_matches(paragraphs, compiled, formatting: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Format every match of a pattern, one paragraph at a time.
+
+    Matches are found in each paragraph's text and formatted immediately, so
+    offsets never drift between searching and formatting.
+
+    Args:
+        paragraphs: Iterable of python-docx Paragraphs
+        compiled: Compiled regular expression
+        formatting: Output of normalize_formatting()
+
+    Returns:
+        Tuple of (matches formatted, paragraphs changed)
+    """
+    matches = 0
+    changed = 0
+    cache = {}
+    for paragraph in paragraphs:
+        spans = [(match.start(), match.end(), formatting)
+                 for match in compiled.finditer(paragraph._p.text) if match.end() > match.start()]
+        if spans:
+            format_paragraph_spans(paragraph, spans, cache)
+            matches += len(spans)
+            changed += 1
+    return matches, changed
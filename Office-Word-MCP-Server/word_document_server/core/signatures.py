@@ -0,0 +1,397 @@
+"""
+Content hash trees for digital signatures.
+
+A signature records a hash tree of the signed package instead of a single
+hash of the document text:
+
+- a SHA-256 hash of every part in the package, computed by streaming the
+  part out of the zip;
+- a hash of the text of every section of the body, where a section starts at
+  each heading (or the start of the document) and tables count as part of
+  the section they are in;
+- a root hash over both, so an unchanged document is recognized by comparing
+  one value.
+
+Building the tree never loads the document with python-docx. Parts are
+read through the package reader. word/document.xml is parsed incrementally,
+and each body element is discarded as soon as it is hashed, so memory stays
+bounded for large documents.
+When the roots differ, the stored and current trees are compared to report
+which parts and sections changed.
+
+The tree also carries the legacy ``content_hash`` (SHA-256 of the body
+paragraph texts joined with newlines), so signatures made before hash trees
+existed still verify.
+"""
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+from word_document_server.utils.package_reader import (
+    W_BODY, W_P, W_TBL, W_PPR, W_PSTYLE, W_VAL, get_package_reader
+)
+from word_document_server.utils.xml_utils import get_paragraph_element_text
+
+
+W_OUTLINE_LVL = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}outlineLvl"
+
+HASH_ALGORITHM = "sha256"
+HASH_TREE_VERSION = 1
+
+CHUNK_SIZE = 1024 * 1024
+
+# Directories holding less than this are verified in-process, where starting
+# worker processes would cost more than the hashing itself
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+
+
+def _is_heading(p) -> bool:
+    pPr = p.find(W_PPR)
+    if pPr is None:
+        return False
+    style = pPr.find(W_PSTYLE)
+    if style is not None:
+        style_id = style.get(W_VAL, "")
+        if style_id == "Title" or style_id.startswith("Heading"):
+            return True
+    return pPr.find(W_OUTLINE_LVL) is not None
+
+
+class _HashingReader:
+    """File wrapper that hashes everything read through it."""
+
+    def __init__(self, stream, digest):
+        self._stream = stream
+        self._digest = digest
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._digest.update(data)
+        return data
+
+
+def _hash_stream(stream, digest) -> None:
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+
+
+def _hash_sections(stream) -> Dict[str, Any]:
+    """
+    Hash the body of word/document.xml section by section.
+
+    Returns:
+        Dictionary with the legacy content_hash and the list of sections
+    """
+    content = hashlib.sha256()
+    sections: List[Dict[str, Any]] = []
+    section = None
+    section_digest = None
+    paragraph_index = 0
+
+    def close_section():
+        if section is not None:
+            section["hash"] = section_digest.hexdigest()
+            sections.append(section)
+
+    for _, element in etree.iterparse(stream, events=("end",), tag=(W_P, W_TBL), huge_tree=True):
+        parent = element.getparent()
+        if parent is None or parent.tag != W_BODY:
+            continue
+
+        if element.tag == W_P:
+            text = get_paragraph_element_text(element)
+            if paragraph_index:
+                content.update(b"\n")
+            content.update(text.encode("utf-8"))
+            if section is None or _is_heading(element):
+                close_section()
+                section = {"title": text[:80], "start": paragraph_index, "paragraphs": 0}
+                section_digest = hashlib.sha256()
+            section["paragraphs"] += 1
+            section_digest.update(b"p\0" + text.encode("utf-8") + b"\0")
+            paragraph_index += 1
+        else:
+            if section is None:
+                section = {"title": "", "start": paragraph_index, "paragraphs": 0}
+                section_digest = hashlib.sha256()
+            section_digest.update(b"t\0")
+            for p in element.iter(W_P):
+                section_digest.update(get_paragraph_element_text(p).encode("utf-8") + b"\0")
+
+        # Body elements are only needed once; drop them to bound memory
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+
+    close_section()
+    return {"content_hash": content.hexdigest(), "sections": sections}
+
+
+def _tree_root(parts: Dict[str, str], sections: List[Dict[str, Any]]) -> str:
+    parts_root = hashlib.sha256()
+    for name in sorted(parts):
+        parts_root.update(f"{name}\0{parts[name]}\n".encode("utf-8"))
+    sections_root = hashlib.sha256()
+    for section in sections:
+        sections_root.update(bytes.fromhex(section["hash"]))
+    return hashlib.sha256(parts_root.digest() + sections_root.digest()).hexdigest()
+
+
+def build_hash_tree(path: str) -> Dict[str, Any]:
+    """
+    Build the hash tree of a document by streaming it from disk.
+
+    Args:
+        path: Path to the .docx file
+
+    Returns:
+        Dictionary with algorithm, version, root, content_hash, parts (part name
+        to hash) and sections (title, start paragraph index, paragraph count and
+        hash of each section)
+    """
+    parts = {}
+    sections = None
+    # Signatures cover the file on disk, never unsaved session changes
+    reader = get_package_reader(path, use_session=False)
+    for name in reader.names():
+        if name.endswith("/"):
+            continue
+        digest = hashlib.sha256()
+        if name == reader.document_part:
+            with reader.open(name) as stream:
+                sections = _hash_sections(_HashingReader(stream, digest))
+                # Hash whatever the parser did not need to read
+                _hash_stream(stream, digest)
+        elif reader.size(name) > CHUNK_SIZE:
+            with reader.open(name) as stream:
+                _hash_stream(stream, digest)
+        else:
+            digest.update(reader.read(name))
+        parts[name] = digest.hexdigest()
+
+    if sections is None:
+        raise ValueError(f"{path} has no {reader.document_part} part")
+
+    return {
+        "algorithm": HASH_ALGORITHM,
+        "version": HASH_TREE_VERSION,
+        "root": _tree_root(parts, sections["sections"]),
+        "content_hash": sections["content_hash"],
+        "parts": parts,
+        "sections": sections["sections"],
+    }
+
+
+def compare_hash_trees(signed: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compare the hash tree recorded at signing with the current one.
+
+    Sections are matched by hash first, so moving an unchanged section is not
+    reported as a change; the remaining signed sections are reported as changed
+    or removed and the remaining current sections as added.
+
+    Args:
+        signed: Hash tree stored with the signature
+        current: Hash tree of the document now
+
+    Returns:
+        Dictionary with unchanged (bool), content_changed (bool) and the lists
+        changed_parts, added_parts, removed_parts, changed_sections,
+        added_sections and removed_sections
+    """
+    if signed.get("root") == current["root"]:
+        return {"unchanged": True, "content_changed": False, "changed_parts": [], "added_parts": [],
+                "removed_parts": [], "changed_sections": [], "added_sections": [], "removed_sections": []}
+
+    signed_parts = signed.get("parts", {})
+    current_parts = current["parts"]
+
+    current_hashes = {}
+    for section in current["sections"]:
+        current_hashes.setdefault(section["hash"], []).append(section)
+    unmatched_signed = []
+    for section in signed.get("sections", []):
+        matches = current_hashes.get(section["hash"])
+        if matches:
+            matches.pop(0)
+        else:
+            unmatched_signed.append(section)
+    unmatched_current = [section for matches in current_hashes.values() for section in matches]
+    unmatched_current.sort(key=lambda section: section["start"])
+
+    # A signed section whose title still exists was edited; otherwise it is gone
+    current_by_title = {}
+    for section in unmatched_current:
+        current_by_title.setdefault(section["title"], []).append(section)
+    changed, removed = [], []
+    for section in unmatched_signed:
+        candidates = current_by_title.get(section["title"])
+        if candidates:
+            now = candidates.pop(0)
+            changed.append({"title": section["title"], "signed_start": section["start"],
+                            "start": now["start"], "paragraphs": now["paragraphs"]})
+        else:
+            removed.append({"title": section["title"], "signed_start": section["start"],
+                            "paragraphs": section["paragraphs"]})
+    added = [{"title": section["title"], "start": section["start"], "paragraphs": section["paragraphs"]}
+             for matches in current_by_title.values() for section in matches]
+    added.sort(key=lambda section: section["start"])
+
+    return {
+        "unchanged": False,
+        "content_changed": signed.get("content_hash") != current["content_hash"],
+        "changed_parts": sorted(name for name in signed_parts
+                                if name in current_parts and signed_parts[name] != current_parts[name]),
+        "added_parts": sorted(name for name in current_parts if name not in signed_parts),
+        "removed_parts": sorted(name for name in signed_parts if name not in current_parts),
+        "changed_sections": changed,
+        "added_sections": added,
+        "removed_sections": removed,
+    }
+
+
+def verify_signature_file(path: str, signature_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Verify a signed document against its .protection metadata.
+
+    Top-level and free of python-docx, so it can run in a worker process.
+
+    Args:
+        path: Path to the .docx file
+        signature_info: Signature from the metadata file; read from the
+                        document's .protection file if not given
+
+    Returns:
+        Dictionary with path, status ('valid', 'modified', 'unsigned' or
+        'error'), signer, timestamp, message and, for hash tree signatures,
+        the comparison from compare_hash_trees()
+    """
+    result: Dict[str, Any] = {"path": path}
+    if signature_info is None:
+        base_path, _ = os.path.splitext(path)
+        metadata_path = f"{base_path}.protection"
+        if not os.path.exists(metadata_path):
+            return {**result, "status": "unsigned", "message": "Document is not signed"}
+        with open(metadata_path, "r") as f:
+            protection_data = json.load(f)
+        if protection_data.get("type") != "signature":
+            return {**result, "status": "unsigned",
+                    "message": f"Document is protected with {protection_data.get('type')} protection, not a signature"}
+        signature_info = protection_data.get("signature", {})
+
+    signer = signature_info.get("signer")
+    result.update({"signer": signer, "timestamp": signature_info.get("timestamp")})
+
+    signed_tree = signature_info.get("hash_tree")
+    if signed_tree:
+        current = build_hash_tree(path)
+        comparison = compare_hash_trees(signed_tree, current)
+        result["changes"] = comparison
+        if comparison["unchanged"]:
+            return {**result, "status": "valid",
+                    "message": f"Document signature is valid. Signed by {signer} on {result['timestamp']}"}
+        sections = len(comparison["changed_sections"]) + len(comparison["added_sections"]) \
+            + len(comparison["removed_sections"])
+        parts = len(comparison["changed_parts"]) + len(comparison["added_parts"]) \
+            + len(comparison["removed_parts"])
+        return {**result, "status": "modified",
+                "message": f"Document has been modified since it was signed by {signer} "
+                           f"({sections} section(s) and {parts} part(s) differ)"}
+
+    original_hash = signature_info.get("content_hash")
+    if not original_hash:
+        return {**result, "status": "error", "message": "Invalid signature: missing content hash"}
+
+    # Signatures made before hash trees only cover the body text
+    current = build_hash_tree(path)
+    if current["content_hash"] != original_hash:
+        return {**result, "status": "modified",
+                "message": f"Document has been modified since it was signed by {signer}"}
+    return {**result, "status": "valid",
+            "message": f"Document signature is valid. Signed by {signer} on {result['timestamp']}"}
+
+
+def verify_protected_file(path: str) -> Dict[str, Any]:
+    """
+    Verify one document for a directory report, timing the check.
+
+    Errors are reported in the result rather than raised, so one unreadable
+    document does not fail a batch.
+
+    Args:
+        path: Path to the .docx file
+
+    Returns:
+        Result of verify_signature_file() with a seconds entry added
+    """
+    start = time.perf_counter()
+    try:
+        result = verify_signature_file(path)
+    except Exception as e:
+        result = {"path": path, "status": "error", "message": str(e)}
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def verify_directory(directory: str, recursive: bool = False,
+                     max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Verify every document in a directory that has .protection metadata.
+
+    Documents are verified in a pool of worker processes, each streaming the
+    document from disk; small directories are verified in-process.
+
+    Args:
+        directory: Directory to search for .protection files
+        recursive: If True, include subdirectories
+        max_workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        Report with counts per status, timing and a per-document result list
+        sorted by path
+    """
+    from word_document_server.utils.batch_utils import find_documents, iter_process_pool
+
+    start = time.perf_counter()
+    results = []
+    jobs = []
+    for metadata_path in find_documents(directory, recursive, extension=".protection"):
+        base_path, _ = os.path.splitext(metadata_path)
+        path = f"{base_path}.docx"
+        if os.path.exists(path):
+            jobs.append((path,))
+        else:
+            results.append({"path": path, "status": "missing", "seconds": 0.0,
+                            "message": f"Metadata {metadata_path} has no matching document"})
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if max_workers <= 1 or sum(os.path.getsize(path) for path, in jobs) < PARALLEL_MIN_BYTES:
+        results.extend(verify_protected_file(path) for path, in jobs)
+    else:
+        for (path,), result, error in iter_process_pool(verify_protected_file, jobs, max_workers):
+            if error is not None:
+                result = {"path": path, "status": "error", "message": str(error), "seconds": 0.0}
+            results.append(result)
+    results.sort(key=lambda result: result["path"])
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    elapsed = time.perf_counter() - start
+    return {
+        "directory": os.path.abspath(directory),
+        "checked_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "documents": len(results),
+        "counts": counts,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "results": results,
+    }
@@ -3,6 +3,120 @@ Style-related functions for Word Document Server.
 """
 from docx.shared import Pt
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.styles import BabelFish
+from docx.styles.style import StyleFactory
+
+
+class StyleRegistry:
+    """
+    Lookup of the styles of one document by name and by style id.
+
+    python-docx finds a style with an XPath scan over every w:style element,
+    so code that looks up styles per paragraph or per call scans the styles
+    part over and over. The registry indexes the styles once and keeps the
+    index current for styles added through it; styles added any other way
+    are picked up because the index is rebuilt whenever the number of
+    elements in the styles part changes.
+    """
+
+    def __init__(self, doc):
+        """
+        Args:
+            doc: Document object
+        """
+        self._styles = doc.styles
+        self._element = self._styles.element
+        self._by_name = {}
+        self._by_id = {}
+        self._size = -1
+
+    def _sync(self):
+        size = len(self._element)
+        if size == self._size:
+            return
+        self._by_name = {}
+        self._by_id = {}
+        for element in self._element.findall(qn('w:style')):
+            if element.name_val is not None:
+                self._by_name.setdefault(element.name_val, element)
+            if element.styleId is not None:
+                self._by_id.setdefault(element.styleId, element)
+        self._size = size
+
+    def get(self, name):
+        """
+        Get a style by name.
+
+        Args:
+            name: Style name as shown in Word, e.g. 'Heading 1'
+
+        Returns:
+            The style, or None if the document has no style with this name
+        """
+        self._sync()
+        element = self._by_name.get(BabelFish.ui2internal(name))
+        return None if element is None else StyleFactory(element)
+
+    def get_by_id(self, style_id):
+        """
+        Get a style by style id, as referenced from paragraph and run properties.
+
+        Returns:
+            The style, or None if the document has no style with this id
+        """
+        self._sync()
+        element = self._by_id.get(style_id)
+        return None if element is None else StyleFactory(element)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def add(self, name, style_type, style_id=None):
+        """
+        Add a style to the document.
+
+        Args:
+            name: Style name
+            style_type: Type of style (WD_STYLE_TYPE)
+            style_id: Optional style id; by default derived from the name
+
+        Returns:
+            The new style
+
+        Raises:
+            ValueError: If the document already has a style with this name
+        """
+        if name in self:
+            raise ValueError(f"document already contains style '{name}'")
+        element = self._element.add_style_of_type(BabelFish.ui2internal(name), style_type, False)
+        if style_id:
+            element.styleId = style_id
+        self._by_name.setdefault(element.name_val, element)
+        self._by_id.setdefault(element.styleId, element)
+        self._size = len(self._element)
+        return StyleFactory(element)
+
+
+def get_style_registry(doc):
+    """
+    Get the style registry of a document, building it on first use.
+
+    The registry is kept with the document, so documents held in the
+    document cache reuse it across tool calls.
+
+    Args:
+        doc: Document object
+
+    Returns:
+        StyleRegistry
+    """
+    part = doc.part
+    registry = getattr(part, '_style_registry', None)
+    if registry is None or registry._element is not doc.styles.element:
+        registry = StyleRegistry(doc)
+        part._style_registry = registry
+    return registry
 
 
 def ensure_heading_style(doc):
@@ -12,15 +126,13 @@ def ensure_heading_style(doc):
     Args:
         doc: Document object
     """
+    registry = get_style_registry(doc)
     for i in range(1, 10):  # Create Heading 1 through Heading 9
         style_name = f'Heading {i}'
-        try:
-            # Try to access the style to see if it exists
-            style = doc.styles[style_name]
-        except KeyError:
+        if style_name not in registry:
             # Create the style if it doesn't exist
             try:
-                style = doc.styles.add_style(style_name, WD_STYLE_TYPE.PARAGRAPH)
+                style = registry.add(style_name, WD_STYLE_TYPE.PARAGRAPH)
                 if i == 1:
                     style.font.size = Pt(16)
                     style.font.bold = True
@@ -42,12 +154,8 @@ def ensure_table_style(doc):
     Args:
         doc: Document object
     """
-    try:
-        # Try to access the style to see if it exists
-        style = doc.styles['Table Grid']
-    except KeyError:
-        # If style doesn't exist, we'll handle it at usage time
-        pass
+    # If style doesn't exist, we'll handle it at usage time
+    get_style_registry(doc).get('Table Grid')
 
 
 def create_style(doc, style_name, style_type, base_style=None, font_properties=None, paragraph_properties=None):
@@ -63,72 +171,123 @@ def create_style(doc, style_name, style_type, base_style=None, font_properties=N
         paragraph_properties: Dictionary of paragraph properties (alignment, spacing)
         
     Returns:
-        The created style
+        The created style, or the existing style if one with this name exists
     """
-    from docx.shared import Pt
+    registry = get_style_registry(doc)
     
-    try:
-        # Check if style already exists
-        style = doc.styles.get_by_id(style_name, WD_STYLE_TYPE.PARAGRAPH)
-        return style
-    except:
-        # Create new style
-        new_style = doc.styles.add_style(style_name, style_type)
-        
-        # Set base style if specified
-        if base_style:
-            new_style.base_style = doc.styles[base_style]
-        
-        # Set font properties
-        if font_properties:
-            font = new_style.font
-            if 'bold' in font_properties:
-                font.bold = font_properties['bold']
-            if 'italic' in font_properties:
-                font.italic = font_properties['italic']
-            if 'size' in font_properties:
-                font.size = Pt(font_properties['size'])
-            if 'name' in font_properties:
-                font.name = font_properties['name']
-            if 'color' in font_properties:
-                from docx.shared import RGBColor
-                
-                # Define common RGB colors
-                color_map = {
-                    'red': RGBColor(255, 0, 0),
-                    'blue': RGBColor(0, 0, 255),
-                    'green': RGBColor(0, 128, 0),
-                    'yellow': RGBColor(255, 255, 0),
-                    'black': RGBColor(0, 0, 0),
-                    'gray': RGBColor(128, 128, 128),
-                    'white': RGBColor(255, 255, 255),
-                    'purple': RGBColor(128, 0, 128),
-                    'orange': RGBColor(255, 165, 0)
-                }
-                
-                color_value = font_properties['color']
-                try:
-                    # Handle string color names
-                    if isinstance(color_value, str) and color_value.lower() in color_map:
-                        font.color.rgb = color_map[color_value.lower()]
-                    # Handle RGBColor objects
-                    elif hasattr(color_value, 'rgb'):
-                        font.color.rgb = color_value
-                    # Try to parse as RGB string
-                    elif isinstance(color_value, str):
-                        font.color.rgb = RGBColor.from_string(color_value)
-                    # Use directly if it's already an RGB value
-                    else:
-                        font.color.rgb = color_value
-                except Exception as e:
-                    # Fallback to black if all else fails
-                    font.color.rgb = RGBColor(0, 0, 0)
+    # Check if style already exists
+    existing = registry.get(style_name)
+    if existing is not None:
+        return existing
+    
+    base = None
+    if base_style:
+        base = registry.get(base_style)
+        if base is None:
+            raise KeyError(f"no style with name '{base_style}'")
+    
+    # Create new style
+    new_style = registry.add(style_name, style_type)
+    
+    # Set base style if specified
+    if base is not None:
+        new_style.base_style = base
+    
+    # Set font properties
+    if font_properties:
+        font = new_style.font
+        if 'bold' in font_properties:
+            font.bold = font_properties['bold']
+        if 'italic' in font_properties:
+            font.italic = font_properties['italic']
+        if 'size' in font_properties:
+            font.size = Pt(font_properties['size'])
+        if 'name' in font_properties:
+            font.name = font_properties['name']
+        if 'color' in font_properties:
+            from docx.shared import RGBColor
+            
+            # Define common RGB colors
+            color_map = {
+                'red': RGBColor(255, 0, 0),
+                'blue': RGBColor(0, 0, 255),
+                'green': RGBColor(0, 128, 0),
+                'yellow': RGBColor(255, 255, 0),
+                'black': RGBColor(0, 0, 0),
+                'gray': RGBColor(128, 128, 128),
+                'white': RGBColor(255, 255, 255),
+                'purple': RGBColor(128, 0, 128),
+                'orange': RGBColor(255, 165, 0)
+            }
+            
+            color_value = font_properties['color']
+            try:
+                # Handle string color names
+                if isinstance(color_value, str) and color_value.lower() in color_map:
+                    font.color.rgb = color_map[color_value.lower()]
+                # Handle RGBColor objects
+                elif hasattr(color_value, 'rgb'):
+                    font.color.rgb = color_value
+                # Try to parse as RGB string
+                elif isinstance(color_value, str):
+                    font.color.rgb = RGBColor.from_string(color_value)
+                # Use directly if it's already an RGB value
+                else:
+                    font.color.rgb = color_value
+            except Exception as e:
+                # Fallback to black if all else fails
+                font.color.rgb = RGBColor(0, 0, 0)
+    
+    # Set paragraph properties
+    if paragraph_properties:
+        if 'alignment' in paragraph_properties:
+            new_style.paragraph_format.alignment = paragraph_properties['alignment']
+        if 'spacing' in paragraph_properties:
+            new_style.paragraph_format.line_spacing = paragraph_properties['spacing']
+    
+    return new_style
+
+
+STYLE_TYPES = {
+    'paragraph': WD_STYLE_TYPE.PARAGRAPH,
+    'character': WD_STYLE_TYPE.CHARACTER,
+    'table': WD_STYLE_TYPE.TABLE
+}
+
+# Style definition keys and the font properties they set
+STYLE_FONT_KEYS = {'bold': 'bold', 'italic': 'italic', 'font_size': 'size', 'font_name': 'name', 'color': 'color'}
+
+
+def parse_style_definitions(styles):
+    """
+    Validate style definitions, as create_styles takes them.
+    
+    Args:
+        styles: List of dictionaries with style_name and optionally style_type
+                ('paragraph', 'character' or 'table'), base_style, bold, italic,
+                font_size, font_name and color
         
-        # Set paragraph properties
-        if paragraph_properties:
-            if 'alignment' in paragraph_properties:
-                new_style.paragraph_format.alignment = paragraph_properties['alignment']
-            if 'spacing' in paragraph_properties:
-                new_style.paragraph_format.line_spacing = paragraph_properties['spacing']
+    Returns:
+        List of (style_name, style_type, base_style, font_properties) tuples
         
-        return new_style
+    Raises:
+        ValueError: If a definition is invalid
+    """
+    definitions = []
+    for i, spec in enumerate(styles):
+        if not isinstance(spec, dict) or not spec.get('style_name'):
+            raise ValueError(f"Invalid style {i}: must be a dictionary with a style_name")
+        unknown = sorted(set(spec) - set(STYLE_FONT_KEYS) - {'style_name', 'style_type', 'base_style'})
+        if unknown:
+            raise ValueError(f"Invalid style {i}: unknown option(s): {', '.join(unknown)}")
+        style_type = STYLE_TYPES.get(str(spec.get('style_type', 'paragraph')).lower())
+        if style_type is None:
+            raise ValueError(f"Invalid style {i}: style_type must be one of {', '.join(STYLE_TYPES)}")
+        font_properties = {STYLE_FONT_KEYS[key]: spec[key] for key in STYLE_FONT_KEYS if spec.get(key) is not None}
+        if 'size' in font_properties:
+            try:
+                font_properties['size'] = int(font_properties['size'])
+            except (ValueError, TypeError):
+                raise ValueError(f"Invalid style {i}: font_size must be an integer")
+        definitions.append((spec['style_name'], style_type, spec.get('base_style'), font_properties))
+    return definitions
@@ -6,8 +6,6 @@ This module handles removing document protection.
 import os
 import json
 import hashlib
-import tempfile
-import shutil
 from typing import Tuple, Optional
 
 def remove_protection_info(filename: str, password: Optional[str] = None) -> Tuple[bool, str]:
@@ -41,35 +39,14 @@ def remove_protection_info(filename: str, password: Optional[str] = None) -> Tup
         
         # Handle true encryption if it was applied
         if protection_data.get("true_encryption") and password:
+            from word_document_server.core.protection import decrypt_file
+            
             try:
-                import msoffcrypto
-                
-                # Create a temporary file for the decrypted output
-                temp_fd, temp_path = tempfile.mkstemp(suffix='.docx')
-                os.close(temp_fd)
-                
-                # Open the encrypted document
-                with open(filename, 'rb') as f:
-                    office_file = msoffcrypto.OfficeFile(f)
-                    
-                    # Decrypt with provided password
-                    try:
-                        office_file.load_key(password=password)
-                        
-                        # Write the decrypted file to the temp path
-                        with open(temp_path, 'wb') as out_file:
-                            office_file.decrypt(out_file)
-                        
-                        # Replace encrypted file with decrypted version
-                        shutil.move(temp_path, filename)
-                    except Exception as decrypt_error:
-                        if os.path.exists(temp_path):
-                            os.unlink(temp_path)
-                        return False, f"Failed to decrypt document: {str(decrypt_error)}"
+                decrypt_file(filename, password)
             except ImportError:
                 return False, "Missing msoffcrypto package required for encryption/decryption"
-            except Exception as e:
-                return False, f"Error decrypting document: {str(e)}"
+            except Exception as decrypt_error:
+                return False, f"Failed to decrypt document: {str(decrypt_error)}"
         
         # Remove the protection metadata file
         os.remove(metadata_path)
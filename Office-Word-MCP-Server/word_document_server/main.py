@@ -1,10 +1,18 @@
 """
 Main entry point for the Word Document MCP Server.
 Acts as the central controller for the MCP server that handles Word document operations.
+
+The server talks to a single client over stdio by default. With the sse or
+streamable-http transport it serves any number of concurrent client sessions
+from one process, which share its document cache, package readers, edit
+journals and PDF workers.
 """
 
 import os
 import sys
+import argparse
+from typing import List
+from mcp import types
 from mcp.server.fastmcp import FastMCP
 from word_document_server.tools import (
     document_tools,
@@ -12,61 +20,196 @@ from word_document_server.tools import (
     format_tools,
     protection_tools,
     footnote_tools,
-    extended_document_tools
+    extended_document_tools,
+    history_tools,
+    server_tools
 )
+from word_document_server.utils.metrics import instrument_tool
+from word_document_server.utils.concurrency import enable_worker_threads, run_in_worker_thread
+from word_document_server.utils.document_cache import get_preload_paths, start_preload
+
 
+TRANSPORTS = ("stdio", "sse", "streamable-http")
 
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
 
 # Initialize FastMCP server
 mcp = FastMCP("word-document-server")
 
+def _register_tool(func):
+    """Register a tool with the MCP server, measuring each of its calls."""
+    mcp.tool()(instrument_tool(run_in_worker_thread(func)))
+
+
 def register_tools():
     """Register all tools with the MCP server."""
     # Document tools (create, copy, info, etc.)
-    mcp.tool()(document_tools.create_document)
-    mcp.tool()(document_tools.copy_document)
-    mcp.tool()(document_tools.get_document_info)
-    mcp.tool()(document_tools.get_document_text)
-    mcp.tool()(document_tools.get_document_outline)
-    mcp.tool()(document_tools.list_available_documents)
+    _register_tool(document_tools.create_document)
+    _register_tool(document_tools.build_document)
+    _register_tool(document_tools.copy_document)
+    _register_tool(document_tools.get_document_info)
+    _register_tool(document_tools.get_document_text)
+    _register_tool(document_tools.get_document_outline)
+    _register_tool(document_tools.export_document_chunks)
+    _register_tool(document_tools.export_markdown)
+    _register_tool(document_tools.list_available_documents)
+    _register_tool(document_tools.bulk_extract)
     
     # Content tools (paragraphs, headings, tables, etc.)
-    mcp.tool()(content_tools.add_paragraph)
-    mcp.tool()(content_tools.add_heading)
-    mcp.tool()(content_tools.add_picture)
-    mcp.tool()(content_tools.add_table)
-    mcp.tool()(content_tools.add_page_break)
-    mcp.tool()(content_tools.delete_paragraph)
-    mcp.tool()(content_tools.search_and_replace)
+    _register_tool(content_tools.add_paragraph)
+    _register_tool(content_tools.add_heading)
+    _register_tool(content_tools.add_picture)
+    _register_tool(content_tools.add_table)
+    _register_tool(content_tools.add_page_break)
+    _register_tool(content_tools.import_markdown)
+    _register_tool(content_tools.delete_paragraph)
+    _register_tool(content_tools.delete_paragraphs)
+    _register_tool(content_tools.move_range)
+    _register_tool(content_tools.replace_range_with)
+    _register_tool(content_tools.search_and_replace)
     
     # Format tools (styling, text formatting, etc.)
-    mcp.tool()(format_tools.create_custom_style)
-    mcp.tool()(format_tools.format_text)
-    mcp.tool()(format_tools.format_table)
+    _register_tool(format_tools.create_custom_style)
+    _register_tool(format_tools.create_styles)
+    _register_tool(format_tools.format_text)
+    _register_tool(format_tools.format_text_ranges)
+    _register_tool(format_tools.format_matches)
+    _register_tool(format_tools.format_table)
     
     # Protection tools
-    mcp.tool()(protection_tools.protect_document)
-    mcp.tool()(protection_tools.unprotect_document)
+    _register_tool(protection_tools.protect_document)
+    _register_tool(protection_tools.protect_documents)
+    _register_tool(protection_tools.verify_documents)
+    _register_tool(protection_tools.unprotect_document)
+    _register_tool(protection_tools.open_protected_document)
+    _register_tool(protection_tools.save_protected_document)
+    _register_tool(protection_tools.close_protected_document)
     
     # Footnote tools
-    mcp.tool()(footnote_tools.add_footnote_to_document)
-    mcp.tool()(footnote_tools.add_endnote_to_document)
-    # mcp.tool()(footnote_tools.convert_footnotes_to_endnotes_in_document)
-    mcp.tool()(footnote_tools.customize_footnote_style)
+    _register_tool(footnote_tools.add_footnote_to_document)
+    _register_tool(footnote_tools.add_endnote_to_document)
+    _register_tool(footnote_tools.add_notes)
+    _register_tool(footnote_tools.convert_footnotes_to_endnotes_in_document)
+    _register_tool(footnote_tools.customize_footnote_style)
     
     # Extended document tools
-    mcp.tool()(extended_document_tools.get_paragraph_text_from_document)
-    mcp.tool()(extended_document_tools.find_text_in_document)
-    mcp.tool()(extended_document_tools.convert_to_pdf)
+    _register_tool(extended_document_tools.get_paragraph_text_from_document)
+    _register_tool(extended_document_tools.find_text_in_document)
+    _register_tool(extended_document_tools.diff_documents)
+    _register_tool(extended_document_tools.convert_to_pdf)
+    _register_tool(extended_document_tools.convert_documents_to_pdf)
+    
+    # History tools
+    _register_tool(history_tools.undo_last_edit)
+    _register_tool(history_tools.create_snapshot)
+    _register_tool(history_tools.restore_snapshot)
+    _register_tool(history_tools.get_edit_history)
+    
+    # Server tools (not instrumented, so reading metrics does not change them)
+    mcp.tool()(server_tools.get_server_metrics)
+
+
+def register_preload():
+    """Preload the documents listed in WORD_MCP_PRELOAD once a client has connected."""
+    paths = get_preload_paths()
+    if not paths:
+        return
+    
+    async def on_initialized(notification):
+        # Parse in a background thread so the first tool calls are not delayed
+        start_preload(paths)
+    
+    mcp._mcp_server.notification_handlers[types.InitializedNotification] = on_initialized
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse the command line, with defaults from the environment.
+
+    Args:
+        argv: Arguments (defaults to sys.argv[1:])
 
+    Returns:
+        Namespace with transport, host and port
+    """
+    parser = argparse.ArgumentParser(description="Word Document MCP Server")
+    parser.add_argument("--transport", default=os.environ.get("WORD_MCP_TRANSPORT", "stdio"),
+                        help=f"Transport to serve: {', '.join(TRANSPORTS)} (default: stdio)")
+    parser.add_argument("--host", default=os.environ.get("WORD_MCP_HOST", "127.0.0.1"),
+                        help="Address the HTTP transports listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=os.environ.get("WORD_MCP_PORT", "8000"),
+                        help="Port the HTTP transports listen on (default: 8000)")
+    args = parser.parse_args(argv)
+    if args.transport not in TRANSPORTS:
+        parser.error(f"invalid transport '{args.transport}', choose from {', '.join(TRANSPORTS)}")
+    if args.transport != "stdio" and args.host not in LOOPBACK_HOSTS and not get_allowed_hosts():
+        parser.error(f"listening on {args.host} requires WORD_MCP_ALLOWED_HOSTS "
+                     "(comma-separated Host headers, e.g. 'docs.example.com:*')")
+    return args
 
-def run_server():
-    """Run the Word Document MCP Server."""
+
+def get_allowed_hosts() -> List[str]:
+    """Host headers accepted on a non-loopback address, from WORD_MCP_ALLOWED_HOSTS."""
+    return [name.strip() for name in os.environ.get("WORD_MCP_ALLOWED_HOSTS", "").split(",")
+            if name.strip()]
+
+
+def configure_http(host: str, port: int) -> None:
+    """
+    Set the address of the HTTP transports.
+
+    FastMCP only accepts requests addressed to a loopback host, which guards
+    against DNS rebinding. When listening on another address, the accepted
+    host names are taken from WORD_MCP_ALLOWED_HOSTS (comma-separated, e.g.
+    'docs.example.com:*'); the check always stays on.
+
+    Args:
+        host: Address to listen on
+        port: Port to listen on
+
+    Raises:
+        ValueError: If the address is not a loopback address and
+                    WORD_MCP_ALLOWED_HOSTS is unset
+    """
+    from mcp.server.transport_security import TransportSecuritySettings
+    
+    if host in LOOPBACK_HOSTS:
+        mcp.settings.host = host
+        mcp.settings.port = port
+        return
+    
+    allowed_hosts = get_allowed_hosts()
+    if not allowed_hosts:
+        raise ValueError(f"listening on {host} requires WORD_MCP_ALLOWED_HOSTS")
+    mcp.settings.host = host
+    mcp.settings.port = port
+    mcp.settings.transport_security = TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=allowed_hosts,
+        allowed_origins=[f"{scheme}://{name}" for name in allowed_hosts for scheme in ("http", "https")]
+    )
+
+
+def run_server(argv=None):
+    """Run the Word Document MCP Server.
+    
+    Args:
+        argv: Command line arguments (defaults to sys.argv[1:]); see parse_args()
+    """
+    args = parse_args(argv)
+    
     # Register all tools
     register_tools()
+    register_preload()
+    
+    if args.transport != "stdio":
+        configure_http(args.host, args.port)
+        # Sessions share the process, so calls run in worker threads and
+        # calls on one document are serialized
+        enable_worker_threads()
     
     # Run the server
-    mcp.run(transport='stdio')
+    mcp.run(transport=args.transport)
     return mcp
 
 if __name__ == "__main__":
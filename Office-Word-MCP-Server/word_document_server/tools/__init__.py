@@ -2,36 +2,62 @@
 MCP tool implementations for the Word Document Server.
 
 This package contains the MCP tool implementations that expose functionality
-to clients through the Model Context Protocol.
+to clients through the Model Context Protocol. Tool modules only import
+python-docx and other heavy dependencies when a tool is first called, and the
+re-exports below are resolved on first access.
 """
+import importlib
 
-# Document tools
-from word_document_server.tools.document_tools import (
-    create_document, get_document_info, get_document_text, 
-    get_document_outline, list_available_documents, 
-    copy_document, merge_documents
-)
+_EXPORTS = {
+    # Document tools
+    "create_document": "document_tools",
+    "build_document": "document_tools",
+    "get_document_info": "document_tools",
+    "get_document_text": "document_tools",
+    "get_document_outline": "document_tools",
+    "export_markdown": "document_tools",
+    "list_available_documents": "document_tools",
+    "copy_document": "document_tools",
+    "merge_documents": "document_tools",
+    # Content tools
+    "add_heading": "content_tools",
+    "add_paragraph": "content_tools",
+    "add_table": "content_tools",
+    "add_picture": "content_tools",
+    "add_page_break": "content_tools",
+    "add_table_of_contents": "content_tools",
+    "import_markdown": "content_tools",
+    "delete_paragraph": "content_tools",
+    "search_and_replace": "content_tools",
+    # Format tools
+    "format_text": "format_tools",
+    "create_custom_style": "format_tools",
+    "format_table": "format_tools",
+    # Protection tools
+    "protect_document": "protection_tools",
+    "protect_documents": "protection_tools",
+    "open_protected_document": "protection_tools",
+    "save_protected_document": "protection_tools",
+    "close_protected_document": "protection_tools",
+    "add_restricted_editing": "protection_tools",
+    "add_digital_signature": "protection_tools",
+    "verify_document": "protection_tools",
+    "verify_documents": "protection_tools",
+    # Footnote tools
+    "add_footnote_to_document": "footnote_tools",
+    "add_endnote_to_document": "footnote_tools",
+    "add_notes": "footnote_tools",
+    "convert_footnotes_to_endnotes_in_document": "footnote_tools",
+    "customize_footnote_style": "footnote_tools",
+}
 
-# Content tools
-from word_document_server.tools.content_tools import (
-    add_heading, add_paragraph, add_table, add_picture,
-    add_page_break, add_table_of_contents, delete_paragraph,
-    search_and_replace
-)
 
-# Format tools
-from word_document_server.tools.format_tools import (
-    format_text, create_custom_style, format_table
-)
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
 
-# Protection tools
-from word_document_server.tools.protection_tools import (
-    protect_document, add_restricted_editing,
-    add_digital_signature, verify_document
-)
 
-# Footnote tools
-from word_document_server.tools.footnote_tools import (
-    add_footnote_to_document, add_endnote_to_document,
-    convert_footnotes_to_endnotes_in_document, customize_footnote_style
-)
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
@@ -6,12 +6,9 @@ including headings, paragraphs, tables, images, and page breaks.
 """
 import os
 from typing import List, Optional, Dict, Any
-from docx import Document
-from docx.shared import Inches, Pt
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
-from word_document_server.utils.document_utils import find_and_replace_text
-from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+from word_document_server.utils.document_cache import load_document, save_document
 
 
 async def add_heading(filename: str, text: str, level: int = 1) -> str:
@@ -22,6 +19,9 @@ async def add_heading(filename: str, text: str, level: int = 1) -> str:
         text: Heading text
         level: Heading level (1-9, where 1 is the highest level)
     """
+    from docx.shared import Pt
+    from word_document_server.core.styles import ensure_heading_style, get_style_registry
+    
     filename = ensure_docx_extension(filename)
     
     # Ensure level is converted to integer
@@ -44,20 +44,24 @@ async def add_heading(filename: str, text: str, level: int = 1) -> str:
         return f"Cannot modify document: {error_message}. Consider creating a copy first or creating a new document."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         
         # Ensure heading styles exist
         ensure_heading_style(doc)
         
         # Try to add heading with style
+        registry = get_style_registry(doc)
+        heading_style = registry.get(f'Heading {level}')
         try:
-            heading = doc.add_heading(text, level=level)
-            doc.save(filename)
+            if heading_style is None:
+                raise KeyError(f"no style with name 'Heading {level}'")
+            heading = doc.add_paragraph(text, heading_style)
+            save_document(doc, filename)
             return f"Heading '{text}' (level {level}) added to {filename}"
         except Exception as style_error:
             # If style-based approach fails, use direct formatting
             paragraph = doc.add_paragraph(text)
-            paragraph.style = doc.styles['Normal']
+            paragraph.style = registry.get('Normal')
             run = paragraph.runs[0]
             run.bold = True
             # Adjust size based on heading level
@@ -68,7 +72,7 @@ async def add_heading(filename: str, text: str, level: int = 1) -> str:
             else:
                 run.font.size = Pt(12)
             
-            doc.save(filename)
+            save_document(doc, filename)
             return f"Heading '{text}' added to {filename} with direct formatting (style not available)"
     except Exception as e:
         return f"Failed to add heading: {str(e)}"
@@ -82,6 +86,8 @@ async def add_paragraph(filename: str, text: str, style: Optional[str] = None) -
         text: Paragraph text
         style: Optional paragraph style name
     """
+    from word_document_server.core.styles import get_style_registry
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -94,19 +100,21 @@ async def add_paragraph(filename: str, text: str, style: Optional[str] = None) -
         return f"Cannot modify document: {error_message}. Consider creating a copy first or creating a new document."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         paragraph = doc.add_paragraph(text)
         
         if style:
-            try:
-                paragraph.style = style
-            except KeyError:
+            registry = get_style_registry(doc)
+            style_object = registry.get(style)
+            if style_object is not None:
+                paragraph.style = style_object
+            else:
                 # Style doesn't exist, use normal and report it
-                paragraph.style = doc.styles['Normal']
-                doc.save(filename)
+                paragraph.style = registry.get('Normal')
+                save_document(doc, filename)
                 return f"Style '{style}' not found, paragraph added with default style to {filename}"
         
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Paragraph added to {filename}"
     except Exception as e:
         return f"Failed to add paragraph: {str(e)}"
@@ -121,6 +129,7 @@ async def add_table(filename: str, rows: int, cols: int, data: Optional[List[Lis
         cols: Number of columns in the table
         data: Optional 2D array of data to fill the table
     """
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -133,7 +142,7 @@ async def add_table(filename: str, rows: int, cols: int, data: Optional[List[Lis
         return f"Cannot modify document: {error_message}. Consider creating a copy first or creating a new document."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         table = doc.add_table(rows=rows, cols=cols)
         
         # Try to set the table style
@@ -153,7 +162,7 @@ async def add_table(filename: str, rows: int, cols: int, data: Optional[List[Lis
                         break
                     table.cell(i, j).text = str(cell_text)
         
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Table ({rows}x{cols}) added to {filename}"
     except Exception as e:
         return f"Failed to add table: {str(e)}"
@@ -167,6 +176,8 @@ async def add_picture(filename: str, image_path: str, width: Optional[float] = N
         image_path: Path to the image file
         width: Optional width in inches (proportional scaling)
     """
+    from docx.shared import Inches
+    
     filename = ensure_docx_extension(filename)
     
     # Validate document existence
@@ -195,7 +206,7 @@ async def add_picture(filename: str, image_path: str, width: Optional[float] = N
         return f"Cannot modify document: {error_message}. Consider creating a copy first or creating a new document."
     
     try:
-        doc = Document(abs_filename)
+        doc = load_document(abs_filename, for_update=True)
         # Additional diagnostic info
         diagnostic = f"Attempting to add image ({abs_image_path}, {image_size:.2f} KB) to document ({abs_filename})"
         
@@ -204,7 +215,7 @@ async def add_picture(filename: str, image_path: str, width: Optional[float] = N
                 doc.add_picture(abs_image_path, width=Inches(width))
             else:
                 doc.add_picture(abs_image_path)
-            doc.save(abs_filename)
+            save_document(doc, abs_filename)
             return f"Picture {image_path} added to {filename}"
         except Exception as inner_error:
             # More detailed error for the specific operation
@@ -224,6 +235,7 @@ async def add_page_break(filename: str) -> str:
     Args:
         filename: Path to the Word document
     """
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -235,14 +247,59 @@ async def add_page_break(filename: str) -> str:
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         doc.add_page_break()
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Page break added to {filename}."
     except Exception as e:
         return f"Failed to add page break: {str(e)}"
 
 
+async def import_markdown(filename: str, markdown_or_path: str) -> str:
+    """Append Markdown content to the end of a document in a single pass.
+    
+    Headings, paragraphs, lists, block quotes, code blocks, GFM tables, images,
+    emphasis and links are mapped to the document's styles and run formatting.
+    
+    Args:
+        filename: Path to the Word document
+        markdown_or_path: Markdown text, or the path of a Markdown file (read one
+                          line at a time; relative image paths are resolved
+                          against its directory)
+    """
+    from word_document_server.core.builder import append_blocks
+    from word_document_server.core.markdown import markdown_blocks
+    
+    filename = ensure_docx_extension(filename)
+    markdown_or_path = str(markdown_or_path)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    if ("\n" not in markdown_or_path and markdown_or_path.lower().endswith((".md", ".markdown"))
+            and not os.path.isfile(markdown_or_path)):
+        return f"Markdown file {markdown_or_path} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        result = append_blocks(filename, markdown_blocks(markdown_or_path), strict_styles=False)
+    except ValueError as e:
+        return f"Invalid Markdown content: {str(e)}"
+    except Exception as e:
+        return f"Failed to import Markdown: {str(e)}"
+    
+    message = (f"Imported {result['paragraphs']} paragraph(s), {result['tables']} table(s) and "
+               f"{result['images']} image(s) into {filename}")
+    if result["missing_styles"]:
+        message += (f". Styles not in the document, left as the default style: "
+                    f"{', '.join(result['missing_styles'])}")
+    return message
+
+
 async def add_table_of_contents(filename: str, title: str = "Table of Contents", max_level: int = 3) -> str:
     """Add a table of contents to a Word document based on heading styles.
     
@@ -251,6 +308,8 @@ async def add_table_of_contents(filename: str, title: str = "Table of Contents",
         title: Optional title for the table of contents
         max_level: Maximum heading level to include (1-9)
     """
+    from docx import Document
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -265,7 +324,7 @@ async def add_table_of_contents(filename: str, title: str = "Table of Contents",
         # Ensure max_level is within valid range
         max_level = max(1, min(max_level, 9))
         
-        doc = Document(filename)
+        doc = load_document(filename)
         
         # Collect headings and their positions
         headings = []
@@ -325,7 +384,7 @@ async def add_table_of_contents(filename: str, title: str = "Table of Contents",
                         new_table.cell(i, j).text = paragraph.text
         
         # Save the new document with TOC
-        toc_doc.save(filename)
+        save_document(toc_doc, filename)
         
         return f"Table of contents with {len(headings)} entries added to {filename}"
     except Exception as e:
@@ -339,6 +398,7 @@ async def delete_paragraph(filename: str, paragraph_index: int) -> str:
         filename: Path to the Word document
         paragraph_index: Index of the paragraph to delete (0-based)
     """
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -350,7 +410,7 @@ async def delete_paragraph(filename: str, paragraph_index: int) -> str:
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         
         # Validate paragraph index
         if paragraph_index < 0 or paragraph_index >= len(doc.paragraphs):
@@ -362,12 +422,162 @@ async def delete_paragraph(filename: str, paragraph_index: int) -> str:
         p = paragraph._p
         p.getparent().remove(p)
         
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Paragraph at index {paragraph_index} deleted successfully."
     except Exception as e:
         return f"Failed to delete paragraph: {str(e)}"
 
 
+async def delete_paragraphs(filename: str, start_index: int, end_index: int) -> str:
+    """Delete a range of paragraphs, and any tables between them, in one operation.
+    
+    Args:
+        filename: Path to the Word document
+        start_index: Index of the first paragraph to delete (0-based)
+        end_index: Index of the last paragraph to delete (inclusive)
+    """
+    from word_document_server.core.ranges import validate_paragraph_range, delete_range
+    
+    filename = ensure_docx_extension(filename)
+    
+    try:
+        start_index = int(start_index)
+        end_index = int(end_index)
+    except (ValueError, TypeError):
+        return "Invalid parameter: start_index and end_index must be integers"
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
+        
+        error = validate_paragraph_range(doc, start_index, end_index)
+        if error:
+            return error
+        
+        paragraphs, tables = delete_range(doc, start_index, end_index)
+        
+        save_document(doc, filename)
+        tables_note = f" and {tables} table(s)" if tables else ""
+        return f"Deleted {paragraphs} paragraph(s){tables_note} ({start_index}-{end_index})."
+    except Exception as e:
+        return f"Failed to delete paragraphs: {str(e)}"
+
+
+async def move_range(filename: str, start_index: int, end_index: int, target_index: int) -> str:
+    """Move a range of paragraphs, and any tables between them, to another position.
+    
+    Args:
+        filename: Path to the Word document
+        start_index: Index of the first paragraph to move (0-based)
+        end_index: Index of the last paragraph to move (inclusive)
+        target_index: Index of the paragraph to move the range in front of, counted
+                      before the move. Use the paragraph count to move the range to the end.
+    """
+    from word_document_server.core.ranges import validate_paragraph_range, move_range as move_body_range
+    
+    filename = ensure_docx_extension(filename)
+    
+    try:
+        start_index = int(start_index)
+        end_index = int(end_index)
+        target_index = int(target_index)
+    except (ValueError, TypeError):
+        return "Invalid parameter: start_index, end_index and target_index must be integers"
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
+        
+        error = validate_paragraph_range(doc, start_index, end_index)
+        if error:
+            return error
+        
+        count = len(doc.paragraphs)
+        if target_index < 0 or target_index > count:
+            return f"Invalid target index: {target_index}. Must be between 0 and {count}."
+        if start_index <= target_index <= end_index + 1:
+            return f"Invalid target index: {target_index}. The target must lie outside the range {start_index}-{end_index}."
+        
+        moved = move_body_range(doc, start_index, end_index, target_index)
+        
+        save_document(doc, filename)
+        return f"Moved {moved} element(s) ({start_index}-{end_index}) before paragraph {target_index}."
+    except Exception as e:
+        return f"Failed to move range: {str(e)}"
+
+
+async def replace_range_with(filename: str, start_index: int, end_index: int,
+                             text: Optional[str] = None, paragraphs: Optional[List[str]] = None,
+                             style: Optional[str] = None) -> str:
+    """Replace a range of paragraphs, and any tables between them, with new paragraphs.
+    
+    Args:
+        filename: Path to the Word document
+        start_index: Index of the first paragraph to replace (0-based)
+        end_index: Index of the last paragraph to replace (inclusive)
+        text: Replacement text; each line becomes a paragraph
+        paragraphs: Replacement paragraphs, as a list of texts (used instead of text)
+        style: Optional paragraph style for the new paragraphs. Defaults to the
+               style of the first replaced paragraph.
+    """
+    from word_document_server.core.ranges import validate_paragraph_range, replace_range
+    from word_document_server.core.styles import get_style_registry
+    
+    filename = ensure_docx_extension(filename)
+    
+    try:
+        start_index = int(start_index)
+        end_index = int(end_index)
+    except (ValueError, TypeError):
+        return "Invalid parameter: start_index and end_index must be integers"
+    
+    if paragraphs is None and text is None:
+        return "Invalid parameter: provide text or paragraphs"
+    texts = [str(paragraph) for paragraph in paragraphs] if paragraphs is not None else text.split("\n")
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
+        
+        error = validate_paragraph_range(doc, start_index, end_index)
+        if error:
+            return error
+        
+        style_object = None
+        if style:
+            style_object = get_style_registry(doc).get(style)
+            if style_object is None:
+                return f"Style '{style}' not found in {filename}"
+        
+        removed, inserted = replace_range(doc, start_index, end_index, texts, style_object)
+        
+        save_document(doc, filename)
+        return f"Replaced {removed} element(s) ({start_index}-{end_index}) with {inserted} paragraph(s)."
+    except Exception as e:
+        return f"Failed to replace range: {str(e)}"
+
+
 async def search_and_replace(filename: str, find_text: str, replace_text: str) -> str:
     """Search for text and replace all occurrences.
     
@@ -376,6 +586,8 @@ async def search_and_replace(filename: str, find_text: str, replace_text: str) -
         find_text: Text to search for
         replace_text: Text to replace with
     """
+    from word_document_server.utils.document_utils import find_and_replace_text
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -387,13 +599,13 @@ async def search_and_replace(filename: str, find_text: str, replace_text: str) -
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         
         # Perform find and replace
         count = find_and_replace_text(doc, find_text, replace_text)
         
         if count > 0:
-            doc.save(filename)
+            save_document(doc, filename)
             return f"Replaced {count} occurrence(s) of '{find_text}' with '{replace_text}'."
         else:
             return f"No occurrences of '{find_text}' found."
@@ -3,12 +3,10 @@ Document creation and manipulation tools for Word Document Server.
 """
 import os
 import json
-from typing import Dict, List, Optional, Any
-from docx import Document
+from typing import Dict, List, Optional, Any, Tuple
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension, create_document_copy
-from word_document_server.utils.document_utils import get_document_properties, extract_document_text, get_document_structure
-from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+from word_document_server.utils.document_cache import load_document, save_document
 
 
 async def create_document(filename: str, title: Optional[str] = None, author: Optional[str] = None) -> str:
@@ -19,6 +17,9 @@ async def create_document(filename: str, title: Optional[str] = None, author: Op
         title: Optional title for the document metadata
         author: Optional author for the document metadata
     """
+    from docx import Document
+    from word_document_server.core.styles import ensure_heading_style, ensure_table_style
+    
     filename = ensure_docx_extension(filename)
     
     # Check if file is writeable
@@ -40,19 +41,61 @@ async def create_document(filename: str, title: Optional[str] = None, author: Op
         ensure_table_style(doc)
         
         # Save the document
-        doc.save(filename)
+        save_document(doc, filename)
         
         return f"Document {filename} created successfully"
     except Exception as e:
         return f"Failed to create document: {str(e)}"
 
 
+async def build_document(filename: str, spec: Any) -> str:
+    """Create a complete Word document from a declarative spec in a single call.
+    
+    Args:
+        filename: Name of the document to create (replaced if it already exists)
+        spec: List of content blocks, or a dictionary with 'blocks' and optional 'title',
+              'author' and 'styles' (style definitions as for create_styles). Blocks are
+              {"type": "heading", "text", "level"}, {"type": "paragraph", "text" or "runs",
+              "style", "alignment"}, {"type": "list", "items", "ordered", "start"},
+              {"type": "table", "rows", "header", "style"}, {"type": "image", "path",
+              "width", "height"} and {"type": "page_break"}; a plain string is a paragraph.
+              Paragraphs, runs and table cells accept bold, italic, underline, color,
+              font_size, font_name and highlight; runs also accept a link URL.
+    """
+    from word_document_server.core.builder import build_document as build
+    from word_document_server.utils.protected_sessions import get_session
+    
+    filename = ensure_docx_extension(filename)
+    
+    if get_session(filename) is not None:
+        return f"Cannot build document: {filename} is open in a protected session"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot build document: {error_message}"
+    
+    try:
+        counts = build(filename, spec)
+    except ValueError as e:
+        message = str(e)
+        return message if message.startswith("Invalid") else f"Invalid spec: {message}"
+    except Exception as e:
+        return f"Failed to build document: {str(e)}"
+    
+    return (f"Document {filename} built with {counts['paragraphs']} paragraph(s), "
+            f"{counts['tables']} table(s), {counts['images']} image(s) and "
+            f"{counts['page_breaks']} page break(s)")
+
+
 async def get_document_info(filename: str) -> str:
     """Get information about a Word document.
     
     Args:
         filename: Path to the Word document
     """
+    from word_document_server.utils.document_utils import get_document_properties
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -71,6 +114,8 @@ async def get_document_text(filename: str) -> str:
     Args:
         filename: Path to the Word document
     """
+    from word_document_server.utils.document_utils import extract_document_text
+    
     filename = ensure_docx_extension(filename)
     
     return extract_document_text(filename)
@@ -82,12 +127,147 @@ async def get_document_outline(filename: str) -> str:
     Args:
         filename: Path to the Word document
     """
+    from word_document_server.utils.document_utils import get_document_structure
+    
     filename = ensure_docx_extension(filename)
     
     structure = get_document_structure(filename)
     return json.dumps(structure, indent=2)
 
 
+async def export_document_chunks(filename: str, max_tokens: int = 512, overlap: int = 64,
+                                 output_filename: Optional[str] = None,
+                                 page: int = 1, page_size: int = 50) -> str:
+    """Split a Word document into heading-aware chunks for retrieval pipelines.
+    
+    Args:
+        filename: Path to the Word document
+        max_tokens: Approximate maximum number of tokens per chunk
+        overlap: Approximate number of tokens repeated between consecutive chunks of a section
+        output_filename: Optional path of a JSON Lines file to write all chunks to.
+                         If not provided, chunks are returned page by page.
+        page: Page of chunks to return when no output file is given (1-based)
+        page_size: Number of chunks per page
+    """
+    from word_document_server.utils.export_utils import iter_document_chunks
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    try:
+        max_tokens = int(max_tokens)
+        overlap = int(overlap)
+        page = int(page)
+        page_size = int(page_size)
+    except (ValueError, TypeError):
+        return "Invalid parameter: max_tokens, overlap, page and page_size must be integers"
+    
+    if max_tokens < 1 or overlap < 0 or page < 1 or page_size < 1:
+        return "Invalid parameter: max_tokens, page and page_size must be positive and overlap non-negative"
+    
+    try:
+        chunks = iter_document_chunks(filename, max_tokens, overlap)
+        
+        if output_filename:
+            is_writeable, error_message = check_file_writeable(output_filename)
+            if not is_writeable:
+                return f"Cannot write chunks: {error_message}"
+            
+            count = 0
+            with open(output_filename, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    count += 1
+            return f"Exported {count} chunks from {filename} to {output_filename}"
+        
+        # Only keep the requested page in memory
+        first = (page - 1) * page_size
+        selected = []
+        has_more = False
+        for i, chunk in enumerate(chunks):
+            if i < first:
+                continue
+            if len(selected) == page_size:
+                has_more = True
+                break
+            selected.append(chunk)
+        
+        return json.dumps({
+            "page": page,
+            "page_size": page_size,
+            "has_more": has_more,
+            "chunks": selected
+        }, indent=2)
+    except Exception as e:
+        return f"Failed to export document chunks: {str(e)}"
+
+
+async def export_markdown(filename: str, range: Optional[Any] = None, max_tokens: int = 8000) -> str:
+    """Export a Word document as compact Markdown, keeping headings, lists, tables and emphasis.
+    
+    Long documents are returned in pages of about max_tokens tokens; a page that
+    does not reach the end of the range ends with a comment giving the range to
+    request next.
+    
+    Args:
+        filename: Path to the Word document
+        range: Optional paragraph range to export: [start, end] (0-based, end
+               inclusive), "start-end", or a start index to export to the end
+        max_tokens: Approximate maximum number of tokens per page
+    """
+    from word_document_server.utils.export_utils import export_markdown as export
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    try:
+        start, end = _parse_paragraph_range(range)
+        max_tokens = int(max_tokens)
+    except (ValueError, TypeError):
+        return ("Invalid parameter: range must be [start, end], \"start-end\" or a start index, "
+                "and max_tokens an integer")
+    
+    if start < 0 or max_tokens < 1:
+        return "Invalid parameter: range start must be non-negative and max_tokens positive"
+    
+    try:
+        page = export(filename, start, end, max_tokens)
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Failed to export Markdown: {str(e)}"
+    
+    markdown = page["markdown"]
+    if page["next_start"] is not None:
+        last = page["paragraph_count"] - 1 if end is None else end
+        markdown += (f"\n\n<!-- Paragraphs {page['start']}-{page['end']} of {page['paragraph_count']}; "
+                     f"continue with range=[{page['next_start']}, {last}] -->")
+    return markdown
+
+
+def _parse_paragraph_range(value: Any) -> Tuple[int, Optional[int]]:
+    """Start and optional end of a range given as a list, a "start-end" string or a start index."""
+    if value is None:
+        return 0, None
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("[") or value.startswith("("):
+            value = json.loads(value.replace("(", "[").replace(")", "]"))
+        else:
+            value = value.split("-", 1)
+    if isinstance(value, (list, tuple)):
+        if not 1 <= len(value) <= 2:
+            raise ValueError("range must have a start and an optional end")
+        start = int(value[0])
+        end = value[1] if len(value) == 2 else None
+        return start, None if end is None or end == "" else int(end)
+    return int(value), None
+
+
 async def list_available_documents(directory: str = ".") -> str:
     """List all .docx files in the specified directory.
     
@@ -114,6 +294,47 @@ async def list_available_documents(directory: str = ".") -> str:
         return f"Failed to list documents: {str(e)}"
 
 
+async def bulk_extract(directory: str, output_path: str, format: str = "jsonl",
+                       recursive: bool = False, max_workers: Optional[int] = None) -> str:
+    """Extract the text and outline of every Word document in a directory to one file.
+    
+    Unchanged documents from a previous run with the same output path are skipped.
+    
+    Args:
+        directory: Directory containing the Word documents
+        output_path: Path of the output file
+        format: Output format, 'jsonl' or 'parquet' (parquet requires pyarrow)
+        recursive: If True, include documents in subdirectories
+        max_workers: Optional number of worker processes (defaults to the CPU count)
+    """
+    from word_document_server.utils.export_utils import bulk_extract_documents, BULK_EXTRACT_FORMATS
+    
+    if not os.path.isdir(directory):
+        return f"Directory {directory} does not exist"
+    
+    format = (format or "jsonl").lower()
+    if format not in BULK_EXTRACT_FORMATS:
+        return f"Invalid format: {format}. Supported formats: {', '.join(BULK_EXTRACT_FORMATS)}"
+    
+    if format == "parquet":
+        try:
+            import pyarrow
+        except ImportError:
+            return "Parquet output requires the pyarrow package. Install it or use format='jsonl'."
+    
+    is_writeable, error_message = check_file_writeable(output_path)
+    if not is_writeable:
+        return f"Cannot write output: {error_message}"
+    
+    try:
+        if max_workers is not None:
+            max_workers = max(1, int(max_workers))
+        report = bulk_extract_documents(directory, output_path, format, bool(recursive), max_workers)
+        return json.dumps(report, indent=2)
+    except Exception as e:
+        return f"Failed to extract documents: {str(e)}"
+
+
 async def copy_document(source_filename: str, destination_filename: Optional[str] = None) -> str:
     """Create a copy of a Word document.
     
@@ -141,7 +362,10 @@ async def merge_documents(target_filename: str, source_filenames: List[str], add
         source_filenames: List of paths to source documents to merge
         add_page_breaks: If True, add page breaks between documents
     """
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
     from word_document_server.core.tables import copy_table
+    from word_document_server.core.styles import get_style_registry
     
     target_filename = ensure_docx_extension(target_filename)
     
@@ -163,28 +387,30 @@ async def merge_documents(target_filename: str, source_filenames: List[str], add
     try:
         # Create a new document for the merged result
         target_doc = Document()
+        target_styles = get_style_registry(target_doc)
+        normal_style = target_styles.get('Normal')
         
         # Process each source document
         for i, filename in enumerate(source_filenames):
             doc_filename = ensure_docx_extension(filename)
-            source_doc = Document(doc_filename)
+            source_doc = load_document(doc_filename)
             
             # Add page break between documents (except before the first one)
             if add_page_breaks and i > 0:
                 target_doc.add_page_break()
             
             # Copy all paragraphs
+            source_styles = get_style_registry(source_doc)
             for paragraph in source_doc.paragraphs:
-                # Create a new paragraph with the same text and style
-                new_paragraph = target_doc.add_paragraph(paragraph.text)
-                new_paragraph.style = target_doc.styles['Normal']  # Default style
+                # Match the style if possible, otherwise use the default style
+                style_id = paragraph._p.style
+                source_style = source_styles.get_by_id(style_id) if style_id else None
+                style = target_styles.get(source_style.name) if source_style is not None else None
+                if style is None or style.type != WD_STYLE_TYPE.PARAGRAPH:
+                    style = normal_style
                 
-                # Try to match the style if possible
-                try:
-                    if paragraph.style and paragraph.style.name in target_doc.styles:
-                        new_paragraph.style = target_doc.styles[paragraph.style.name]
-                except:
-                    pass
+                # Create a new paragraph with the same text and style
+                new_paragraph = target_doc.add_paragraph(paragraph.text, style)
                 
                 # Copy run formatting
                 for i, run in enumerate(paragraph.runs):
@@ -203,7 +429,7 @@ async def merge_documents(target_filename: str, source_filenames: List[str], add
                 copy_table(table, target_doc)
         
         # Save the merged document
-        target_doc.save(target_filename)
+        save_document(target_doc, target_filename)
         return f"Successfully merged {len(source_filenames)} documents into {target_filename}"
     except Exception as e:
         return f"Failed to merge documents: {str(e)}"
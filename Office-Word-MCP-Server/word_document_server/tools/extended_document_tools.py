@@ -5,14 +5,12 @@ These tools provide enhanced document content extraction and search capabilities
 """
 import os
 import json
-import subprocess
 import platform
-import shutil
 from typing import Dict, List, Optional, Any, Union, Tuple
-from docx import Document
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
-from word_document_server.utils.extended_document_utils import get_paragraph_text, find_text
+from word_document_server.utils.document_cache import load_document
+from word_document_server.utils.batch_utils import hash_file
 
 
 async def get_paragraph_text_from_document(filename: str, paragraph_index: int) -> str:
@@ -22,6 +20,8 @@ async def get_paragraph_text_from_document(filename: str, paragraph_index: int)
         filename: Path to the Word document
         paragraph_index: Index of the paragraph to retrieve (0-based)
     """
+    from word_document_server.utils.extended_document_utils import get_paragraph_text
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -47,6 +47,8 @@ async def find_text_in_document(filename: str, text_to_find: str, match_case: bo
         match_case: Whether to match case (True) or ignore case (False)
         whole_word: Whether to match whole words only (True) or substrings (False)
     """
+    from word_document_server.utils.extended_document_utils import find_text
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -63,6 +65,45 @@ async def find_text_in_document(filename: str, text_to_find: str, match_case: bo
         return f"Failed to search for text: {str(e)}"
 
 
+async def diff_documents(original_filename: str, revised_filename: str) -> str:
+    """Compare two Word documents and report the changed paragraphs and table cells.
+    
+    Args:
+        original_filename: Path to the original Word document
+        revised_filename: Path to the revised Word document
+    """
+    from word_document_server.core.diff import get_content_blocks, diff_content_blocks
+    
+    original_filename = ensure_docx_extension(original_filename)
+    revised_filename = ensure_docx_extension(revised_filename)
+    
+    for filename in (original_filename, revised_filename):
+        if not os.path.exists(filename):
+            return f"Document {filename} does not exist"
+    
+    try:
+        original_blocks = get_content_blocks(load_document(original_filename))
+        revised_blocks = get_content_blocks(load_document(revised_filename))
+        hunks = diff_content_blocks(original_blocks, revised_blocks)
+        
+        result = {
+            "original": original_filename,
+            "revised": revised_filename,
+            "original_block_count": len(original_blocks),
+            "revised_block_count": len(revised_blocks),
+            "identical": not hunks,
+            "summary": {
+                "hunks": len(hunks),
+                "blocks_removed": sum(len(hunk["removed"]) for hunk in hunks),
+                "blocks_added": sum(len(hunk["added"]) for hunk in hunks)
+            },
+            "hunks": hunks
+        }
+        return json.dumps(result, indent=2)
+    except Exception as e:
+        return f"Failed to compare documents: {str(e)}"
+
+
 async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -> str:
     """Convert a Word document to PDF format.
     
@@ -71,6 +112,8 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
         output_filename: Optional path for the output PDF. If not provided, 
                          will use the same name with .pdf extension
     """
+    from word_document_server.core.conversion import get_conversion_pool, get_pdf_cache
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -101,6 +144,12 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
         return f"Cannot create PDF: {error_message} (Path: {output_filename}, Dir: {output_dir})"
     
     try:
+        # Reuse an earlier conversion of identical content
+        digest = hash_file(filename)
+        pdf_cache = get_pdf_cache()
+        if pdf_cache.fetch(digest, output_filename):
+            return f"Document successfully converted to PDF: {output_filename} (from cache)"
+        
         # Determine platform for appropriate conversion method
         system = platform.system()
         
@@ -109,83 +158,98 @@ async def convert_to_pdf(filename: str, output_filename: Optional[str] = None) -
             try:
                 from docx2pdf import convert
                 convert(filename, output_filename)
+                pdf_cache.store(digest, output_filename)
                 return f"Document successfully converted to PDF: {output_filename}"
             except (ImportError, Exception) as e:
                 return f"Failed to convert document to PDF: {str(e)}\nNote: docx2pdf requires Microsoft Word to be installed."
                 
         elif system in ["Linux", "Darwin"]:  # Linux or macOS
-            # Try using LibreOffice if available (common on Linux/macOS)
-            try:
-                # Choose the appropriate command based on OS
-                if system == "Darwin":  # macOS
-                    lo_commands = ["soffice", "/Applications/LibreOffice.app/Contents/MacOS/soffice"]
-                else:  # Linux
-                    lo_commands = ["libreoffice", "soffice"]
-                
-                # Try each possible command
-                conversion_successful = False
-                errors = []
-                
-                for cmd_name in lo_commands:
-                    try:
-                        # Construct LibreOffice conversion command
-                        output_dir = os.path.dirname(output_filename)
-                        # If output_dir is empty, use current directory
-                        if not output_dir:
-                            output_dir = '.'
-                        # Ensure the directory exists
-                        os.makedirs(output_dir, exist_ok=True)
-                        
-                        cmd = [
-                            cmd_name, 
-                            '--headless', 
-                            '--convert-to', 
-                            'pdf', 
-                            '--outdir', 
-                            output_dir, 
-                            filename
-                        ]
-                        
-                        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-                        
-                        if result.returncode == 0:
-                            # LibreOffice creates the PDF with the same basename
-                            base_name = os.path.basename(filename)
-                            pdf_base_name = os.path.splitext(base_name)[0] + ".pdf"
-                            created_pdf = os.path.join(os.path.dirname(output_filename) or '.', pdf_base_name)
-                            
-                            # If the created PDF is not at the desired location, move it
-                            if created_pdf != output_filename and os.path.exists(created_pdf):
-                                shutil.move(created_pdf, output_filename)
-                            
-                            conversion_successful = True
-                            break  # Exit the loop if successful
-                        else:
-                            errors.append(f"{cmd_name} error: {result.stderr}")
-                    except (subprocess.SubprocessError, FileNotFoundError) as e:
-                        errors.append(f"{cmd_name} error: {str(e)}")
-                
-                if conversion_successful:
+            # Use the shared LibreOffice worker pool (common on Linux/macOS)
+            result = get_conversion_pool().convert_documents([(filename, output_filename)], [digest])[0]
+            
+            if result["success"]:
+                return f"Document successfully converted to PDF: {output_filename}"
+            else:
+                # If LibreOffice failed, try docx2pdf as fallback
+                try:
+                    from docx2pdf import convert
+                    convert(filename, output_filename)
+                    pdf_cache.store(digest, output_filename)
                     return f"Document successfully converted to PDF: {output_filename}"
-                else:
-                    # If all LibreOffice attempts failed, try docx2pdf as fallback
-                    try:
-                        from docx2pdf import convert
-                        convert(filename, output_filename)
-                        return f"Document successfully converted to PDF: {output_filename}"
-                    except (ImportError, Exception) as e:
-                        error_msg = "Failed to convert document to PDF using LibreOffice or docx2pdf.\n"
-                        error_msg += "LibreOffice errors: " + "; ".join(errors) + "\n"
-                        error_msg += f"docx2pdf error: {str(e)}\n"
-                        error_msg += "To convert documents to PDF, please install either:\n"
-                        error_msg += "1. LibreOffice (recommended for Linux/macOS)\n"
-                        error_msg += "2. Microsoft Word (required for docx2pdf on Windows/macOS)"
-                        return error_msg
-                        
-            except Exception as e:
-                return f"Failed to convert document to PDF: {str(e)}"
+                except (ImportError, Exception) as e:
+                    error_msg = "Failed to convert document to PDF using LibreOffice or docx2pdf.\n"
+                    error_msg += f"LibreOffice error: {result['error']}\n"
+                    error_msg += f"docx2pdf error: {str(e)}\n"
+                    error_msg += "To convert documents to PDF, please install either:\n"
+                    error_msg += "1. LibreOffice (recommended for Linux/macOS)\n"
+                    error_msg += "2. Microsoft Word (required for docx2pdf on Windows/macOS)"
+                    return error_msg
         else:
             return f"PDF conversion not supported on {system} platform"
             
     except Exception as e:
         return f"Failed to convert document to PDF: {str(e)}"
+
+
+async def convert_documents_to_pdf(filenames: List[str], output_directory: Optional[str] = None) -> str:
+    """Convert several Word documents to PDF in one batch.
+    
+    Documents are converted by a shared pool of LibreOffice workers, so the
+    LibreOffice start-up cost is paid once per worker rather than per document.
+    Documents whose content was converted before are served from the PDF cache.
+    
+    Args:
+        filenames: Paths to the Word documents
+        output_directory: Optional directory for the PDFs. If not provided, each PDF
+                          is written next to its document.
+    """
+    from word_document_server.core.conversion import get_conversion_pool
+    
+    if not filenames:
+        return "No documents specified"
+    
+    if platform.system() not in ["Linux", "Darwin"]:
+        return "Batch PDF conversion requires LibreOffice on Linux or macOS. Use convert_to_pdf instead."
+    
+    if output_directory:
+        output_directory = os.path.abspath(output_directory)
+        os.makedirs(output_directory, exist_ok=True)
+    
+    jobs = []
+    positions = []
+    results = [None] * len(filenames)
+    outputs = set()
+    for position, filename in enumerate(filenames):
+        filename = ensure_docx_extension(filename)
+        if not os.path.exists(filename):
+            results[position] = {"source": filename, "success": False, "error": "Document does not exist"}
+            continue
+        
+        base_name = os.path.splitext(os.path.basename(filename))[0]
+        directory = output_directory or os.path.dirname(os.path.abspath(filename))
+        output_filename = os.path.join(directory, f"{base_name}.pdf")
+        if output_filename in outputs:
+            results[position] = {"source": filename, "success": False,
+                                 "error": f"Output {output_filename} is already used by another document in this batch"}
+            continue
+        outputs.add(output_filename)
+        
+        is_writeable, error_message = check_file_writeable(output_filename)
+        if not is_writeable:
+            results[position] = {"source": filename, "success": False, "error": error_message}
+            continue
+        jobs.append((filename, output_filename))
+        positions.append(position)
+    
+    try:
+        # Results are reported in input order
+        for position, result in zip(positions, get_conversion_pool().convert_documents(jobs)):
+            results[position] = result
+        converted = sum(1 for result in results if result["success"])
+        return json.dumps({
+            "converted": converted,
+            "failed": len(results) - converted,
+            "results": results
+        }, indent=2)
+    except Exception as e:
+        return f"Failed to convert documents to PDF: {str(e)}"
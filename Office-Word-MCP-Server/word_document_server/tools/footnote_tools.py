@@ -5,17 +5,10 @@ These tools handle footnote and endnote functionality,
 including adding, customizing, and converting between them.
 """
 import os
-from typing import Optional
-from docx import Document
-from docx.shared import Pt
-from docx.enum.style import WD_STYLE_TYPE
+from typing import Any, List, Optional
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
-from word_document_server.core.footnotes import (
-    find_footnote_references,
-    get_format_symbols,
-    customize_footnote_formatting
-)
+from word_document_server.utils.document_cache import load_document, save_document
 
 
 async def add_footnote_to_document(filename: str, paragraph_index: int, footnote_text: str) -> str:
@@ -26,6 +19,8 @@ async def add_footnote_to_document(filename: str, paragraph_index: int, footnote
         paragraph_index: Index of the paragraph to add footnote to (0-based)
         footnote_text: Text content of the footnote
     """
+    from word_document_server.core.footnotes import add_footnote
+    
     filename = ensure_docx_extension(filename)
     
     # Ensure paragraph_index is an integer
@@ -43,47 +38,17 @@ async def add_footnote_to_document(filename: str, paragraph_index: int, footnote
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
+        paragraphs = doc.paragraphs
         
         # Validate paragraph index
-        if paragraph_index < 0 or paragraph_index >= len(doc.paragraphs):
-            return f"Invalid paragraph index. Document has {len(doc.paragraphs)} paragraphs (0-{len(doc.paragraphs)-1})."
+        if paragraph_index < 0 or paragraph_index >= len(paragraphs):
+            return f"Invalid paragraph index. Document has {len(paragraphs)} paragraphs (0-{len(paragraphs)-1})."
         
-        paragraph = doc.paragraphs[paragraph_index]
+        add_footnote(doc, paragraphs[paragraph_index], footnote_text)
         
-        # In python-docx, we'd use paragraph.add_footnote(), but we'll use a more robust approach
-        try:
-            footnote = paragraph.add_run()
-            footnote.text = ""
-            
-            # Create the footnote reference
-            reference = footnote.add_footnote(footnote_text)
-            
-            doc.save(filename)
-            return f"Footnote added to paragraph {paragraph_index} in {filename}"
-        except AttributeError:
-            # Fall back to a simpler approach if direct footnote addition fails
-            last_run = paragraph.add_run()
-            last_run.text = "¹"  # Unicode superscript 1
-            last_run.font.superscript = True
-            
-            # Add a footnote section at the end if it doesn't exist
-            found_footnote_section = False
-            for p in doc.paragraphs:
-                if p.text.startswith("Footnotes:"):
-                    found_footnote_section = True
-                    break
-            
-            if not found_footnote_section:
-                doc.add_paragraph("\n").add_run()
-                doc.add_paragraph("Footnotes:").bold = True
-            
-            # Add footnote text
-            footnote_para = doc.add_paragraph("¹ " + footnote_text)
-            footnote_para.style = "Footnote Text" if "Footnote Text" in doc.styles else "Normal"
-            
-            doc.save(filename)
-            return f"Footnote added to paragraph {paragraph_index} in {filename} (simplified approach)"
+        save_document(doc, filename)
+        return f"Footnote added to paragraph {paragraph_index} in {filename}"
     except Exception as e:
         return f"Failed to add footnote: {str(e)}"
 
@@ -96,6 +61,8 @@ async def add_endnote_to_document(filename: str, paragraph_index: int, endnote_t
         paragraph_index: Index of the paragraph to add endnote to (0-based)
         endnote_text: Text content of the endnote
     """
+    from word_document_server.core.footnotes import add_endnote
+    
     filename = ensure_docx_extension(filename)
     
     # Ensure paragraph_index is an integer
@@ -113,49 +80,51 @@ async def add_endnote_to_document(filename: str, paragraph_index: int, endnote_t
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
+        paragraphs = doc.paragraphs
         
         # Validate paragraph index
-        if paragraph_index < 0 or paragraph_index >= len(doc.paragraphs):
-            return f"Invalid paragraph index. Document has {len(doc.paragraphs)} paragraphs (0-{len(doc.paragraphs)-1})."
-        
-        paragraph = doc.paragraphs[paragraph_index]
-        
-        # Add endnote reference
-        last_run = paragraph.add_run()
-        last_run.text = "†"  # Unicode dagger symbol common for endnotes
-        last_run.font.superscript = True
-        
-        # Check if endnotes section exists, if not create it
-        endnotes_heading_found = False
-        for para in doc.paragraphs:
-            if para.text == "Endnotes:" or para.text == "ENDNOTES":
-                endnotes_heading_found = True
-                break
-        
-        if not endnotes_heading_found:
-            # Add a page break before endnotes section
-            doc.add_page_break()
-            doc.add_heading("Endnotes:", level=1)
+        if paragraph_index < 0 or paragraph_index >= len(paragraphs):
+            return f"Invalid paragraph index. Document has {len(paragraphs)} paragraphs (0-{len(paragraphs)-1})."
         
-        # Add the endnote text
-        endnote_para = doc.add_paragraph("† " + endnote_text)
-        endnote_para.style = "Endnote Text" if "Endnote Text" in doc.styles else "Normal"
+        add_endnote(doc, paragraphs[paragraph_index], endnote_text)
         
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Endnote added to paragraph {paragraph_index} in {filename}"
     except Exception as e:
         return f"Failed to add endnote: {str(e)}"
 
 
-async def convert_footnotes_to_endnotes_in_document(filename: str) -> str:
-    """Convert all footnotes to endnotes in a Word document.
+async def add_notes(filename: str, notes: List[Any], note_type: str = "footnote") -> str:
+    """Add many footnotes or endnotes to a Word document in one operation.
     
     Args:
         filename: Path to the Word document
+        notes: List of notes, each a [paragraph_index, text] pair or a dictionary
+               with paragraph_index and text
+        note_type: 'footnote' or 'endnote'
     """
+    from word_document_server.core.footnotes import add_notes as add_document_notes
+    
     filename = ensure_docx_extension(filename)
     
+    if note_type not in ("footnote", "endnote"):
+        return "Invalid parameter: note_type must be 'footnote' or 'endnote'"
+    
+    if not isinstance(notes, list) or not notes:
+        return "Invalid parameter: notes must be a non-empty list"
+    
+    entries = []
+    for i, note in enumerate(notes):
+        try:
+            if isinstance(note, dict):
+                paragraph_index, text = note["paragraph_index"], note["text"]
+            else:
+                paragraph_index, text = note
+            entries.append((int(paragraph_index), str(text)))
+        except (KeyError, ValueError, TypeError):
+            return f"Invalid note {i}: expected [paragraph_index, text] or {{\"paragraph_index\": ..., \"text\": ...}}"
+    
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
     
@@ -165,69 +134,50 @@ async def convert_footnotes_to_endnotes_in_document(filename: str) -> str:
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
-  
-      
-        # Find all runs that might be footnote references
-        footnote_references = []
-        
-        for para_idx, para in enumerate(doc.paragraphs):
-            for run_idx, run in enumerate(para.runs):
-                # Check if this run is likely a footnote reference
-                # (superscript number or special character)
-                if run.font.superscript and (run.text.isdigit() or run.text in "¹²³⁴⁵⁶⁷⁸⁹"):
-                    footnote_references.append({
-                        "paragraph_index": para_idx,
-                        "run_index": run_idx,
-                        "text": run.text
-                    })
+        doc = load_document(filename, for_update=True)
+        paragraphs = doc.paragraphs
         
-        if not footnote_references:
-            return f"No footnote references found in {filename}"
+        for i, (paragraph_index, _) in enumerate(entries):
+            if paragraph_index < 0 or paragraph_index >= len(paragraphs):
+                return f"Invalid paragraph index {paragraph_index} in note {i}. Document has {len(paragraphs)} paragraphs (0-{len(paragraphs)-1})."
         
-        # Create endnotes section
-        doc.add_page_break()
-        doc.add_heading("Endnotes:", level=1)
+        add_document_notes(doc, [(paragraphs[index], text) for index, text in entries], note_type)
         
-        # Create a placeholder for endnote content, we'll fill it later
-        endnote_content = []
-        
-        # Find the footnote text at the bottom of the page
-       
-        found_footnote_section = False
-        footnote_text = []
-        
-        for para in doc.paragraphs:
-            if not found_footnote_section and para.text.startswith("Footnotes:"):
-                found_footnote_section = True
-                continue
-            
-            if found_footnote_section:
-                footnote_text.append(para.text)
+        save_document(doc, filename)
+        return f"Added {len(entries)} {note_type}(s) to {filename}"
+    except Exception as e:
+        return f"Failed to add notes: {str(e)}"
+
+
+async def convert_footnotes_to_endnotes_in_document(filename: str) -> str:
+    """Convert all footnotes to endnotes in a Word document.
+    
+    Args:
+        filename: Path to the Word document
+    """
+    from word_document_server.core.footnotes import convert_footnotes_to_endnotes
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
         
-        # Create endnotes based on footnote references
-        for i, ref in enumerate(footnote_references):
-            # Add a new endnote
-            endnote_para = doc.add_paragraph()
-            
-            # Try to match with footnote text, or use placeholder
-            if i < len(footnote_text):
-                endnote_para.text = f"†{i+1} {footnote_text[i]}"
-            else:
-                endnote_para.text = f"†{i+1} Converted from footnote {ref['text']}"
-            
-            # Change the footnote reference to an endnote reference
-            try:
-                paragraph = doc.paragraphs[ref["paragraph_index"]]
-                paragraph.runs[ref["run_index"]].text = f"†{i+1}"
-            except IndexError:
-                # Skip if we can't locate the reference
-                pass
+        count = convert_footnotes_to_endnotes(doc)
+        if not count:
+            return f"No footnotes found in {filename}"
         
         # Save the document
-        doc.save(filename)
+        save_document(doc, filename)
         
-        return f"Converted {len(footnote_references)} footnotes to endnotes in {filename}"
+        return f"Converted {count} footnotes to endnotes in {filename}"
     except Exception as e:
         return f"Failed to convert footnotes to endnotes: {str(e)}"
 
@@ -239,13 +189,32 @@ async def customize_footnote_style(filename: str, numbering_format: str = "1, 2,
     
     Args:
         filename: Path to the Word document
-        numbering_format: Format for footnote numbers (e.g., "1, 2, 3", "i, ii, iii", "a, b, c")
+        numbering_format: Format for footnote numbers ("1, 2, 3", "i, ii, iii", "I, II, III",
+                          "a, b, c", "A, B, C" or "*, †, ‡")
         start_number: Number to start footnote numbering from
         font_name: Optional font name for footnotes
         font_size: Optional font size for footnotes (in points)
     """
+    from docx.shared import Pt
+    from word_document_server.core.footnotes import (
+        FOOTNOTE,
+        NUMBER_FORMATS,
+        ensure_note_styles,
+        set_note_numbering
+    )
+    
     filename = ensure_docx_extension(filename)
     
+    if numbering_format not in NUMBER_FORMATS:
+        return f"Invalid numbering format '{numbering_format}'. Use one of: {'; '.join(NUMBER_FORMATS)}"
+    
+    try:
+        start_number = int(start_number)
+        if font_size is not None:
+            font_size = int(font_size)
+    except (ValueError, TypeError):
+        return "Invalid parameter: start_number and font_size must be integers"
+    
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
     
@@ -255,36 +224,22 @@ async def customize_footnote_style(filename: str, numbering_format: str = "1, 2,
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         
         # Create or get footnote style
-        footnote_style_name = "Footnote Text"
-        footnote_style = None
-        
-        try:
-            footnote_style = doc.styles[footnote_style_name]
-        except KeyError:
-            # Create the style if it doesn't exist
-            footnote_style = doc.styles.add_style(footnote_style_name, WD_STYLE_TYPE.PARAGRAPH)
+        footnote_style = ensure_note_styles(doc, FOOTNOTE)
         
         # Apply formatting to footnote style
-        if footnote_style:
-            if font_name:
-                footnote_style.font.name = font_name
-            if font_size:
-                footnote_style.font.size = Pt(font_size)
-        
-        # Find all existing footnote references
-        footnote_refs = find_footnote_references(doc)
-        
-        # Generate format symbols for the specified numbering format
-        format_symbols = get_format_symbols(numbering_format, len(footnote_refs) + start_number)
+        if font_name:
+            footnote_style.font.name = font_name
+        if font_size:
+            footnote_style.font.size = Pt(font_size)
         
-        # Apply custom formatting to footnotes
-        count = customize_footnote_formatting(doc, footnote_refs, format_symbols, start_number, footnote_style)
+        # Word numbers the notes itself, from the section properties
+        set_note_numbering(doc, "footnote", NUMBER_FORMATS[numbering_format], start_number)
         
         # Save the document
-        doc.save(filename)
+        save_document(doc, filename)
         
         return f"Footnote style and numbering customized in {filename}"
     except Exception as e:
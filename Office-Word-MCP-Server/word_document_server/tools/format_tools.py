@@ -6,15 +6,9 @@ including text formatting, table formatting, and custom styles.
 """
 import os
 from typing import List, Optional, Dict, Any
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_COLOR_INDEX
-from docx.enum.style import WD_STYLE_TYPE
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
-from word_document_server.utils.document_utils import find_and_replace_text
-from word_document_server.core.styles import create_style
-from word_document_server.core.tables import apply_table_style
+from word_document_server.utils.document_cache import load_document, save_document
 
 
 async def format_text(filename: str, paragraph_index: int, start_pos: int, end_pos: int, 
@@ -23,6 +17,9 @@ async def format_text(filename: str, paragraph_index: int, start_pos: int, end_p
                      font_size: Optional[int] = None, font_name: Optional[str] = None) -> str:
     """Format a specific range of text within a paragraph.
     
+    Only the runs that straddle the range are split; the rest of the paragraph
+    keeps its formatting.
+    
     Args:
         filename: Path to the Word document
         paragraph_index: Index of the paragraph (0-based)
@@ -35,6 +32,8 @@ async def format_text(filename: str, paragraph_index: int, start_pos: int, end_p
         font_size: Font size in points
         font_name: Font name/family
     """
+    from word_document_server.core.runs import normalize_formatting, validate_span, format_document_spans
+    
     filename = ensure_docx_extension(filename)
     
     # Ensure numeric parameters are the correct type
@@ -47,6 +46,14 @@ async def format_text(filename: str, paragraph_index: int, start_pos: int, end_p
     except (ValueError, TypeError):
         return "Invalid parameter: paragraph_index, start_pos, end_pos, and font_size must be integers"
     
+    try:
+        formatting = normalize_formatting({
+            "bold": bold, "italic": italic, "underline": underline,
+            "color": color, "font_size": font_size, "font_name": font_name
+        })
+    except ValueError as e:
+        return f"Invalid formatting: {str(e)}"
+    
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
     
@@ -56,75 +63,149 @@ async def format_text(filename: str, paragraph_index: int, start_pos: int, end_p
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
+        paragraphs = doc.paragraphs
         
-        # Validate paragraph index
-        if paragraph_index < 0 or paragraph_index >= len(doc.paragraphs):
-            return f"Invalid paragraph index. Document has {len(doc.paragraphs)} paragraphs (0-{len(doc.paragraphs)-1})."
+        error = validate_span(paragraphs, paragraph_index, start_pos, end_pos)
+        if error:
+            return error
         
-        paragraph = doc.paragraphs[paragraph_index]
-        text = paragraph.text
+        target_text = paragraphs[paragraph_index].text[start_pos:end_pos]
+        format_document_spans(paragraphs, [(paragraph_index, start_pos, end_pos, formatting)])
         
-        # Validate text positions
-        if start_pos < 0 or end_pos > len(text) or start_pos >= end_pos:
-            return f"Invalid text positions. Paragraph has {len(text)} characters."
+        save_document(doc, filename)
+        return f"Text '{target_text}' formatted successfully in paragraph {paragraph_index}."
+    except Exception as e:
+        return f"Failed to format text: {str(e)}"
+
+
+async def format_text_ranges(filename: str, ranges: List[Dict[str, Any]]) -> str:
+    """Format many ranges of text, across any paragraphs, in one operation.
+    
+    Only the runs that straddle a range boundary are split; everything else keeps
+    its formatting. Ranges are applied in order, so a later range overrides an
+    earlier one where they overlap.
+    
+    Args:
+        filename: Path to the Word document
+        ranges: List of ranges, each a dictionary with paragraph_index, start_pos and
+                end_pos plus any of bold, italic, underline, color, font_size,
+                font_name and highlight (e.g. 'yellow')
+    """
+    from word_document_server.core.runs import normalize_formatting, validate_span, format_document_spans
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not isinstance(ranges, list) or not ranges:
+        return "Invalid parameter: ranges must be a non-empty list"
+    
+    spans = []
+    for i, item in enumerate(ranges):
+        if not isinstance(item, dict):
+            return f"Invalid range {i}: must be a dictionary"
+        options = dict(item)
+        try:
+            paragraph_index = int(options.pop("paragraph_index"))
+            start_pos = int(options.pop("start_pos"))
+            end_pos = int(options.pop("end_pos"))
+        except KeyError as e:
+            return f"Invalid range {i}: missing {e.args[0]}"
+        except (ValueError, TypeError):
+            return f"Invalid range {i}: paragraph_index, start_pos and end_pos must be integers"
+        try:
+            formatting = normalize_formatting(options)
+        except ValueError as e:
+            return f"Invalid range {i}: {str(e)}"
+        spans.append((paragraph_index, start_pos, end_pos, formatting))
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
+        paragraphs = doc.paragraphs
+        
+        for paragraph_index, start_pos, end_pos, _ in spans:
+            error = validate_span(paragraphs, paragraph_index, start_pos, end_pos)
+            if error:
+                return error
         
-        # Get the text to format
-        target_text = text[start_pos:end_pos]
+        runs = format_document_spans(paragraphs, spans)
+        
+        save_document(doc, filename)
+        return f"Formatted {len(spans)} range(s) ({runs} runs) in {filename}."
+    except Exception as e:
+        return f"Failed to format text ranges: {str(e)}"
+
+
+async def format_matches(filename: str, pattern: str, formatting: Dict[str, Any],
+                         regex: bool = False, match_case: bool = True, whole_word: bool = False,
+                         include_tables: bool = True) -> str:
+    """Format every occurrence of a text or regular expression in one operation.
+    
+    Matches are found and formatted in a single pass over the document, so there
+    are no separate search results whose positions could go stale.
+    
+    Args:
+        filename: Path to the Word document
+        pattern: Text to find, or a regular expression if regex is True
+        formatting: Formatting to apply, with any of bold, italic, underline, color,
+                    font_size, font_name and highlight (e.g. {"highlight": "yellow"})
+        regex: Whether pattern is a regular expression
+        match_case: Whether to match case (True) or ignore case (False)
+        whole_word: Whether to match whole words only
+        include_tables: Whether to also format matches inside tables
+    """
+    import re
+    from word_document_server.core.runs import (
+        normalize_formatting, compile_search_pattern, iter_document_paragraphs, format_pattern_matches
+    )
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not pattern:
+        return "Invalid parameter: pattern cannot be empty"
+    
+    if not isinstance(formatting, dict) or not formatting:
+        return "Invalid parameter: formatting must be a non-empty dictionary"
+    
+    try:
+        normalized = normalize_formatting(formatting)
+    except ValueError as e:
+        return f"Invalid formatting: {str(e)}"
+    
+    try:
+        compiled = compile_search_pattern(pattern, regex, match_case, whole_word)
+    except re.error as e:
+        return f"Invalid regular expression: {str(e)}"
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
         
-        # Clear existing runs and create three runs: before, target, after
-        for run in paragraph.runs:
-            run.clear()
+        matches, paragraphs = format_pattern_matches(
+            iter_document_paragraphs(doc, include_tables), compiled, normalized
+        )
         
-        # Add text before target
-        if start_pos > 0:
-            run_before = paragraph.add_run(text[:start_pos])
+        if not matches:
+            return f"No matches for '{pattern}' found in {filename}."
         
-        # Add target text with formatting
-        run_target = paragraph.add_run(target_text)
-        if bold is not None:
-            run_target.bold = bold
-        if italic is not None:
-            run_target.italic = italic
-        if underline is not None:
-            run_target.underline = underline
-        if color:
-            # Define common RGB colors
-            color_map = {
-                'red': RGBColor(255, 0, 0),
-                'blue': RGBColor(0, 0, 255),
-                'green': RGBColor(0, 128, 0),
-                'yellow': RGBColor(255, 255, 0),
-                'black': RGBColor(0, 0, 0),
-                'gray': RGBColor(128, 128, 128),
-                'white': RGBColor(255, 255, 255),
-                'purple': RGBColor(128, 0, 128),
-                'orange': RGBColor(255, 165, 0)
-            }
-            
-            try:
-                if color.lower() in color_map:
-                    # Use predefined RGB color
-                    run_target.font.color.rgb = color_map[color.lower()]
-                else:
-                    # Try to set color by name
-                    run_target.font.color.rgb = RGBColor.from_string(color)
-            except Exception as e:
-                # If all else fails, default to black
-                run_target.font.color.rgb = RGBColor(0, 0, 0)
-        if font_size:
-            run_target.font.size = Pt(font_size)
-        if font_name:
-            run_target.font.name = font_name
-        
-        # Add text after target
-        if end_pos < len(text):
-            run_after = paragraph.add_run(text[end_pos:])
-        
-        doc.save(filename)
-        return f"Text '{target_text}' formatted successfully in paragraph {paragraph_index}."
+        save_document(doc, filename)
+        return f"Formatted {matches} match(es) of '{pattern}' in {paragraphs} paragraph(s)."
     except Exception as e:
-        return f"Failed to format text: {str(e)}"
+        return f"Failed to format matches: {str(e)}"
 
 
 async def create_custom_style(filename: str, style_name: str, 
@@ -143,6 +224,9 @@ async def create_custom_style(filename: str, style_name: str,
         color: Text color (e.g., 'red', 'blue')
         base_style: Optional existing style to base this on
     """
+    from docx.enum.style import WD_STYLE_TYPE
+    from word_document_server.core.styles import create_style, get_style_registry
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -154,7 +238,10 @@ async def create_custom_style(filename: str, style_name: str,
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
+        
+        if style_name in get_style_registry(doc):
+            return f"Style '{style_name}' already exists in {filename}."
         
         # Build font properties dictionary
         font_properties = {}
@@ -178,12 +265,72 @@ async def create_custom_style(filename: str, style_name: str,
             font_properties=font_properties
         )
         
-        doc.save(filename)
+        save_document(doc, filename)
         return f"Style '{style_name}' created successfully."
     except Exception as e:
         return f"Failed to create style: {str(e)}"
 
 
+async def create_styles(filename: str, styles: List[Dict[str, Any]]) -> str:
+    """Create several custom styles in one operation.
+    
+    Styles are created in order, so a style can be based on one defined earlier
+    in the list. Styles that already exist are left unchanged.
+    
+    Args:
+        filename: Path to the Word document
+        styles: List of style definitions, each a dictionary with style_name and
+                optionally style_type ('paragraph', 'character' or 'table', default
+                'paragraph'), base_style, bold, italic, font_size, font_name and color
+    """
+    from word_document_server.core.styles import create_style, get_style_registry, parse_style_definitions
+    
+    filename = ensure_docx_extension(filename)
+    
+    if not isinstance(styles, list) or not styles:
+        return "Invalid parameter: styles must be a non-empty list"
+    
+    try:
+        definitions = parse_style_definitions(styles)
+    except ValueError as e:
+        return str(e)
+    
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+    
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}. Consider creating a copy first."
+    
+    try:
+        doc = load_document(filename, for_update=True)
+        registry = get_style_registry(doc)
+        
+        created = []
+        existing = []
+        for style_name, style_type, base_style, font_properties in definitions:
+            if style_name in registry:
+                existing.append(style_name)
+                continue
+            if base_style and base_style not in registry:
+                return f"Cannot create style '{style_name}': base style '{base_style}' not found. No styles were created."
+            create_style(doc, style_name, style_type, base_style=base_style, font_properties=font_properties)
+            created.append(style_name)
+        
+        message = f"Created {len(created)} style(s)"
+        if created:
+            message += f": {', '.join(created)}"
+        if existing:
+            message += f". Already present: {', '.join(existing)}"
+        
+        if created:
+            save_document(doc, filename)
+        return message + "."
+    except Exception as e:
+        return f"Failed to create styles: {str(e)}"
+
+
 async def format_table(filename: str, table_index: int, 
                       has_header_row: Optional[bool] = None,
                       border_style: Optional[str] = None,
@@ -197,6 +344,8 @@ async def format_table(filename: str, table_index: int,
         border_style: Style for borders ('none', 'single', 'double', 'thick')
         shading: 2D list of cell background colors (by row and column)
     """
+    from word_document_server.core.tables import apply_table_style
+    
     filename = ensure_docx_extension(filename)
     
     if not os.path.exists(filename):
@@ -208,7 +357,7 @@ async def format_table(filename: str, table_index: int,
         return f"Cannot modify document: {error_message}. Consider creating a copy first."
     
     try:
-        doc = Document(filename)
+        doc = load_document(filename, for_update=True)
         
         # Validate table index
         if table_index < 0 or table_index >= len(doc.tables):
@@ -220,7 +369,7 @@ async def format_table(filename: str, table_index: int,
         success = apply_table_style(table, has_header_row, border_style, shading)
         
         if success:
-            doc.save(filename)
+            save_document(doc, filename)
             return f"Table at index {table_index} formatted successfully."
         else:
             return f"Failed to format table at index {table_index}."
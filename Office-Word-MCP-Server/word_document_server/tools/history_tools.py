@@ -0,0 +1,124 @@
+"""
+Edit history tools for Word Document Server.
+
+These tools roll documents back using the edit journal, which records a
+small inverse patch for every edit instead of a full copy of the file.
+"""
+import os
+import json
+
+from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
+from word_document_server.utils.document_cache import get_document_cache
+
+
+async def undo_last_edit(filename: str) -> str:
+    """Undo the most recent edit made to a Word document through this server.
+
+    Args:
+        filename: Path to the Word document
+    """
+    from word_document_server.utils.edit_journal import get_edit_journal, JournalError
+
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}."
+
+    journal = get_edit_journal()
+    if not journal.enabled:
+        return "Cannot undo: the edit journal is disabled (set WORD_MCP_JOURNAL_MB to enable it)"
+
+    try:
+        entry = journal.undo(filename)
+        get_document_cache().invalidate(filename)
+        label = f" ({entry['label']})" if entry["label"] else ""
+        return f"Undid edit {entry['id']}{label} from {entry['timestamp']} in {filename}"
+    except JournalError as e:
+        return f"Cannot undo: {str(e)}"
+    except Exception as e:
+        return f"Failed to undo edit: {str(e)}"
+
+
+async def create_snapshot(filename: str, snapshot_name: str) -> str:
+    """Mark the current state of a Word document as a named rollback point.
+
+    Unlike copy_document, no copy of the file is made; later edits are journaled
+    as small patches that restore_snapshot rolls back.
+
+    Args:
+        filename: Path to the Word document
+        snapshot_name: Name of the snapshot (replaces an existing snapshot with this name)
+    """
+    from word_document_server.utils.edit_journal import get_edit_journal
+
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    journal = get_edit_journal()
+    if not journal.enabled:
+        return "Cannot create snapshot: the edit journal is disabled (set WORD_MCP_JOURNAL_MB to enable it)"
+
+    try:
+        journal.create_snapshot(filename, snapshot_name)
+        return f"Snapshot '{snapshot_name}' created for {filename}"
+    except Exception as e:
+        return f"Failed to create snapshot: {str(e)}"
+
+
+async def restore_snapshot(filename: str, snapshot_name: str) -> str:
+    """Roll a Word document back to a snapshot created with create_snapshot.
+
+    Args:
+        filename: Path to the Word document
+        snapshot_name: Name of the snapshot
+    """
+    from word_document_server.utils.edit_journal import get_edit_journal, JournalError
+
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot modify document: {error_message}."
+
+    journal = get_edit_journal()
+    try:
+        undone = journal.restore_snapshot(filename, snapshot_name)
+        get_document_cache().invalidate(filename)
+        return f"Restored {filename} to snapshot '{snapshot_name}' ({undone} edits undone)"
+    except JournalError as e:
+        available = ", ".join(sorted(journal.list_snapshots(filename))) or "none"
+        return f"Cannot restore snapshot: {str(e)}. Available snapshots: {available}"
+    except Exception as e:
+        return f"Failed to restore snapshot: {str(e)}"
+
+
+async def get_edit_history(filename: str) -> str:
+    """List the journaled edits and snapshots of a Word document.
+
+    Args:
+        filename: Path to the Word document
+    """
+    from word_document_server.utils.edit_journal import get_edit_journal
+
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
+
+    try:
+        journal = get_edit_journal()
+        return json.dumps({
+            "edits": journal.history(filename),
+            "snapshots": journal.list_snapshots(filename)
+        }, indent=2)
+    except Exception as e:
+        return f"Failed to get edit history: {str(e)}"
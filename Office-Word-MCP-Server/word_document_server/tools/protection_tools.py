@@ -6,21 +6,13 @@ password protection, restricted editing, and digital signatures.
 """
 import os
 import hashlib
+import json
 import datetime
-import io 
 from typing import List, Optional, Dict, Any
-from docx import Document
-import msoffcrypto 
 
 from word_document_server.utils.file_utils import check_file_writeable, ensure_docx_extension
-
-
-
-from word_document_server.core.protection import (
-    add_protection_info,
-    verify_document_protection,
-    create_signature_info
-)
+from word_document_server.utils.document_cache import load_document, save_document
+from word_document_server.utils.protected_sessions import get_session
 
 
 async def protect_document(filename: str, password: str) -> str:
@@ -30,53 +22,93 @@ async def protect_document(filename: str, password: str) -> str:
         filename: Path to the Word document
         password: Password to protect the document with
     """
+    from word_document_server.core.protection import protect_file
+    
     filename = ensure_docx_extension(filename)
 
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
 
+    if get_session(filename) is not None:
+        return f"Cannot protect document: {filename} is open in a protected session"
+
     # Check if file is writeable
     is_writeable, error_message = check_file_writeable(filename)
     if not is_writeable:
         return f"Cannot protect document: {error_message}"
 
     try:
-        # Read the original file content
-        with open(filename, "rb") as infile:
-            original_data = infile.read()
+        protect_file(filename, password)
+        return f"Document {filename} encrypted successfully with password."
+    except Exception as e:
+        # The original file is only replaced once encryption has succeeded
+        return f"Failed to encrypt document {filename}: {str(e)}. Original file left unchanged."
 
-        # Create an msoffcrypto file object from the original data
-        file = msoffcrypto.OfficeFile(io.BytesIO(original_data))
-        file.load_key(password=password) # Set the password for encryption
 
-        # Encrypt the data into an in-memory buffer
-        encrypted_data_io = io.BytesIO()
+async def protect_documents(filenames: List[str], password: str, max_workers: Optional[int] = None) -> str:
+    """Add password protection to several Word documents in one batch.
+    
+    Documents are encrypted in parallel worker processes, each streaming its
+    document to a temporary file that atomically replaces the original.
+    
+    Args:
+        filenames: Paths to the Word documents
+        password: Password to protect the documents with
+        max_workers: Optional number of worker processes (defaults to the CPU count)
+    """
+    from word_document_server.core.protection import protect_file
+    from word_document_server.utils.batch_utils import iter_process_pool
+    
+    if not filenames:
+        return "No documents specified"
+    
+    jobs = []
+    positions = {}
+    results = [None] * len(filenames)
+    seen = set()
+    for position, filename in enumerate(filenames):
+        filename = ensure_docx_extension(filename)
+        if not os.path.exists(filename):
+            results[position] = {"source": filename, "success": False, "error": "Document does not exist"}
+            continue
         
-        file.encrypt(password=password, outfile=encrypted_data_io) 
-
-        # Overwrite the original file with the encrypted data
-        with open(filename, "wb") as outfile:
-            outfile.write(encrypted_data_io.getvalue())
-
+        if get_session(filename) is not None:
+            results[position] = {"source": filename, "success": False,
+                                 "error": "Document is open in a protected session"}
+            continue
         
-        base_path, _ = os.path.splitext(filename)
-        metadata_path = f"{base_path}.protection"
-        if os.path.exists(metadata_path):
-            os.remove(metadata_path)
-
-        return f"Document {filename} encrypted successfully with password."
-
-    except Exception as e:
-        # Attempt to restore original file content on failure
-        try:
-            if 'original_data' in locals():
-                with open(filename, "wb") as outfile:
-                    outfile.write(original_data)
-                return f"Failed to encrypt document {filename}: {str(e)}. Original file restored."
+        path = os.path.abspath(filename)
+        if path in seen:
+            results[position] = {"source": filename, "success": False,
+                                 "error": "Document appears more than once in this batch"}
+            continue
+        seen.add(path)
+        
+        is_writeable, error_message = check_file_writeable(filename)
+        if not is_writeable:
+            results[position] = {"source": filename, "success": False, "error": error_message}
+            continue
+        jobs.append((filename, password))
+        positions[filename] = position
+    
+    try:
+        if max_workers is not None:
+            max_workers = max(1, int(max_workers))
+        max_workers = min(max_workers or os.cpu_count() or 1, len(jobs)) or 1
+        # Results complete in any order but are reported in input order
+        for (filename, _), _, error in iter_process_pool(protect_file, jobs, max_workers):
+            if error is not None:
+                results[positions[filename]] = {"source": filename, "success": False, "error": str(error)}
             else:
-                 return f"Failed to encrypt document {filename}: {str(e)}. Could not restore original file."
-        except Exception as restore_e:
-             return f"Failed to encrypt document {filename}: {str(e)}. Also failed to restore original file: {str(restore_e)}"
+                results[positions[filename]] = {"source": filename, "success": True}
+        encrypted = sum(1 for result in results if result["success"])
+        return json.dumps({
+            "encrypted": encrypted,
+            "failed": len(results) - encrypted,
+            "results": results
+        }, indent=2)
+    except Exception as e:
+        return f"Failed to encrypt documents: {str(e)}"
 
 
 async def add_restricted_editing(filename: str, password: str, editable_sections: List[str]) -> str:
@@ -87,6 +119,8 @@ async def add_restricted_editing(filename: str, password: str, editable_sections
         password: Password to protect the document with
         editable_sections: List of section names that can be edited
     """
+    from word_document_server.core.protection import add_protection_info
+    
     filename = ensure_docx_extension(filename)
 
     if not os.path.exists(filename):
@@ -127,21 +161,40 @@ async def add_digital_signature(filename: str, signer_name: str, reason: Optiona
         signer_name: Name of the person signing the document
         reason: Optional reason for signing
     """
+    from word_document_server.core.protection import add_protection_info, create_signature_info
+    from word_document_server.core.signatures import build_hash_tree
+    
     filename = ensure_docx_extension(filename)
 
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
 
+    if get_session(filename) is not None:
+        return f"Cannot add signature to document: {filename} is open in a protected session"
+
     # Check if file is writeable
     is_writeable, error_message = check_file_writeable(filename)
     if not is_writeable:
         return f"Cannot add signature to document: {error_message}"
 
     try:
-        doc = Document(filename)
-
-        # Create signature info
-        signature_info = create_signature_info(doc, signer_name, reason)
+        doc = load_document(filename, for_update=True)
+
+        # Add a visible signature block to the document
+        signed_at = datetime.datetime.now()
+        signature_id = hashlib.sha256(f"{signer_name}\0{signed_at.isoformat()}".encode()).hexdigest()[:8]
+        doc.add_paragraph("").add_run()  # Add empty paragraph for spacing
+        signature_para = doc.add_paragraph()
+        signature_para.add_run(f"Digitally signed by: {signer_name}").bold = True
+        if reason:
+            signature_para.add_run(f"\nReason: {reason}")
+        signature_para.add_run(f"\nDate: {signed_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        signature_para.add_run(f"\nSignature ID: {signature_id}")
+
+        # Save the document with the visible signature, then sign what was saved
+        save_document(doc, filename)
+        signature_info = create_signature_info(doc, signer_name, reason, hash_tree=build_hash_tree(filename))
+        signature_info["signature_id"] = signature_id
 
         # Add protection info to metadata
         success = add_protection_info(
@@ -152,18 +205,6 @@ async def add_digital_signature(filename: str, signer_name: str, reason: Optiona
         )
 
         if success:
-            # Add a visible signature block to the document
-            doc.add_paragraph("").add_run()  # Add empty paragraph for spacing
-            signature_para = doc.add_paragraph()
-            signature_para.add_run(f"Digitally signed by: {signer_name}").bold = True
-            if reason:
-                signature_para.add_run(f"\nReason: {reason}")
-            signature_para.add_run(f"\nDate: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            signature_para.add_run(f"\nSignature ID: {signature_info['content_hash'][:8]}")
-
-            # Save the document with the visible signature
-            doc.save(filename)
-
             return f"Digital signature added to document {filename}"
         else:
             return f"Failed to add digital signature to document {filename}"
@@ -177,6 +218,9 @@ async def verify_document(filename: str, password: Optional[str] = None) -> str:
         filename: Path to the Word document
         password: Optional password to verify
     """
+    from word_document_server.core.protection import verify_document_protection
+    from word_document_server.core.signatures import verify_signature_file
+    
     filename = ensure_docx_extension(filename)
 
     if not os.path.exists(filename):
@@ -200,21 +244,22 @@ async def verify_document(filename: str, password: Optional[str] = None) -> str:
                     protection_data = json.load(f)
 
                 if protection_data.get("type") == "signature":
-                    # Get the original content hash
-                    signature_info = protection_data.get("signature", {})
-                    original_hash = signature_info.get("content_hash")
-
-                    if original_hash:
-                        # Calculate current content hash
-                        doc = Document(filename)
-                        text_content = "\n".join([p.text for p in doc.paragraphs])
-                        current_hash = hashlib.sha256(text_content.encode()).hexdigest()
-
-                        # Compare hashes
-                        if current_hash != original_hash:
-                            return f"Document has been modified since it was signed by {signature_info.get('signer')}"
-                        else:
-                            return f"Document signature is valid. Signed by {signature_info.get('signer')} on {signature_info.get('timestamp')}"
+                    # Stream-hash the package and compare it with the signed hash tree
+                    result = verify_signature_file(filename, protection_data.get("signature", {}))
+                    if result["status"] != "modified" or "changes" not in result:
+                        return result["message"]
+                    changes = result["changes"]
+                    lines = [result["message"]]
+                    for section in changes["changed_sections"]:
+                        lines.append(f"- Changed section '{section['title']}' (paragraph {section['start']})")
+                    for section in changes["added_sections"]:
+                        lines.append(f"- Added section '{section['title']}' (paragraph {section['start']})")
+                    for section in changes["removed_sections"]:
+                        lines.append(f"- Removed section '{section['title']}' (was paragraph {section['signed_start']})")
+                    for label in ("changed", "added", "removed"):
+                        if changes[f"{label}_parts"]:
+                            lines.append(f"- {label.capitalize()} parts: {', '.join(changes[f'{label}_parts'])}")
+                    return "\n".join(lines)
             except Exception as e:
                 return f"Error verifying signature: {str(e)}"
 
@@ -222,6 +267,50 @@ async def verify_document(filename: str, password: Optional[str] = None) -> str:
     except Exception as e:
         return f"Failed to verify document: {str(e)}"
 
+async def verify_documents(directory: str, output_path: Optional[str] = None, recursive: bool = False,
+                           max_workers: Optional[int] = None) -> str:
+    """Verify every protected or signed Word document in a directory.
+
+    Documents are found through their .protection metadata files and checked in
+    parallel worker processes by streaming their contents, without loading them
+    with python-docx.
+
+    Args:
+        directory: Directory containing the documents
+        output_path: Optional path of a JSON file to write the full report to; the
+                     tool then returns only the summary
+        recursive: If True, include documents in subdirectories
+        max_workers: Optional number of worker processes (defaults to the CPU count)
+    """
+    from word_document_server.core.protection import replace_file_atomically
+    from word_document_server.core.signatures import verify_directory
+    
+    if not os.path.isdir(directory):
+        return f"Directory {directory} does not exist"
+    
+    if output_path:
+        is_writeable, error_message = check_file_writeable(output_path)
+        if not is_writeable:
+            return f"Cannot write report: {error_message}"
+    
+    try:
+        if max_workers is not None:
+            max_workers = max(1, int(max_workers))
+        report = verify_directory(directory, bool(recursive), max_workers)
+        if not output_path:
+            return json.dumps(report, indent=2)
+        
+        data = json.dumps(report, indent=2).encode("utf-8")
+        replace_file_atomically(output_path, lambda f: f.write(data))
+        summary = {key: value for key, value in report.items() if key != "results"}
+        summary["report"] = os.path.abspath(output_path)
+        summary["not_valid"] = [{"path": result["path"], "status": result["status"]}
+                                for result in report["results"] if result["status"] != "valid"]
+        return json.dumps(summary, indent=2)
+    except Exception as e:
+        return f"Failed to verify documents: {str(e)}"
+
+
 async def unprotect_document(filename: str, password: str) -> str:
     """Remove password protection from a Word document.
 
@@ -229,47 +318,108 @@ async def unprotect_document(filename: str, password: str) -> str:
         filename: Path to the Word document
         password: Password that was used to protect the document
     """
+    import msoffcrypto
+    from word_document_server.core.protection import decrypt_file
+    
     filename = ensure_docx_extension(filename)
 
     if not os.path.exists(filename):
         return f"Document {filename} does not exist"
 
+    if get_session(filename) is not None:
+        return f"Cannot modify document: {filename} is open in a protected session. Close the session first."
+
     # Check if file is writeable
     is_writeable, error_message = check_file_writeable(filename)
     if not is_writeable:
         return f"Cannot modify document: {error_message}"
 
     try:
-        # Read the encrypted file content
-        with open(filename, "rb") as infile:
-            encrypted_data = infile.read()
+        decrypt_file(filename, password)
+        return f"Document {filename} decrypted successfully."
 
-        # Create an msoffcrypto file object from the encrypted data
-        file = msoffcrypto.OfficeFile(io.BytesIO(encrypted_data))
-        file.load_key(password=password) # Set the password for decryption
+    except msoffcrypto.exceptions.InvalidKeyError:
+         return f"Failed to decrypt document {filename}: Incorrect password."
+    except msoffcrypto.exceptions.FileFormatError:
+         return f"Failed to decrypt document {filename}: File is not encrypted or is not a supported Office format."
+    except Exception as e:
+        # The file is only replaced once decryption has succeeded
+        return f"Failed to decrypt document {filename}: {str(e)}. File left unchanged."
 
-        # Decrypt the data into an in-memory buffer
-        decrypted_data_io = io.BytesIO()
-        file.decrypt(outfile=decrypted_data_io) # Pass the buffer as the 'outfile' argument
 
-        # Overwrite the original file with the decrypted data
-        with open(filename, "wb") as outfile:
-            outfile.write(decrypted_data_io.getvalue())
+async def open_protected_document(filename: str, password: str) -> str:
+    """Open a password-protected Word document for editing without decrypting it on disk.
+    
+    The document is decrypted once into memory. Until the session is closed, all
+    tools read and edit the in-memory copy; use save_protected_document to write
+    the changes back encrypted.
 
-        return f"Document {filename} decrypted successfully."
+    Args:
+        filename: Path to the encrypted Word document
+        password: Password the document is protected with
+    """
+    import msoffcrypto
+    from word_document_server.utils.protected_sessions import open_session
+    
+    filename = ensure_docx_extension(filename)
+
+    if not os.path.exists(filename):
+        return f"Document {filename} does not exist"
 
+    try:
+        session = open_session(filename, password)
+        return f"Protected document {filename} opened for editing ({session.info()['size']} bytes decrypted in memory)."
     except msoffcrypto.exceptions.InvalidKeyError:
-         return f"Failed to decrypt document {filename}: Incorrect password."
-    except msoffcrypto.exceptions.InvalidFormatError:
-         return f"Failed to decrypt document {filename}: File is not encrypted or is not a supported Office format."
+        return f"Failed to open document {filename}: Incorrect password."
+    except msoffcrypto.exceptions.FileFormatError:
+        return f"Failed to open document {filename}: File is not encrypted or is not a supported Office format."
     except Exception as e:
-        # Attempt to restore encrypted file content on failure
-        try:
-            if 'encrypted_data' in locals():
-                with open(filename, "wb") as outfile:
-                    outfile.write(encrypted_data)
-                return f"Failed to decrypt document {filename}: {str(e)}. Encrypted file restored."
-            else:
-                 return f"Failed to decrypt document {filename}: {str(e)}. Could not restore encrypted file."
-        except Exception as restore_e:
-             return f"Failed to decrypt document {filename}: {str(e)}. Also failed to restore encrypted file: {str(restore_e)}"
+        return f"Failed to open document {filename}: {str(e)}"
+
+
+async def save_protected_document(filename: str) -> str:
+    """Encrypt the edits made in a protected document session back to disk.
+
+    Args:
+        filename: Path to the Word document
+    """
+    filename = ensure_docx_extension(filename)
+
+    session = get_session(filename)
+    if session is None:
+        return f"Cannot save document: {filename} is not open in a protected session"
+
+    # Check if file is writeable
+    is_writeable, error_message = check_file_writeable(filename)
+    if not is_writeable:
+        return f"Cannot save document: {error_message}"
+
+    try:
+        if session.flush():
+            return f"Protected document {filename} saved."
+        return f"No unsaved changes in {filename}"
+    except Exception as e:
+        return f"Failed to save protected document {filename}: {str(e)}"
+
+
+async def close_protected_document(filename: str, save: bool = True) -> str:
+    """Close a protected document session, dropping the decrypted copy from memory.
+
+    Args:
+        filename: Path to the Word document
+        save: Whether to encrypt unsaved changes to disk before closing
+    """
+    from word_document_server.utils.protected_sessions import close_session
+    
+    filename = ensure_docx_extension(filename)
+
+    if get_session(filename) is None:
+        return f"Cannot close document: {filename} is not open in a protected session"
+
+    try:
+        saved = close_session(filename, bool(save))
+        if saved:
+            return f"Protected document {filename} saved and closed."
+        return f"Protected document {filename} closed."
+    except Exception as e:
+        return f"Failed to close protected document {filename}: {str(e)}"
@@ -0,0 +1,26 @@
+"""
+Server tools for Word Document Server.
+
+These tools report on the server itself rather than on documents.
+"""
+import json
+
+from word_document_server.utils.metrics import get_metrics
+from word_document_server.utils.document_cache import get_document_cache
+
+
+async def get_server_metrics(format: str = "json") -> str:
+    """Get per-tool call counts, latencies, load/save times, document sizes, memory use
+    and document cache statistics.
+    
+    Args:
+        format: "json" for a JSON object or "prometheus" for Prometheus text format
+    """
+    metrics = get_metrics()
+    if format == "prometheus":
+        return metrics.to_prometheus()
+    if format != "json":
+        return f"Invalid format: {format}. Use 'json' or 'prometheus'."
+    snapshot = metrics.snapshot()
+    snapshot["document_cache"] = get_document_cache().stats()
+    return json.dumps(snapshot, indent=2)
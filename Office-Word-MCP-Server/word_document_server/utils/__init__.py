@@ -2,7 +2,35 @@
 Utility functions for the Word Document Server.
 
 This package contains utility modules for file operations and document handling.
+Re-exported helpers are imported on first access, so importing a lightweight
+submodule such as file_utils does not load python-docx.
 """
+import importlib
 
-from word_document_server.utils.file_utils import check_file_writeable, create_document_copy, ensure_docx_extension
-from word_document_server.utils.document_utils import get_document_properties, extract_document_text, get_document_structure, find_paragraph_by_text, find_and_replace_text
+_EXPORTS = {
+    "check_file_writeable": "file_utils",
+    "create_document_copy": "file_utils",
+    "ensure_docx_extension": "file_utils",
+    "get_document_properties": "document_utils",
+    "extract_document_text": "document_utils",
+    "get_document_structure": "document_utils",
+    "find_paragraph_by_text": "document_utils",
+    "find_and_replace_text": "document_utils",
+    "get_package_reader": "package_reader",
+    "release_package_reader": "package_reader",
+    "clear_package_readers": "package_reader",
+    "get_document_model": "document_model",
+    "enable_worker_threads": "concurrency",
+    "run_in_worker_thread": "concurrency",
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
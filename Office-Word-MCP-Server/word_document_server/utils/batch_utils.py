@@ -0,0 +1,162 @@
+"""
+Batch processing utilities for Word Document Server.
+
+Helpers for tools that work on many documents at once: file discovery,
+change manifests and a bounded process pool.
+"""
+import os
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def find_documents(directory: str, recursive: bool = False, extension: str = '.docx') -> List[str]:
+    """
+    Find documents in a directory.
+
+    Office lock files (``~$name.docx``) are ignored.
+
+    Args:
+        directory: Directory to search
+        recursive: If True, also search subdirectories
+        extension: File extension to match
+
+    Returns:
+        Sorted list of document paths
+    """
+    found = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(extension) and not name.startswith('~$'):
+                    found.append(os.path.join(root, name))
+    else:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(extension) and not entry.name.startswith('~$'):
+                    found.append(entry.path)
+    return sorted(found)
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        path: Path to the file
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_file_fingerprint(path: str) -> Dict[str, int]:
+    """
+    Get the cheap change indicators of a file.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Dictionary with mtime_ns and size
+    """
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def load_manifest(manifest_path: str, properties: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load a change manifest written by save_manifest().
+
+    Args:
+        manifest_path: Path to the manifest file
+        properties: Run properties the manifest must have been saved with
+
+    Returns:
+        Dictionary mapping file paths to their recorded fingerprint and hash.
+        Empty if the manifest does not exist, cannot be read or was saved
+        with different properties.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("properties", {}) != (properties or {}):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path: str, files: Dict[str, Dict[str, Any]],
+                  properties: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Atomically write a change manifest.
+
+    Args:
+        manifest_path: Path to the manifest file
+        files: Dictionary mapping file paths to their fingerprint and hash
+        properties: Run properties (such as the output format) a later run
+                    must match to reuse the manifest
+    """
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({"version": 1, "properties": properties or {}, "files": files}, f)
+    os.replace(temp_path, manifest_path)
+
+
+def iter_process_pool(func: Callable, items: Iterable[Tuple], max_workers: Optional[int] = None,
+                      max_pending: Optional[int] = None) -> Iterator[Tuple[Tuple, Any, Optional[BaseException]]]:
+    """
+    Run a function over many argument tuples in a process pool.
+
+    Only a bounded number of tasks is submitted at a time, so very long
+    inputs do not create a future per item up front. Results are yielded as
+    they complete, not in input order. Workers are started with the spawn
+    method, since forking a server that runs tool calls in threads could
+    copy locks held by other threads into the children.
+
+    Args:
+        func: Picklable top-level function
+        items: Iterable of argument tuples for func
+        max_workers: Number of worker processes (defaults to the CPU count)
+        max_pending: Maximum number of submitted but unfinished tasks
+                     (defaults to four per worker)
+
+    Yields:
+        Tuples of (args, result, error); error is None on success
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or max_workers * 4
+    items = iter(items)
+
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    args = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, *args)] = args
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                args = pending.pop(future)
+                error = future.exception()
+                yield args, (None if error else future.result()), error
@@ -0,0 +1,154 @@
+"""
+Concurrent tool execution for Word Document Server.
+
+Over stdio the server has a single client and tool calls run one at a time on
+the event loop. Served over HTTP, one process handles many client sessions,
+which share its document cache, package readers, edit journals and PDF
+workers. Once enable_worker_threads() has been called, every tool call runs
+in a worker thread, so a long conversion or bulk export does not hold up the
+other sessions. Each call holds the lock of every document it reads or
+writes, taken in sorted order, so two sessions cannot check out and save one
+document at the same time and overwrite each other's edits.
+
+- WORD_MCP_TOOL_THREADS: number of tool calls that run at the same time
+  (default 8)
+"""
+import os
+import asyncio
+import inspect
+import functools
+import threading
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+
+DEFAULT_TOOL_THREADS = 8
+
+# Tool parameters naming one document, a list of documents, another file the
+# tool writes, or a directory whose documents the tool processes
+DOCUMENT_PARAMETERS = ("filename", "source_filename", "destination_filename", "target_filename",
+                       "original_filename", "revised_filename")
+DOCUMENT_LIST_PARAMETERS = ("filenames", "source_filenames")
+OUTPUT_PARAMETERS = ("output_filename", "output_path")
+DIRECTORY_PARAMETERS = ("directory",)
+
+_limiter = None
+_document_locks: Dict[str, threading.Lock] = {}
+_document_locks_lock = threading.Lock()
+
+
+def get_tool_threads() -> int:
+    """Number of worker threads from WORD_MCP_TOOL_THREADS."""
+    try:
+        return max(1, int(os.environ.get("WORD_MCP_TOOL_THREADS", DEFAULT_TOOL_THREADS)))
+    except ValueError:
+        return DEFAULT_TOOL_THREADS
+
+
+def enable_worker_threads(threads: Optional[int] = None) -> None:
+    """
+    Run tool calls wrapped by run_in_worker_thread() in worker threads from now on.
+
+    Args:
+        threads: Maximum number of concurrent calls (defaults to WORD_MCP_TOOL_THREADS)
+    """
+    import anyio
+
+    global _limiter
+    _limiter = anyio.CapacityLimiter(threads or get_tool_threads())
+
+
+def document_lock(path: str) -> threading.Lock:
+    """
+    Get the lock serializing tool calls on a document.
+
+    Args:
+        path: Path to the document
+
+    Returns:
+        Lock shared by all callers using the same file
+    """
+    key = os.path.normcase(os.path.realpath(path))
+    with _document_locks_lock:
+        lock = _document_locks.get(key)
+        if lock is None:
+            lock = _document_locks[key] = threading.Lock()
+        return lock
+
+
+def _document_name(value: str) -> str:
+    return value if value.endswith(".docx") else value + ".docx"
+
+
+def find_locked_paths(arguments: Mapping[str, Any]) -> List[str]:
+    """
+    Find every file a tool call reads or writes from its bound arguments.
+
+    Args:
+        arguments: Argument values by parameter name
+
+    Returns:
+        Sorted lock keys (normalized real paths), without duplicates
+    """
+    from word_document_server.utils.batch_utils import find_documents
+
+    paths = []
+    for name in DOCUMENT_PARAMETERS:
+        value = arguments.get(name)
+        if isinstance(value, str) and value:
+            paths.append(_document_name(value))
+    for name in DOCUMENT_LIST_PARAMETERS:
+        values = arguments.get(name)
+        if isinstance(values, (list, tuple)):
+            paths.extend(_document_name(value) for value in values if isinstance(value, str) and value)
+    for name in OUTPUT_PARAMETERS:
+        value = arguments.get(name)
+        if isinstance(value, str) and value:
+            paths.append(value)
+    for name in DIRECTORY_PARAMETERS:
+        value = arguments.get(name)
+        if isinstance(value, str) and os.path.isdir(value):
+            paths.extend(find_documents(value, bool(arguments.get("recursive"))))
+    return sorted({os.path.normcase(os.path.realpath(path)) for path in paths})
+
+
+def run_in_worker_thread(func: Callable) -> Callable:
+    """
+    Wrap an async tool function so that, once worker threads are enabled, its
+    calls run in a worker thread under the locks of the documents they work on.
+
+    The tools do their work synchronously, so each call gets its own event
+    loop in the worker thread. Context variables, such as the metrics of the
+    current call, are carried over.
+
+    Args:
+        func: Async tool function
+
+    Returns:
+        Async function with the same name, docstring and signature
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        limiter = _limiter
+        if limiter is None:
+            return await func(*args, **kwargs)
+
+        import anyio
+
+        try:
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+        except TypeError:
+            arguments = kwargs
+
+        def call():
+            # Sorted order, so calls sharing documents cannot deadlock
+            with ExitStack() as stack:
+                for path in find_locked_paths(arguments):
+                    stack.enter_context(document_lock(path))
+                return asyncio.run(func(*args, **kwargs))
+
+        return await anyio.to_thread.run_sync(call, limiter=limiter)
+
+    return wrapper
@@ -0,0 +1,279 @@
+"""
+In-memory document cache for Word Document Server.
+
+Parsed documents are kept in a small LRU cache keyed by absolute path and
+validated against the file's modification time and size, so repeated tool
+calls on the same document skip parsing. Pinned documents are exempt from
+eviction; the documents listed in WORD_MCP_PRELOAD are loaded and pinned
+in a background thread once a client has completed the MCP handshake.
+
+Read-only callers share the cached Document and must not modify it.
+Callers that edit a document check it out with load_document(path,
+for_update=True), which removes it from the cache, and hand it back through
+save_document() after saving. An edit that fails before saving therefore
+never leaves a modified document in the cache.
+
+Documents with an open protected session (see protected_sessions) are
+served from and saved to the session instead of the file.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from word_document_server.utils.batch_utils import find_documents
+from word_document_server.utils.package_reader import release_package_reader
+from word_document_server.utils.protected_sessions import get_session
+
+
+logger = logging.getLogger(__name__)
+
+# Number of unpinned documents kept in memory
+DEFAULT_CACHE_SIZE = 16
+
+
+class DocumentCache:
+    """LRU cache of parsed documents with pinning."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            max_entries: Maximum number of unpinned documents to keep (0 disables caching
+                         of unpinned documents)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Any]]" = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, for_update: bool = False):
+        """
+        Get the parsed document at a path, loading it if needed.
+
+        Args:
+            path: Path to the document
+            for_update: If True, the document is removed from the cache and must be
+                        returned through store() after it is saved
+
+        Returns:
+            python-docx Document
+        """
+        from docx import Document
+
+        path = os.path.abspath(path)
+        stamp = _stamp(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                if for_update:
+                    del self._entries[path]
+                else:
+                    self._entries.move_to_end(path)
+                return entry[1]
+            self._entries.pop(path, None)
+            self.misses += 1
+
+        # Parse outside the lock so a background preload does not block tool calls
+        document = Document(path)
+        if not for_update:
+            self._put(path, stamp, document)
+        return document
+
+    def store(self, path: str, document) -> None:
+        """
+        Cache a document that was just saved to a path.
+
+        Args:
+            path: Path the document was saved to
+            document: python-docx Document
+        """
+        path = os.path.abspath(path)
+        self._put(path, _stamp(path), document)
+
+    def pin(self, path: str) -> None:
+        """
+        Load a document and keep it in the cache regardless of the LRU limit.
+
+        Args:
+            path: Path to the document
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pinned.add(path)
+        self.get(path)
+
+    def unpin(self, path: str) -> None:
+        """Make a pinned document subject to eviction again."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pinned.discard(path)
+            self._evict()
+
+    def invalidate(self, path: str) -> None:
+        """Drop a document from the cache."""
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self) -> None:
+        """Drop all documents, including pinned ones."""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache size and hit counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "pinned": sorted(self._pinned),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _put(self, path: str, stamp: Tuple[int, int], document) -> None:
+        with self._lock:
+            if self.max_entries <= 0 and path not in self._pinned:
+                return
+            self._entries[path] = (stamp, document)
+            self._entries.move_to_end(path)
+            self._evict()
+
+    def _evict(self) -> None:
+        unpinned = [path for path in self._entries if path not in self._pinned]
+        for path in unpinned[:max(0, len(unpinned) - self.max_entries)]:
+            del self._entries[path]
+
+
+_cache: Optional[DocumentCache] = None
+_cache_lock = threading.Lock()
+_preload_started = False
+
+
+def get_document_cache() -> DocumentCache:
+    """
+    Get the process-wide document cache.
+
+    Its size is read from WORD_MCP_DOCUMENT_CACHE_SIZE on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                size = int(os.environ.get("WORD_MCP_DOCUMENT_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+            except ValueError:
+                size = DEFAULT_CACHE_SIZE
+            _cache = DocumentCache(size)
+        return _cache
+
+
+def load_document(path: str, for_update: bool = False):
+    """
+    Load a document through the cache.
+
+    Args:
+        path: Path to the document
+        for_update: Set when the caller will modify the document; it must then be
+                    saved with save_document()
+
+    Returns:
+        python-docx Document
+    """
+    session = get_session(path)
+    if session is not None:
+        return session.get_document(for_update)
+    return get_document_cache().get(path, for_update)
+
+
+def save_document(document, path: str) -> None:
+    """
+    Save a document and keep the saved state in the cache.
+
+    Saving over an existing document records an inverse patch in the edit
+    journal, so the edit can be undone. Documents with an open protected
+    session are only saved to the session, and are not journaled.
+
+    Args:
+        document: python-docx Document
+        path: Path to save to
+    """
+    session = get_session(path)
+    if session is not None:
+        session.store(document)
+        return
+
+    from word_document_server.utils.edit_journal import get_edit_journal
+    from word_document_server.utils.metrics import get_current_tool
+
+    journal = get_edit_journal()
+    if journal.enabled and os.path.exists(path):
+        journal.save(document, path, label=get_current_tool())
+    else:
+        release_package_reader(path)
+        document.save(path)
+    get_document_cache().store(path, document)
+
+
+def get_preload_paths() -> List[str]:
+    """
+    Get the documents to preload from WORD_MCP_PRELOAD.
+
+    The variable lists files or directories separated by os.pathsep; a
+    directory stands for the .docx files directly inside it.
+
+    Returns:
+        List of document paths
+    """
+    paths = []
+    for entry in os.environ.get("WORD_MCP_PRELOAD", "").split(os.pathsep):
+        entry = os.path.expanduser(entry.strip())
+        if not entry:
+            continue
+        if os.path.isdir(entry):
+            paths.extend(find_documents(entry))
+        else:
+            paths.append(entry)
+    return paths
+
+
+def start_preload(paths: Iterable[str]) -> Optional[threading.Thread]:
+    """
+    Load and pin documents in a background thread.
+
+    Only the first call per process starts a thread. Documents that cannot be
+    loaded are logged and skipped.
+
+    Args:
+        paths: Document paths
+
+    Returns:
+        The started thread, or None if preloading already started or there is
+        nothing to load
+    """
+    global _preload_started
+    paths = list(paths)
+    with _cache_lock:
+        if _preload_started or not paths:
+            return None
+        _preload_started = True
+
+    def preload():
+        cache = get_document_cache()
+        for path in paths:
+            try:
+                cache.pin(path)
+            except Exception as e:
+                logger.warning("Could not preload %s: %s", path, e)
+
+    thread = threading.Thread(target=preload, name="word-mcp-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,301 @@
+"""
+Compact read-only model of a Word document.
+
+python-docx creates new Paragraph, Run and _Cell proxies every time
+``doc.paragraphs``, ``para.text`` or ``row.cells`` is accessed, so tools that
+read or search a whole document spend most of their time building wrappers
+and joining run text. A DocumentModel is built in one pass over the body and
+keeps only what those tools need:
+
+- the text of every paragraph in one string, one paragraph per line, with an
+  array of start offsets into it;
+- the style of every paragraph as a small integer into a list of style names,
+  and its heading level;
+- the cells of every table as rows of cell ids, each cell a range of
+  paragraphs.
+
+Body paragraphs come first, in the order of python-docx's ``doc.paragraphs``,
+followed by the paragraphs of table cells. Models are cached on the package
+reader, so they are rebuilt only when the document changes.
+"""
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from word_document_server.utils.package_reader import (
+    W_P, W_PPR, W_PSTYLE, W_TBL, W_VAL, PackageReader, get_package_reader
+)
+from word_document_server.utils.xml_utils import W_TR, W_TC, get_paragraph_element_text
+from word_document_server.utils.stream_utils import read_paragraph_styles, _get_outline_level
+
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_TBL_GRID = f"{{{_W}}}tblGrid"
+W_GRID_COL = f"{{{_W}}}gridCol"
+W_TRPR = f"{{{_W}}}trPr"
+W_GRID_BEFORE = f"{{{_W}}}gridBefore"
+W_TCPR = f"{{{_W}}}tcPr"
+W_GRID_SPAN = f"{{{_W}}}gridSpan"
+W_VMERGE = f"{{{_W}}}vMerge"
+
+
+class TableSpans(NamedTuple):
+    """Layout of one table in a DocumentModel."""
+    rows: int
+    columns: int
+    # Offsets into cells where each row starts, plus the end of the last row
+    row_starts: array
+    # Cell ids of each row, repeated for every grid column a cell spans and
+    # for every row a vertically merged cell continues into, as python-docx's
+    # row.cells lists them
+    cells: array
+
+
+class DocumentModel:
+    """Paragraph text, styles and table layout of a document, read-only."""
+
+    __slots__ = ("text", "starts", "body_count", "styles", "style_ids", "levels",
+                 "cell_starts", "tables", "blocks", "_lowered")
+
+    def __init__(self):
+        # All paragraph texts joined by "\n"
+        self.text = ""
+        # Offset of each paragraph in text, plus one past the end of the last
+        self.starts = array("L", [0])
+        # Number of body paragraphs; cell paragraphs follow them
+        self.body_count = 0
+        # Style names, indexed by style_ids
+        self.styles: List[str] = []
+        self.style_ids = array("H")
+        # Heading level of each paragraph, 0 if it is not a heading
+        self.levels = array("B")
+        # First paragraph of each cell, plus one past the last paragraph of the last cell
+        self.cell_starts = array("L", [0])
+        self.tables: List[TableSpans] = []
+        # Body order: paragraph index, or ~table index for a table
+        self.blocks = array("l")
+        self._lowered = None
+
+    @property
+    def paragraph_count(self) -> int:
+        """Number of body paragraphs."""
+        return self.body_count
+
+    def paragraph_text(self, index: int) -> str:
+        """Text of a paragraph; body paragraphs come first."""
+        return self.text[self.starts[index]:self.starts[index + 1] - 1]
+
+    def paragraph_style(self, index: int) -> str:
+        """Style name of a paragraph."""
+        return self.styles[self.style_ids[index]]
+
+    def paragraph_span(self, index: int) -> Tuple[int, int]:
+        """Start and end offsets of a paragraph in text."""
+        return self.starts[index], self.starts[index + 1] - 1
+
+    def row_cells(self, table_index: int, row_index: int) -> array:
+        """Cell ids of a table row."""
+        table = self.tables[table_index]
+        return table.cells[table.row_starts[row_index]:table.row_starts[row_index + 1]]
+
+    def cell_paragraphs(self, cell: int) -> range:
+        """Indices of the paragraphs of a cell."""
+        return range(self.cell_starts[cell], self.cell_starts[cell + 1])
+
+    def cell_text(self, cell: int) -> str:
+        """Text of a cell, one line per paragraph, as python-docx's _Cell.text."""
+        first, last = self.cell_starts[cell], self.cell_starts[cell + 1]
+        if first == last:
+            return ""
+        return self.text[self.starts[first]:self.starts[last] - 1]
+
+    def body_text(self) -> str:
+        """Text of all body paragraphs, one per line."""
+        if not self.body_count:
+            return ""
+        return self.text[:self.starts[self.body_count] - 1]
+
+    def lowered(self) -> Optional[str]:
+        """
+        Lowercase copy of text with the same offsets, or None if lowercasing
+        changes the length of the text.
+        """
+        if self._lowered is None:
+            lowered = self.text.lower()
+            self._lowered = lowered if len(lowered) == len(self.text) else False
+        return self._lowered or None
+
+    def paragraph_at(self, offset: int) -> int:
+        """Index of the paragraph containing an offset of text."""
+        return bisect_right(self.starts, offset) - 1
+
+    def find(self, needle: str, haystack: Optional[str] = None,
+             first: int = 0, last: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Find the non-overlapping occurrences of a string within paragraphs.
+
+        Occurrences are searched in the combined text, so paragraphs without a
+        match are skipped without being looked at one by one.
+
+        Args:
+            needle: Text to search for
+            haystack: Text to search instead of text, with the same offsets
+                      (for example lowered())
+            first: First paragraph to search
+            last: Paragraph to stop before (defaults to all paragraphs)
+
+        Yields:
+            Tuples of (paragraph_index, position within the paragraph)
+        """
+        if not needle:
+            return
+        haystack = self.text if haystack is None else haystack
+        starts = self.starts
+        last = len(starts) - 1 if last is None else last
+        if first >= last:
+            return
+        end = starts[last] - 1
+        pos = haystack.find(needle, starts[first], end)
+        while pos != -1:
+            index = bisect_right(starts, pos, first, last + 1) - 1
+            paragraph_end = starts[index + 1] - 1
+            if pos + len(needle) <= paragraph_end:
+                yield index, pos - starts[index]
+                pos = haystack.find(needle, pos + len(needle), end)
+            else:
+                # A match running into the next paragraph means there is no
+                # other match left in this one
+                pos = haystack.find(needle, starts[index + 1], end)
+
+
+def build_document_model(reader: PackageReader) -> DocumentModel:
+    """
+    Build the model of a package in one pass over its body.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        DocumentModel
+    """
+    model = DocumentModel()
+    styles = read_paragraph_styles(reader)
+    style_names = styles["names"]
+    default_style = styles["default"]
+    outline_levels = styles["outline_levels"]
+
+    style_index = {}
+
+    def add_style(p, style_ids, levels):
+        pPr = p.find(W_PPR)
+        pStyle = pPr.find(W_PSTYLE) if pPr is not None else None
+        style_id = pStyle.get(W_VAL) if pStyle is not None else None
+        # An unknown style id falls back to the default style, as in python-docx
+        if style_id not in style_names:
+            style_id = default_style
+        number = style_index.get(style_id)
+        if number is None:
+            number = style_index[style_id] = len(model.styles)
+            model.styles.append(style_names.get(style_id) or "Normal")
+        style_ids.append(number)
+        level = _get_outline_level(pPr)
+        if level is None:
+            level = outline_levels.get(style_id)
+        levels.append(level or 0)
+
+    body_texts = []
+    cell_texts = []
+    cell_starts = array("L", [0])
+    cell_style_ids = array("H")
+    cell_levels = array("B")
+
+    def add_cell_paragraph(p):
+        cell_texts.append(get_paragraph_element_text(p))
+        add_style(p, cell_style_ids, cell_levels)
+
+    for element in reader.body():
+        if element.tag == W_P:
+            model.blocks.append(len(body_texts))
+            body_texts.append(get_paragraph_element_text(element))
+            add_style(element, model.style_ids, model.levels)
+        elif element.tag == W_TBL:
+            model.blocks.append(~len(model.tables))
+            model.tables.append(_read_table(element, cell_starts, add_cell_paragraph))
+
+    body_count = len(body_texts)
+    model.style_ids.extend(cell_style_ids)
+    model.levels.extend(cell_levels)
+
+    texts = body_texts + cell_texts
+    starts = model.starts = array("L")
+    pos = 0
+    for text in texts:
+        starts.append(pos)
+        pos += len(text) + 1
+    starts.append(pos)
+    model.text = "\n".join(texts)
+    model.body_count = body_count
+    model.cell_starts = array("L", (start + body_count for start in cell_starts))
+    return model
+
+
+def _read_table(tbl, cell_starts: array, add_paragraph) -> TableSpans:
+    """Read the layout of a w:tbl element, adding the paragraphs of its cells."""
+    grid = tbl.find(W_TBL_GRID)
+    columns = len(grid.findall(W_GRID_COL)) if grid is not None else 0
+
+    row_starts = array("L", [0])
+    cells = array("L")
+    above = {}
+    for tr in tbl.iterchildren(W_TR):
+        offset = _int_val(tr.find(W_TRPR), W_GRID_BEFORE, 0)
+        row = {}
+        for tc in tr.iterchildren(W_TC):
+            tcPr = tc.find(W_TCPR)
+            span = max(_int_val(tcPr, W_GRID_SPAN, 1), 1)
+            cell = None
+            vmerge = tcPr.find(W_VMERGE) if tcPr is not None else None
+            if vmerge is not None and vmerge.get(W_VAL, "continue") == "continue":
+                # Continuation of a vertical merge shows the cell it continues
+                cell = above.get(offset)
+            if cell is None:
+                cell = len(cell_starts) - 1
+                count = cell_starts[-1]
+                for p in tc.iterchildren(W_P):
+                    add_paragraph(p)
+                    count += 1
+                cell_starts.append(count)
+            for k in range(span):
+                cells.append(cell)
+                row[offset + k] = cell
+            offset += span
+        above = row
+        row_starts.append(len(cells))
+    return TableSpans(len(row_starts) - 1, columns, row_starts, cells)
+
+
+def _int_val(parent, tag: str, default: int) -> int:
+    """Integer w:val of a child element, or default."""
+    if parent is None:
+        return default
+    child = parent.find(tag)
+    if child is None:
+        return default
+    try:
+        return int(child.get(W_VAL))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_document_model(doc_path: str) -> DocumentModel:
+    """
+    Get the model of a document, building it on first use after each change.
+
+    Args:
+        doc_path: Path to the Word document
+
+    Returns:
+        DocumentModel, shared with other callers and not to be modified
+    """
+    reader = get_package_reader(doc_path)
+    return reader.memo("document_model", build_document_model)
@@ -3,18 +3,37 @@ Document utility functions for Word Document Server.
 """
 import json
 from typing import Dict, List, Any
-from docx import Document
 
 
 def get_document_properties(doc_path: str) -> Dict[str, Any]:
-    """Get properties of a Word document."""
+    """Get properties of a Word document.
+    
+    Only the core properties and the document body are read, through the
+    package reader, instead of loading the whole package with python-docx.
+    """
     import os
+    from types import SimpleNamespace
+    from word_document_server.utils.package_reader import (
+        W_P, W_PPR, W_SECTPR, core_properties, get_package_reader
+    )
+    from word_document_server.utils.document_model import get_document_model
+    
     if not os.path.exists(doc_path):
         return {"error": f"Document {doc_path} does not exist"}
     
     try:
-        doc = Document(doc_path)
-        core_props = doc.core_properties
+        reader = get_package_reader(doc_path)
+        model = get_document_model(doc_path)
+        body = reader.body()
+        core_props = core_properties(reader)
+        
+        # A section ends at each paragraph-level sectPr and at the body's own one
+        section_count = len(body.findall(f"{W_P}/{W_PPR}/{W_SECTPR}")) + len(body.findall(W_SECTPR))
+        
+        if core_props is None:
+            core_props = SimpleNamespace(title=None, author=None, subject=None, keywords=None,
+                                         created=None, modified=None, last_modified_by=None,
+                                         revision=None)
         
         return {
             "title": core_props.title or "",
@@ -25,10 +44,10 @@ def get_document_properties(doc_path: str) -> Dict[str, Any]:
             "modified": str(core_props.modified) if core_props.modified else "",
             "last_modified_by": core_props.last_modified_by or "",
             "revision": core_props.revision or 0,
-            "page_count": len(doc.sections),
-            "word_count": sum(len(paragraph.text.split()) for paragraph in doc.paragraphs),
-            "paragraph_count": len(doc.paragraphs),
-            "table_count": len(doc.tables)
+            "page_count": section_count,
+            "word_count": len(model.body_text().split()),
+            "paragraph_count": model.paragraph_count,
+            "table_count": len(model.tables)
         }
     except Exception as e:
         return {"error": f"Failed to get document properties: {str(e)}"}
@@ -37,21 +56,19 @@ def get_document_properties(doc_path: str) -> Dict[str, Any]:
 def extract_document_text(doc_path: str) -> str:
     """Extract all text from a Word document."""
     import os
+    from word_document_server.utils.document_model import get_document_model
+    
     if not os.path.exists(doc_path):
         return f"Document {doc_path} does not exist"
     
     try:
-        doc = Document(doc_path)
-        text = []
+        model = get_document_model(doc_path)
+        text = [model.body_text()] if model.paragraph_count else []
         
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-            
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        text.append(paragraph.text)
+        for table in model.tables:
+            for cell in table.cells:
+                if model.cell_paragraphs(cell):
+                    text.append(model.cell_text(cell))
         
         return "\n".join(text)
     except Exception as e:
@@ -61,41 +78,45 @@ def extract_document_text(doc_path: str) -> str:
 def get_document_structure(doc_path: str) -> Dict[str, Any]:
     """Get the structure of a Word document."""
     import os
+    from word_document_server.utils.document_model import get_document_model
+    
     if not os.path.exists(doc_path):
         return {"error": f"Document {doc_path} does not exist"}
     
     try:
-        doc = Document(doc_path)
+        model = get_document_model(doc_path)
         structure = {
             "paragraphs": [],
             "tables": []
         }
         
         # Get paragraphs
-        for i, para in enumerate(doc.paragraphs):
+        for i in range(model.paragraph_count):
+            text = model.paragraph_text(i)
             structure["paragraphs"].append({
                 "index": i,
-                "text": para.text[:100] + ("..." if len(para.text) > 100 else ""),
-                "style": para.style.name if para.style else "Normal"
+                "text": text[:100] + ("..." if len(text) > 100 else ""),
+                "style": model.paragraph_style(i)
             })
         
         # Get tables
-        for i, table in enumerate(doc.tables):
+        for i, table in enumerate(model.tables):
             table_data = {
                 "index": i,
-                "rows": len(table.rows),
-                "columns": len(table.columns),
+                "rows": table.rows,
+                "columns": table.columns,
                 "preview": []
             }
             
             # Get sample of table data
-            max_rows = min(3, len(table.rows))
+            max_rows = min(3, table.rows)
             for row_idx in range(max_rows):
+                row_cells = model.row_cells(i, row_idx)
                 row_data = []
-                max_cols = min(3, len(table.columns))
+                max_cols = min(3, table.columns)
                 for col_idx in range(max_cols):
                     try:
-                        cell_text = table.cell(row_idx, col_idx).text
+                        cell_text = model.cell_text(row_cells[col_idx])
                         row_data.append(cell_text[:20] + ("..." if len(cell_text) > 20 else ""))
                     except IndexError:
                         row_data.append("N/A")
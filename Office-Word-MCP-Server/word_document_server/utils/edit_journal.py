@@ -0,0 +1,665 @@
+"""
+Edit journal for Word Document Server.
+
+The journal is off unless WORD_MCP_JOURNAL_MB is set. When it is on, every
+save of an existing document through save_document() records an inverse
+patch that turns the saved package back into the previous one:
+changed body elements of word/document.xml are stored as element-level
+hunks, other changed parts are stored whole, and parts added by the edit
+are listed for removal. Patches are usually a few kilobytes, so rollback
+points no longer require copying the whole file.
+
+Package states are identified by a digest of the part names and their
+CRC-32s, so a patch is only applied to the exact state it was recorded
+against. Journals live in WORD_MCP_JOURNAL_DIR (one directory per document)
+and together are limited to WORD_MCP_JOURNAL_MB; the oldest entries of any
+document are dropped first. Once a journal holds more than
+MAX_JOURNAL_ENTRIES entries, the older ones are compacted into one entry per
+snapshot interval. Patches hold document content in plain form, so the
+journal of a document is deleted when the document is password protected.
+"""
+import io
+import os
+import gzip
+import json
+import zlib
+import base64
+import shutil
+import heapq
+import hashlib
+import zipfile
+import datetime
+import tempfile
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from lxml import etree
+
+from word_document_server.utils.package_reader import release_package_reader
+from word_document_server.utils.stream_utils import DOCUMENT_PART, W_BODY
+
+
+# Entries above this count trigger compaction of the older ones
+MAX_JOURNAL_ENTRIES = 100
+
+# Most recent entries that compaction leaves untouched
+KEEP_RECENT_ENTRIES = 50
+
+# Fraction of the size limit the journals are trimmed to once they exceed it,
+# so the journal directory is not rescanned on every save near the limit
+TRIM_RATIO = 0.75
+
+_parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+
+
+class JournalError(Exception):
+    """Raised when an edit cannot be undone."""
+
+
+class _ZipParts(Mapping):
+    """Read-only mapping of part name to content, read lazily from a zip file."""
+
+    def __init__(self, zip_file: zipfile.ZipFile):
+        self._zip = zip_file
+        self._infos = OrderedDict((info.filename, info) for info in zip_file.infolist())
+
+    def __getitem__(self, name: str) -> bytes:
+        return self._zip.read(self._infos[name])
+
+    def __iter__(self):
+        return iter(self._infos)
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+    def crc(self, name: str) -> int:
+        return self._infos[name].CRC
+
+
+def _crc(parts: Mapping, name: str) -> int:
+    if isinstance(parts, _ZipParts):
+        return parts.crc(name)
+    return zlib.crc32(parts[name])
+
+
+def package_digest(parts: Mapping) -> str:
+    """
+    Identify a package state by its part names and contents.
+
+    Args:
+        parts: Mapping of part name to content
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for name in sorted(parts):
+        digest.update(f"{name}:{_crc(parts, name)}\n".encode())
+    return digest.hexdigest()
+
+
+def read_package(path: str) -> "OrderedDict[str, bytes]":
+    """Read all parts of a package into memory, keeping their order."""
+    with zipfile.ZipFile(path) as zip_file:
+        return OrderedDict((name, zip_file.read(name)) for name in zip_file.namelist())
+
+
+def write_package(parts: Mapping, path: str) -> None:
+    """
+    Atomically write a package, keeping the permissions of an existing file.
+
+    Args:
+        parts: Mapping of part name to content, in archive order
+        path: Destination path
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                for name in parts:
+                    zip_file.writestr(name, parts[name])
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        release_package_reader(path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _serialize(root) -> bytes:
+    # Same serialization python-docx uses for XML parts
+    return etree.tostring(root, encoding="UTF-8", standalone=True)
+
+
+def _body_hunks(new_xml: bytes, old_xml: bytes) -> Optional[List[list]]:
+    """
+    Compute the hunks that turn the new document body back into the old one.
+
+    Returns:
+        List of [start, end, old_xml_fragment] replacements of new body children,
+        or None if the parts differ outside the body in a way hunks cannot express
+    """
+    try:
+        new_root = etree.fromstring(new_xml, _parser)
+        old_root = etree.fromstring(old_xml, _parser)
+    except etree.XMLSyntaxError:
+        return None
+    new_body = new_root.find(W_BODY)
+    old_body = old_root.find(W_BODY)
+    if new_body is None or old_body is None or "w" not in new_root.nsmap:
+        return None
+
+    new_children = [etree.tostring(child) for child in new_body]
+    old_children = [etree.tostring(child) for child in old_body]
+    matcher = SequenceMatcher(None, new_children, old_children, autojunk=False)
+
+    hunks = []
+    for tag, j1, j2, i1, i2 in matcher.get_opcodes():
+        if tag != "equal":
+            hunks.append([j1, j2, b"".join(old_children[i1:i2]).decode("utf-8")])
+
+    # Only use hunks if they reproduce the old part exactly
+    restored = _apply_body_hunks(new_root, hunks)
+    if _serialize(restored) != old_xml:
+        return None
+    return hunks
+
+
+def _apply_body_hunks(root, hunks: List[list]):
+    """Apply body hunks to a parsed document part in place and return it."""
+    body = root.find(W_BODY)
+    nsmap_decls = " ".join(
+        f'xmlns:{prefix}="{uri}"' if prefix else f'xmlns="{uri}"'
+        for prefix, uri in root.nsmap.items()
+    )
+    for start, end, fragment in reversed(hunks):
+        for child in list(body)[start:end]:
+            body.remove(child)
+        if fragment:
+            # Parse in the context of the root namespaces so no redundant
+            # declarations end up on the restored elements
+            wrapper = etree.fromstring(
+                f"<w:body {nsmap_decls}>{fragment}</w:body>".encode("utf-8"), _parser
+            )
+            for offset, child in enumerate(list(wrapper)):
+                body.insert(start + offset, child)
+    return root
+
+
+def make_inverse_patch(new_parts: Mapping, old_parts: Mapping) -> Dict[str, Any]:
+    """
+    Record how to turn the new package state back into the old one.
+
+    Args:
+        new_parts: Parts after the edit
+        old_parts: Parts before the edit
+
+    Returns:
+        Patch dictionary (see apply_inverse_patch)
+    """
+    restore = {}
+    body = None
+    for name in old_parts:
+        if name in new_parts and _crc(new_parts, name) == _crc(old_parts, name):
+            continue
+        old_content = old_parts[name]
+        if name == DOCUMENT_PART and name in new_parts:
+            body = _body_hunks(new_parts[name], old_content)
+            if body is not None:
+                continue
+        restore[name] = base64.b64encode(old_content).decode("ascii")
+
+    return {
+        "before": package_digest(old_parts),
+        "after": package_digest(new_parts),
+        "order": list(old_parts),
+        "restore": restore,
+        "remove": [name for name in new_parts if name not in old_parts],
+        "body": body,
+    }
+
+
+def apply_inverse_patch(parts: Mapping, patch: Dict[str, Any]) -> "OrderedDict[str, bytes]":
+    """
+    Apply an inverse patch to a package state.
+
+    Args:
+        parts: Parts of the state the patch was recorded after
+        patch: Patch from make_inverse_patch()
+
+    Returns:
+        Parts of the previous state, in its original order
+    """
+    result = OrderedDict()
+    for name in patch["order"]:
+        if name in patch["restore"]:
+            result[name] = base64.b64decode(patch["restore"][name])
+        elif name == DOCUMENT_PART and patch.get("body") is not None:
+            root = etree.fromstring(parts[name], _parser)
+            result[name] = _serialize(_apply_body_hunks(root, patch["body"]))
+        else:
+            result[name] = parts[name]
+    return result
+
+
+class EditJournal:
+    """Per-document journals of inverse patches and named snapshots."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Root directory for the journals
+            max_bytes: Size limit of all journals together (0 disables journaling)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._total_bytes: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _journal_dir(self, path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def _load_meta(self, path: str) -> Dict[str, Any]:
+        meta_path = os.path.join(self._journal_dir(path), "journal.json")
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"path": os.path.abspath(path), "next_id": 1, "snapshots": {}}
+
+    def _save_meta(self, path: str, meta: Dict[str, Any]) -> None:
+        journal_dir = self._journal_dir(path)
+        os.makedirs(journal_dir, exist_ok=True)
+        meta_path = os.path.join(journal_dir, "journal.json")
+        temp_path = f"{meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, meta_path)
+
+    def _entry_ids(self, path: str) -> List[int]:
+        journal_dir = self._journal_dir(path)
+        if not os.path.isdir(journal_dir):
+            return []
+        return sorted(int(name.split(".")[0]) for name in os.listdir(journal_dir)
+                      if name.endswith(".json.gz"))
+
+    def _entry_path(self, path: str, entry_id: int) -> str:
+        return os.path.join(self._journal_dir(path), f"{entry_id:08d}.json.gz")
+
+    def _read_entry(self, path: str, entry_id: int) -> Dict[str, Any]:
+        with gzip.open(self._entry_path(path, entry_id), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_entry(self, path: str, entry: Dict[str, Any]) -> None:
+        os.makedirs(self._journal_dir(path), exist_ok=True)
+        entry_path = self._entry_path(path, entry["id"])
+        with gzip.open(f"{entry_path}.tmp", "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        replaced = _file_size(entry_path)
+        os.replace(f"{entry_path}.tmp", entry_path)
+        self._count_bytes(_file_size(entry_path) - replaced)
+
+    def _remove_entry(self, path: str, entry_id: int) -> None:
+        entry_path = self._entry_path(path, entry_id)
+        size = _file_size(entry_path)
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            return
+        self._count_bytes(-size)
+
+    def _count_bytes(self, delta: int) -> None:
+        if self._total_bytes is not None:
+            self._total_bytes += delta
+
+    def _scan_entries(self) -> List[Tuple[float, str, int, int]]:
+        """List (mtime, journal directory, entry id, size) of every journal entry."""
+        entries = []
+        try:
+            journal_dirs = [entry.path for entry in os.scandir(self.directory) if entry.is_dir()]
+        except FileNotFoundError:
+            return entries
+        for journal_dir in journal_dirs:
+            try:
+                files = list(os.scandir(journal_dir))
+            except FileNotFoundError:
+                continue
+            for entry in files:
+                if not entry.name.endswith(".json.gz"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, journal_dir, int(entry.name.split(".")[0]), stat.st_size))
+        return entries
+
+    def save(self, document, path: str, label: Optional[str] = None) -> None:
+        """
+        Save a document over an existing file and journal the inverse patch.
+
+        Args:
+            document: python-docx Document
+            path: Path of the existing document
+            label: Optional description of the edit, such as the tool name
+        """
+        stream = io.BytesIO()
+        document.save(stream)
+        self.save_package(stream.getvalue(), path, label)
+
+    def save_package(self, data: bytes, path: str, label: Optional[str] = None) -> None:
+        """
+        Write a serialized package over an existing file and journal the inverse patch.
+
+        Args:
+            data: Content of the new .docx package
+            path: Path of the existing document
+            label: Optional description of the edit, such as the tool name
+        """
+        with self._lock:
+            try:
+                with zipfile.ZipFile(path) as old_zip, zipfile.ZipFile(io.BytesIO(data)) as new_zip:
+                    patch = make_inverse_patch(_ZipParts(new_zip), _ZipParts(old_zip))
+            except zipfile.BadZipFile:
+                # The previous file was not a package (e.g. encrypted), so there
+                # is nothing an inverse patch could restore
+                patch = None
+
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            shutil.copymode(path, temp_path)
+            release_package_reader(path)
+            os.replace(temp_path, path)
+
+            if patch is None:
+                return
+            meta = self._load_meta(path)
+            patch["id"] = meta["next_id"]
+            patch["label"] = label
+            patch["timestamp"] = datetime.datetime.now().isoformat(timespec="seconds")
+            self._write_entry(path, patch)
+            meta["next_id"] += 1
+            self._save_meta(path, meta)
+
+            if len(self._entry_ids(path)) > MAX_JOURNAL_ENTRIES:
+                self.compact(path)
+            self._enforce_size_limit()
+
+    def purge(self, path: str) -> None:
+        """
+        Delete the journal and snapshots of a document.
+
+        Args:
+            path: Path of the document
+        """
+        with self._lock:
+            journal_dir = self._journal_dir(path)
+            if not os.path.isdir(journal_dir):
+                return
+            size = sum(os.path.getsize(self._entry_path(path, entry_id))
+                       for entry_id in self._entry_ids(path))
+            shutil.rmtree(journal_dir, ignore_errors=True)
+            self._count_bytes(-size)
+
+    def undo(self, path: str) -> Dict[str, Any]:
+        """
+        Undo the most recent journaled edit of a document.
+
+        Args:
+            path: Path of the document
+
+        Returns:
+            The entry that was undone (without its patch data)
+
+        Raises:
+            JournalError: If there is nothing to undo or the document changed
+                          outside the journal since the last edit
+        """
+        with self._lock:
+            entry_ids = self._entry_ids(path)
+            if not entry_ids:
+                raise JournalError("No journaled edits to undo")
+            entry = self._read_entry(path, entry_ids[-1])
+
+            parts = read_package(path)
+            if package_digest(parts) != entry["after"]:
+                raise JournalError("The document was modified outside the journal since its last recorded edit")
+
+            write_package(apply_inverse_patch(parts, entry), path)
+            self._remove_entry(path, entry["id"])
+
+            # Snapshots taken after this edit no longer describe a reachable state
+            meta = self._load_meta(path)
+            meta["snapshots"] = {name: snapshot for name, snapshot in meta["snapshots"].items()
+                                 if snapshot["entry"] < entry["id"]}
+            self._save_meta(path, meta)
+            return _summary(entry)
+
+    def create_snapshot(self, path: str, name: str) -> Dict[str, Any]:
+        """
+        Name the current state of a document so it can be restored later.
+
+        Args:
+            path: Path of the document
+            name: Snapshot name; an existing snapshot with this name is replaced
+
+        Returns:
+            The snapshot record
+        """
+        with self._lock:
+            with zipfile.ZipFile(path) as zip_file:
+                digest = package_digest(_ZipParts(zip_file))
+            entry_ids = self._entry_ids(path)
+            meta = self._load_meta(path)
+            snapshot = {
+                "entry": entry_ids[-1] if entry_ids else meta["next_id"] - 1,
+                "digest": digest,
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            meta["snapshots"][name] = snapshot
+            self._save_meta(path, meta)
+            return snapshot
+
+    def list_snapshots(self, path: str) -> Dict[str, Dict[str, Any]]:
+        """Get the snapshots of a document by name."""
+        return self._load_meta(path)["snapshots"]
+
+    def restore_snapshot(self, path: str, name: str) -> int:
+        """
+        Roll a document back to a named snapshot.
+
+        All edits journaled after the snapshot are undone in memory and the
+        result is written once.
+
+        Args:
+            path: Path of the document
+            name: Snapshot name
+
+        Returns:
+            Number of edits undone
+
+        Raises:
+            JournalError: If the snapshot does not exist or cannot be reached
+        """
+        with self._lock:
+            meta = self._load_meta(path)
+            snapshot = meta["snapshots"].get(name)
+            if snapshot is None:
+                raise JournalError(f"Snapshot '{name}' does not exist")
+
+            entry_ids = [entry_id for entry_id in self._entry_ids(path) if entry_id > snapshot["entry"]]
+            parts = read_package(path)
+            for entry_id in reversed(entry_ids):
+                entry = self._read_entry(path, entry_id)
+                if package_digest(parts) != entry["after"]:
+                    raise JournalError("The document was modified outside the journal after the snapshot")
+                parts = apply_inverse_patch(parts, entry)
+
+            if package_digest(parts) != snapshot["digest"]:
+                raise JournalError(f"Snapshot '{name}' can no longer be reached from the current document")
+
+            if entry_ids:
+                write_package(parts, path)
+                for entry_id in entry_ids:
+                    self._remove_entry(path, entry_id)
+                meta["snapshots"] = {other: record for other, record in meta["snapshots"].items()
+                                     if record["entry"] <= snapshot["entry"]}
+                self._save_meta(path, meta)
+            return len(entry_ids)
+
+    def history(self, path: str) -> List[Dict[str, Any]]:
+        """Get the journaled edits of a document, oldest first, without patch data."""
+        return [_summary(self._read_entry(path, entry_id)) for entry_id in self._entry_ids(path)]
+
+    def compact(self, path: str) -> None:
+        """
+        Merge older entries into one entry per snapshot interval.
+
+        The most recent KEEP_RECENT_ENTRIES entries are kept as they are.
+        Entries that cannot be reached from the current document are dropped.
+        """
+        with self._lock:
+            entry_ids = self._entry_ids(path)
+            meta = self._load_meta(path)
+            cutoff = len(entry_ids) - KEEP_RECENT_ENTRIES
+            if cutoff <= 1:
+                return
+            anchors = {snapshot["entry"] for snapshot in meta["snapshots"].values()}
+
+            # Segments of entries to merge end at snapshots and at the cutoff
+            boundaries = [position for position in range(cutoff)
+                          if entry_ids[position] in anchors or position == cutoff - 1]
+            segment_starts = [0] + [position + 1 for position in boundaries[:-1]]
+
+            # Walk back from the current state, keeping only the boundary states
+            parts = read_package(path)
+            states = {}
+            reachable_from = 0
+            for position in range(len(entry_ids) - 1, -1, -1):
+                entry = self._read_entry(path, entry_ids[position])
+                if package_digest(parts) != entry["after"]:
+                    reachable_from = position + 1
+                    break
+                if position in boundaries:
+                    states[("after", position)] = (parts, entry["timestamp"])
+                parts = apply_inverse_patch(parts, entry)
+                if position in segment_starts:
+                    states[("before", position)] = parts
+
+            if reachable_from:
+                for position in range(reachable_from):
+                    self._remove_entry(path, entry_ids[position])
+                meta["snapshots"] = {name: snapshot for name, snapshot in meta["snapshots"].items()
+                                     if snapshot["entry"] >= entry_ids[reachable_from - 1]}
+                self._save_meta(path, meta)
+
+            for start, end in zip(segment_starts, boundaries):
+                if start < reachable_from or end == start:
+                    continue
+                after_parts, timestamp = states[("after", end)]
+                merged = make_inverse_patch(after_parts, states[("before", start)])
+                merged["id"] = entry_ids[end]
+                merged["label"] = "compacted"
+                merged["timestamp"] = timestamp
+                self._write_entry(path, merged)
+                for position in range(start, end):
+                    self._remove_entry(path, entry_ids[position])
+
+    def _enforce_size_limit(self) -> None:
+        """Drop the oldest entries of all journals once they exceed the size limit."""
+        if self._total_bytes is None:
+            self._total_bytes = sum(entry[3] for entry in self._scan_entries())
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Each document's entries are dropped oldest first, so the remaining
+        # ones still form an unbroken chain back from the current state
+        journals: Dict[str, List[Tuple[float, str, int, int]]] = {}
+        for entry in self._scan_entries():
+            journals.setdefault(entry[1], []).append(entry)
+        queue = []
+        for entries in journals.values():
+            entries.sort(key=lambda entry: entry[2], reverse=True)
+            heapq.heappush(queue, (entries[-1][0], entries[-1][1]))
+        total = sum(entry[3] for entries in journals.values() for entry in entries)
+        target = int(self.max_bytes * TRIM_RATIO)
+        dropped: Dict[str, int] = {}
+        while queue and total > target:
+            _, journal_dir = heapq.heappop(queue)
+            entries = journals[journal_dir]
+            _, _, entry_id, size = entries.pop()
+            if entries:
+                heapq.heappush(queue, (entries[-1][0], journal_dir))
+            try:
+                os.remove(os.path.join(journal_dir, f"{entry_id:08d}.json.gz"))
+            except FileNotFoundError:
+                pass
+            total -= size
+            dropped[journal_dir] = max(dropped.get(journal_dir, 0), entry_id)
+        self._total_bytes = total
+
+        # Snapshots taken before a dropped edit can no longer be reached
+        for journal_dir, entry_id in dropped.items():
+            try:
+                with open(os.path.join(journal_dir, "journal.json"), "r") as f:
+                    path = json.load(f)["path"]
+            except (OSError, ValueError, KeyError):
+                continue
+            meta = self._load_meta(path)
+            meta["snapshots"] = {name: snapshot for name, snapshot in meta["snapshots"].items()
+                                 if snapshot["entry"] >= entry_id}
+            self._save_meta(path, meta)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _summary(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": entry["id"],
+        "label": entry.get("label"),
+        "timestamp": entry.get("timestamp"),
+        "changed_parts": sorted(entry["restore"]) + ([DOCUMENT_PART] if entry.get("body") else []),
+    }
+
+
+_journal: Optional[EditJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_edit_journal() -> EditJournal:
+    """
+    Get the process-wide edit journal.
+
+    Configured by WORD_MCP_JOURNAL_DIR (default ~/.cache/word_mcp_server/journal)
+    and WORD_MCP_JOURNAL_MB (size limit of all journals; unset or 0 disables
+    journaling).
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            directory = os.environ.get("WORD_MCP_JOURNAL_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "word_mcp_server", "journal"
+            )
+            try:
+                max_mb = max(0, int(os.environ.get("WORD_MCP_JOURNAL_MB", 0)))
+            except ValueError:
+                max_mb = 0
+            _journal = EditJournal(directory, max_mb * 1024 * 1024)
+        return _journal
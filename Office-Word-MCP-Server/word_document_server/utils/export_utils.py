@@ -0,0 +1,686 @@
+"""
+Export utilities for Word Document Server.
+
+These functions turn the streamed body of a Word document into formats
+meant for downstream consumers, such as retrieval chunks and bulk
+extraction files.
+"""
+import os
+import re
+import json
+import time
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from docx.oxml.ns import qn
+
+from word_document_server.utils.stream_utils import iter_body_blocks
+from word_document_server.utils.xml_utils import W_R, W_HYPERLINK, get_run_element_text
+from word_document_server.utils.batch_utils import (
+    find_documents, hash_file, get_file_fingerprint, load_manifest, save_manifest, iter_process_pool
+)
+
+
+# Rough characters-per-token ratio used for token estimates
+CHARS_PER_TOKEN = 4
+
+BULK_EXTRACT_FORMATS = ("jsonl", "parquet")
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 256
+
+# Fonts whose text is exported to Markdown as code
+MONOSPACE_FONTS = frozenset({
+    "Courier New", "Courier", "Consolas", "Lucida Console", "Menlo", "Monaco", "Source Code Pro"
+})
+
+# Paragraph styles exported as block quotes
+QUOTE_STYLES = frozenset({"Quote", "Intense Quote"})
+
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*\[\]]|(?<![0-9A-Za-z])_|_(?![0-9A-Za-z]))")
+_MARKDOWN_LINE_START = re.compile(r"^(#|>|[-+] |\d+[.)] )")
+
+R_ID = qn('r:id')
+W_RPR = qn('w:rPr')
+W_B = qn('w:b')
+W_I = qn('w:i')
+W_RFONTS = qn('w:rFonts')
+W_ASCII = qn('w:ascii')
+W_VAL = qn('w:val')
+W_PPR = qn('w:pPr')
+W_NUMPR = qn('w:numPr')
+W_NUM_ID = qn('w:numId')
+W_ILVL = qn('w:ilvl')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def table_to_markdown(rows: List[List[str]]) -> str:
+    """
+    Render table rows as a Markdown table, using the first row as the header.
+
+    Args:
+        rows: List of rows, each a list of cell texts
+
+    Returns:
+        Markdown table text
+    """
+    if not rows:
+        return ""
+
+    width = max(len(row) for row in rows)
+    lines = []
+    for row_idx, row in enumerate(rows):
+        cells = [_escape_cell(cell) for cell in row] + [""] * (width - len(row))
+        lines.append("| " + " | ".join(cells) + " |")
+        if row_idx == 0:
+            lines.append("|" + "---|" * width)
+    return "\n".join(lines)
+
+
+def iter_document_chunks(doc_path: str, max_tokens: int = 512, overlap: int = 64) -> Iterator[Dict[str, Any]]:
+    """
+    Split a Word document into structure-aware chunks for retrieval.
+
+    Headings start a new chunk and are recorded in each chunk's heading path.
+    Paragraphs are packed into chunks up to ``max_tokens``; consecutive chunks
+    of the same section share roughly ``overlap`` tokens of trailing text.
+    Tables are emitted as Markdown in chunks of their own, split by rows
+    (repeating the header row) when they are too large.
+
+    Args:
+        doc_path: Path to the Word document
+        max_tokens: Approximate maximum tokens per chunk
+        overlap: Approximate tokens of context repeated from the previous chunk
+
+    Yields:
+        Chunk dictionaries
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = min(overlap, max_tokens // 2) * CHARS_PER_TOKEN
+
+    heading_path: List[Dict[str, Any]] = []
+    pieces: List[str] = []
+    piece_chars = 0
+    first_paragraph = None
+    last_paragraph = None
+    carry = ""
+    chunk_index = 0
+
+    def make_chunk(text, extra):
+        nonlocal chunk_index
+        chunk = {
+            "chunk_index": chunk_index,
+            "heading_path": [heading["text"] for heading in heading_path],
+            "text": text,
+            "token_estimate": estimate_tokens(text)
+        }
+        chunk.update(extra)
+        chunk_index += 1
+        return chunk
+
+    def flush(keep_overlap):
+        nonlocal pieces, piece_chars, first_paragraph, last_paragraph, carry
+        chunk = None
+        if pieces:
+            text = "\n\n".join(pieces)
+            chunk = make_chunk(text, {"paragraph_range": [first_paragraph, last_paragraph]})
+            carry = _tail(text, overlap_chars) if keep_overlap else ""
+        pieces, piece_chars = [], 0
+        first_paragraph = last_paragraph = None
+        return chunk
+
+    for block in iter_body_blocks(doc_path):
+        if block["type"] == "table":
+            chunk = flush(keep_overlap=False)
+            if chunk:
+                yield chunk
+            carry = ""
+            for table_text in _split_table(block["rows"], max_chars):
+                yield make_chunk(table_text, {"table_index": block["index"]})
+            continue
+
+        text = block["text"]
+        index = block["index"]
+        level = block["heading_level"]
+
+        if level is not None:
+            # A heading closes the current section and opens a new one
+            chunk = flush(keep_overlap=False)
+            if chunk:
+                yield chunk
+            carry = ""
+            heading_path = [h for h in heading_path if h["level"] < level]
+            if text.strip():
+                heading_path.append({"level": level, "text": text.strip()})
+            continue
+
+        if not text.strip():
+            continue
+
+        for piece in _split_text(text, max_chars):
+            if pieces and piece_chars + len(piece) > max_chars:
+                chunk = flush(keep_overlap=True)
+                if chunk:
+                    yield chunk
+
+            if not pieces and carry:
+                carry = _tail(carry, max_chars - len(piece))
+                if carry:
+                    pieces.append(carry)
+                    piece_chars = len(carry)
+                carry = ""
+
+            pieces.append(piece)
+            piece_chars += len(piece)
+            if first_paragraph is None:
+                first_paragraph = index
+            last_paragraph = index
+
+    chunk = flush(keep_overlap=False)
+    if chunk:
+        yield chunk
+
+
+def export_markdown(doc_path: str, start: int = 0, end: Optional[int] = None,
+                    max_tokens: int = 8000) -> Dict[str, Any]:
+    """
+    Render a range of a document as compact Markdown, in one pass over its body.
+
+    Headings, list items, block quotes, code, tables, bold and italic text and
+    hyperlinks keep their structure. Tables belong to the paragraph before
+    them (tables before the first paragraph to paragraph 0) and are never
+    split. A page ends before the first paragraph that would take it past
+    max_tokens; the rest is exported by starting again at next_start.
+
+    Args:
+        doc_path: Path to the Word document
+        start: First paragraph to export (0-based)
+        end: Last paragraph to export (inclusive), defaults to the last one
+        max_tokens: Approximate maximum tokens of one page
+
+    Returns:
+        Dictionary with 'markdown', 'start', 'end' (last paragraph exported),
+        'next_start' (None when the range is complete), 'paragraph_count' and
+        'token_estimate'
+
+    Raises:
+        ValueError: If the range is outside the document
+    """
+    from word_document_server.utils.document_model import build_document_model
+    from word_document_server.utils.package_reader import (
+        body_paragraphs, get_package_reader, hyperlink_targets, numbering_formats
+    )
+
+    reader = get_package_reader(doc_path)
+    model = reader.memo("document_model", build_document_model)
+    count = model.paragraph_count
+    last = count - 1 if end is None else end
+    if count and (start < 0 or last >= count or start > last):
+        raise ValueError(f"Invalid paragraph range {start}-{last}. "
+                         f"Document has {count} paragraphs (0-{count - 1}).")
+
+    paragraphs = body_paragraphs(reader)
+    links = hyperlink_targets(reader)
+    numbering = numbering_formats(reader)
+    budget = max_tokens * CHARS_PER_TOKEN
+
+    parts: List[str] = []
+    size = 0
+    previous = None
+    exported = start - 1
+    next_start = None
+    blocks = model.blocks
+    position = 0 if start == 0 or not count else blocks.index(start)
+    for position in range(position, len(blocks)):
+        block = blocks[position]
+        if block >= 0:
+            if block > last:
+                break
+            kind, text = _paragraph_markdown(paragraphs[block], model.paragraph_style(block),
+                                             model.levels[block], links, numbering)
+            if parts and size + len(text) > budget:
+                next_start = block
+                break
+            exported = block
+        else:
+            table = model.tables[~block]
+            rows = [[model.cell_text(cell) for cell in model.row_cells(~block, row)]
+                    for row in range(table.rows)]
+            kind, text = "table", table_to_markdown(rows)
+        if not text:
+            continue
+
+        if previous == "code" and kind != "code":
+            parts.append("\n```")
+        if previous is not None:
+            parts.append("\n" if kind == previous and kind in ("list", "code") else "\n\n")
+        if kind == "code" and previous != "code":
+            parts.append("```\n")
+        parts.append(text)
+        size += len(text) + 2
+        previous = kind
+    if previous == "code":
+        parts.append("\n```")
+
+    markdown = "".join(parts)
+    return {
+        "markdown": markdown,
+        "start": start,
+        "end": exported,
+        "next_start": next_start,
+        "paragraph_count": count,
+        "token_estimate": estimate_tokens(markdown)
+    }
+
+
+def _paragraph_markdown(p, style: str, level: int, links: Dict[str, str],
+                        numbering: Dict[Tuple[str, str], str]) -> Tuple[str, str]:
+    """Render a w:p element as Markdown; returns the block kind and its text."""
+    # Consecutive runs with the same link and formatting are joined first
+    segments: List[List[Any]] = []
+    for child in p.iterchildren(W_R, W_HYPERLINK):
+        if child.tag == W_R:
+            runs, link = (child,), None
+        else:
+            runs, link = child.iterchildren(W_R), links.get(child.get(R_ID))
+        for r in runs:
+            text = get_run_element_text(r)
+            if not text:
+                continue
+            key = (link,) + _run_format(r)
+            if segments and segments[-1][0] == key:
+                segments[-1][1] += text
+            else:
+                segments.append([key, text])
+    if not segments:
+        return "paragraph", ""
+
+    plain = "".join(text for _, text in segments)
+    if level or style == "Title":
+        return "heading", "#" * min(level or 1, 6) + " " + _escape_markdown(plain.strip()).replace("\n", " ")
+    if all(key[3] for key, _ in segments) and plain.strip():
+        return "code", plain
+
+    text = _inline_markdown(segments)
+    if not text:
+        return "paragraph", ""
+
+    list_item = _list_item(p, style, numbering)
+    if list_item is not None:
+        depth, marker = list_item
+        return "list", "  " * depth + marker + " " + text.replace("\n", "\n" + "  " * (depth + 1))
+    if style.startswith("List Continue"):
+        depth = int(style[-1]) if style[-1].isdigit() else 1
+        return "paragraph", "  " * depth + text
+    if style in QUOTE_STYLES:
+        return "quote", "> " + text.replace("\n", "\n> ")
+    if _MARKDOWN_LINE_START.match(text):
+        text = "\\" + text
+    return "paragraph", text
+
+
+def _run_format(r) -> Tuple[bool, bool, bool]:
+    """Bold, italic and code flags of a w:r element's direct formatting."""
+    rPr = r.find(W_RPR)
+    if rPr is None:
+        return False, False, False
+    flags = []
+    for tag in (W_B, W_I):
+        element = rPr.find(tag)
+        flags.append(element is not None and element.get(W_VAL, "true") not in ("0", "false", "off"))
+    fonts = rPr.find(W_RFONTS)
+    flags.append(fonts is not None and fonts.get(W_ASCII) in MONOSPACE_FONTS)
+    return flags[0], flags[1], flags[2]
+
+
+def _inline_markdown(segments: List[List[Any]]) -> str:
+    """Render (link, bold, italic, code) segments as inline Markdown."""
+    parts = []
+    index = 0
+    while index < len(segments):
+        link = segments[index][0][0]
+        pieces = []
+        while index < len(segments) and segments[index][0][0] == link:
+            (_, bold, italic, code), text = segments[index]
+            pieces.append(_format_text(text, bold, italic, code))
+            index += 1
+        inner = "".join(pieces)
+        parts.append(f"[{inner}]({link})" if link and inner.strip() else inner)
+    return "".join(parts).strip().replace("\n", "\\\n")
+
+
+def _format_text(text: str, bold: bool, italic: bool, code: bool) -> str:
+    if code:
+        fence = "``" if "`" in text else "`"
+        return f"{fence}{text}{fence}" if fence == "`" else f"{fence} {text} {fence}"
+    text = _escape_markdown(text)
+    marker = "*" * (2 * bold + italic)
+    stripped = text.strip()
+    if not marker or not stripped:
+        return text
+    # Markers must touch the text they wrap
+    leading = text[:len(text) - len(text.lstrip())]
+    trailing = text[len(text.rstrip()):]
+    return f"{leading}{marker}{stripped}{marker}{trailing}"
+
+
+def _escape_markdown(text: str) -> str:
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def _list_item(p, style: str, numbering: Dict[Tuple[str, str], str]) -> Optional[Tuple[int, str]]:
+    """Nesting depth and Markdown marker of a list paragraph, or None."""
+    pPr = p.find(W_PPR)
+    numPr = pPr.find(W_NUMPR) if pPr is not None else None
+    if numPr is not None:
+        num_id = numPr.find(W_NUM_ID)
+        ilvl = numPr.find(W_ILVL)
+        num_id = num_id.get(W_VAL) if num_id is not None else None
+        ilvl = ilvl.get(W_VAL, "0") if ilvl is not None else "0"
+        if num_id and num_id != "0":
+            num_fmt = numbering.get((num_id, ilvl), "decimal")
+            depth = int(ilvl) if ilvl.isdigit() else 0
+            return depth, "-" if num_fmt in ("bullet", "none") else "1."
+    for prefix, marker in (("List Bullet", "-"), ("List Number", "1.")):
+        if style.startswith(prefix):
+            depth = int(style[-1]) - 1 if style[-1].isdigit() else 0
+            return depth, marker
+    return None
+
+
+def extract_document_record(doc_path: str, known_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract the text and outline of a Word document as a flat record.
+
+    Runs in worker processes, so it only takes and returns picklable values.
+
+    Args:
+        doc_path: Path to the Word document
+        known_hash: SHA-256 recorded for this file in a previous run. If the
+                    file still has this hash, extraction is skipped.
+
+    Returns:
+        Dictionary with the record, or {"unchanged": True, ...} when the
+        content hash matches known_hash
+    """
+    fingerprint = get_file_fingerprint(doc_path)
+    sha256 = hash_file(doc_path)
+    if known_hash and sha256 == known_hash:
+        return {"unchanged": True, "path": doc_path, "sha256": sha256, **fingerprint}
+
+    text = []
+    outline = []
+    paragraph_count = 0
+    table_count = 0
+    for block in iter_body_blocks(doc_path):
+        if block["type"] == "paragraph":
+            paragraph_count += 1
+            text.append(block["text"])
+            if block["heading_level"] is not None and block["text"].strip():
+                outline.append({
+                    "level": block["heading_level"],
+                    "text": block["text"].strip(),
+                    "paragraph_index": block["index"]
+                })
+        else:
+            table_count += 1
+            for row in block["rows"]:
+                text.extend(row)
+
+    return {
+        "path": doc_path,
+        "sha256": sha256,
+        "size": fingerprint["size"],
+        "mtime_ns": fingerprint["mtime_ns"],
+        "paragraph_count": paragraph_count,
+        "table_count": table_count,
+        "text": "\n".join(text),
+        "outline": outline
+    }
+
+
+def bulk_extract_documents(directory: str, output_path: str, output_format: str = "jsonl",
+                           recursive: bool = False, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Extract the text and outline of every Word document in a directory.
+
+    Documents are processed in a process pool and records are streamed to
+    the output file as they complete. A manifest next to the output file
+    (``<output_path>.manifest.json``) records each file's mtime, size and
+    hash and the output format; files that did not change since the
+    previous run keep their previous record instead of being parsed again.
+    Changing the output format extracts every document again.
+
+    Args:
+        directory: Directory containing the documents
+        output_path: Path of the JSON Lines or Parquet output file
+        output_format: 'jsonl' or 'parquet'
+        recursive: If True, include documents in subdirectories
+        max_workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        Dictionary with run statistics
+    """
+    start_time = time.perf_counter()
+    manifest_path = f"{output_path}.manifest.json"
+    properties = {"output_format": output_format}
+    previous = load_manifest(manifest_path, properties) if os.path.exists(output_path) else {}
+
+    documents = [os.path.abspath(path) for path in find_documents(directory, recursive)]
+    manifest = {}
+    keep = set()
+    candidates = []
+    for path in documents:
+        fingerprint = get_file_fingerprint(path)
+        entry = previous.get(path)
+        if entry and entry.get("mtime_ns") == fingerprint["mtime_ns"] and entry.get("size") == fingerprint["size"]:
+            keep.add(path)
+            manifest[path] = entry
+        else:
+            candidates.append((path, entry.get("sha256") if entry else None))
+
+    temp_path = f"{output_path}.tmp"
+    extracted = 0
+    extracted_bytes = 0
+    failed = []
+    writer = _open_record_writer(temp_path, output_format)
+    try:
+        for (path, _), record, error in iter_process_pool(extract_document_record, candidates, max_workers):
+            if error is not None:
+                failed.append({"path": path, "error": str(error)})
+                continue
+
+            manifest[path] = {"mtime_ns": record["mtime_ns"], "size": record["size"], "sha256": record["sha256"]}
+            if record.get("unchanged"):
+                keep.add(path)
+                continue
+
+            writer.write(record)
+            extracted += 1
+            extracted_bytes += record["size"]
+
+        # Carry over the previous records of unchanged documents, with their
+        # current fingerprint in case only the modification time changed
+        if keep:
+            for record in _iter_records(output_path, output_format):
+                if record["path"] in keep:
+                    record["mtime_ns"] = manifest[record["path"]]["mtime_ns"]
+                    record["size"] = manifest[record["path"]]["size"]
+                    writer.write(record)
+    except BaseException:
+        writer.close()
+        os.remove(temp_path)
+        raise
+
+    writer.close()
+    os.replace(temp_path, output_path)
+    save_manifest(manifest_path, manifest, properties)
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        "output": output_path,
+        "format": output_format,
+        "manifest": manifest_path,
+        "documents_found": len(documents),
+        "extracted": extracted,
+        "skipped_unchanged": len(keep),
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(extracted / elapsed, 2) if elapsed > 0 else None,
+        "megabytes_per_second": round(extracted_bytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else None
+    }
+
+
+class _JsonLinesRecordWriter:
+    """Writes records as JSON Lines."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetRecordWriter:
+    """Writes records as Parquet, one row group per batch of records."""
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("path", pa.string()),
+            ("sha256", pa.string()),
+            ("size", pa.int64()),
+            ("mtime_ns", pa.int64()),
+            ("paragraph_count", pa.int64()),
+            ("table_count", pa.int64()),
+            ("text", pa.string()),
+            ("outline", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._batch: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        row = dict(record)
+        row["outline"] = json.dumps(record["outline"], ensure_ascii=False)
+        self._batch.append(row)
+        if len(self._batch) >= PARQUET_BATCH_SIZE:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if self._batch:
+            self._writer.write_table(self._pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+
+def _open_record_writer(path: str, output_format: str):
+    """Open a record writer for the given format."""
+    if output_format == "jsonl":
+        return _JsonLinesRecordWriter(path)
+    if output_format == "parquet":
+        return _ParquetRecordWriter(path)
+    raise ValueError(f"Unsupported format: {output_format}")
+
+
+def _iter_records(path: str, output_format: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a previous bulk extraction output."""
+    if output_format == "jsonl":
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=PARQUET_BATCH_SIZE):
+            for row in batch.to_pylist():
+                row["outline"] = json.loads(row["outline"]) if row["outline"] else []
+                yield row
+
+
+def _split_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split text longer than max_chars at whitespace.
+
+    Pieces keep the original separators, so joining them gives back the
+    text; a word longer than max_chars is split inside the word.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    start = 0
+    for match in re.finditer(r"^\s+|\S+\s*", text):
+        if match.end() - start <= max_chars:
+            continue
+        if match.start() > start:
+            pieces.append(text[start:match.start()])
+            start = match.start()
+        while match.end() - start > max_chars:
+            pieces.append(text[start:start + max_chars])
+            start += max_chars
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _split_table(rows: List[List[str]], max_chars: int) -> Iterator[str]:
+    """Render a table as one or more Markdown chunks, repeating the header row."""
+    if not rows:
+        return
+
+    header, body = rows[0], rows[1:]
+    header_len = _markdown_row_length(header) * 2
+    batch: List[List[str]] = []
+    batch_len = header_len
+    for row in body:
+        row_len = _markdown_row_length(row)
+        if batch and batch_len + row_len > max_chars:
+            yield table_to_markdown([header] + batch)
+            batch, batch_len = [], header_len
+        batch.append(row)
+        batch_len += row_len
+    yield table_to_markdown([header] + batch)
+
+
+def _markdown_row_length(row: List[str]) -> int:
+    """Approximate length of a row once rendered as Markdown."""
+    return sum(len(cell) + 3 for cell in row) + 2
+
+
+def _tail(text: str, max_chars: int) -> str:
+    """Get the last max_chars characters of text, starting at a word boundary."""
+    if max_chars <= 0 or not text:
+        return ""
+    if len(text) <= max_chars:
+        return text
+    tail = text[-max_chars:]
+    space = tail.find(" ")
+    return tail[space + 1:] if space != -1 else tail
+
+
+def _escape_cell(text: str) -> str:
+    """Escape a table cell for Markdown output."""
+    return text.replace("|", "\\|").replace("\n", "<br>")
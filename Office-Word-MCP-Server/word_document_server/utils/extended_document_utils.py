@@ -2,7 +2,6 @@
 Extended document utilities for Word Document Server.
 """
 from typing import Dict, List, Any, Tuple
-from docx import Document
 
 
 def get_paragraph_text(doc_path: str, paragraph_index: int) -> Dict[str, Any]:
@@ -17,23 +16,25 @@ def get_paragraph_text(doc_path: str, paragraph_index: int) -> Dict[str, Any]:
         Dictionary with paragraph text and metadata
     """
     import os
+    from word_document_server.utils.document_model import get_document_model
+    
     if not os.path.exists(doc_path):
         return {"error": f"Document {doc_path} does not exist"}
     
     try:
-        doc = Document(doc_path)
+        model = get_document_model(doc_path)
         
         # Check if paragraph index is valid
-        if paragraph_index < 0 or paragraph_index >= len(doc.paragraphs):
-            return {"error": f"Invalid paragraph index: {paragraph_index}. Document has {len(doc.paragraphs)} paragraphs."}
+        if paragraph_index < 0 or paragraph_index >= model.paragraph_count:
+            return {"error": f"Invalid paragraph index: {paragraph_index}. Document has {model.paragraph_count} paragraphs."}
         
-        paragraph = doc.paragraphs[paragraph_index]
+        style_name = model.paragraph_style(paragraph_index)
         
         return {
             "index": paragraph_index,
-            "text": paragraph.text,
-            "style": paragraph.style.name if paragraph.style else "Normal",
-            "is_heading": paragraph.style.name.startswith("Heading") if paragraph.style else False
+            "text": model.paragraph_text(paragraph_index),
+            "style": style_name,
+            "is_heading": style_name.startswith("Heading")
         }
     except Exception as e:
         return {"error": f"Failed to get paragraph text: {str(e)}"}
@@ -53,6 +54,8 @@ def find_text(doc_path: str, text_to_find: str, match_case: bool = True, whole_w
         Dictionary with search results
     """
     import os
+    from word_document_server.utils.document_model import get_document_model
+    
     if not os.path.exists(doc_path):
         return {"error": f"Document {doc_path} does not exist"}
     
@@ -60,7 +63,7 @@ def find_text(doc_path: str, text_to_find: str, match_case: bool = True, whole_w
         return {"error": "Search text cannot be empty"}
     
     try:
-        doc = Document(doc_path)
+        model = get_document_model(doc_path)
         results = {
             "query": text_to_find,
             "match_case": match_case,
@@ -69,97 +72,69 @@ def find_text(doc_path: str, text_to_find: str, match_case: bool = True, whole_w
             "total_count": 0
         }
         
+        def add_occurrences(first, last, location):
+            for index, position in _find_in_paragraphs(model, first, last, text_to_find,
+                                                       match_case, whole_word):
+                text = model.paragraph_text(index)
+                occurrence = dict(location) if location else {"paragraph_index": index}
+                occurrence["position"] = position
+                occurrence["context"] = text[:100] + ("..." if len(text) > 100 else "")
+                results["occurrences"].append(occurrence)
+                results["total_count"] += 1
+        
         # Search in paragraphs
-        for i, para in enumerate(doc.paragraphs):
-            # Prepare text for comparison
-            para_text = para.text
-            search_text = text_to_find
-            
-            if not match_case:
-                para_text = para_text.lower()
-                search_text = search_text.lower()
-            
-            # Find all occurrences (simple implementation)
-            start_pos = 0
-            while True:
-                if whole_word:
-                    # For whole word search, we need to check word boundaries
-                    words = para_text.split()
-                    found = False
-                    for word_idx, word in enumerate(words):
-                        if (word == search_text or 
-                            (not match_case and word.lower() == search_text.lower())):
-                            results["occurrences"].append({
-                                "paragraph_index": i,
-                                "position": word_idx,
-                                "context": para.text[:100] + ("..." if len(para.text) > 100 else "")
-                            })
-                            results["total_count"] += 1
-                            found = True
-                    
-                    # Break after checking all words
-                    break
-                else:
-                    # For substring search
-                    pos = para_text.find(search_text, start_pos)
-                    if pos == -1:
-                        break
-                    
-                    results["occurrences"].append({
-                        "paragraph_index": i,
-                        "position": pos,
-                        "context": para.text[:100] + ("..." if len(para.text) > 100 else "")
-                    })
-                    results["total_count"] += 1
-                    start_pos = pos + len(search_text)
+        add_occurrences(0, model.paragraph_count, None)
         
         # Search in tables
-        for table_idx, table in enumerate(doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                for col_idx, cell in enumerate(row.cells):
-                    for para_idx, para in enumerate(cell.paragraphs):
-                        # Prepare text for comparison
-                        para_text = para.text
-                        search_text = text_to_find
-                        
-                        if not match_case:
-                            para_text = para_text.lower()
-                            search_text = search_text.lower()
-                        
-                        # Find all occurrences (simple implementation)
-                        start_pos = 0
-                        while True:
-                            if whole_word:
-                                # For whole word search, check word boundaries
-                                words = para_text.split()
-                                found = False
-                                for word_idx, word in enumerate(words):
-                                    if (word == search_text or 
-                                        (not match_case and word.lower() == search_text.lower())):
-                                        results["occurrences"].append({
-                                            "location": f"Table {table_idx}, Row {row_idx}, Column {col_idx}",
-                                            "position": word_idx,
-                                            "context": para.text[:100] + ("..." if len(para.text) > 100 else "")
-                                        })
-                                        results["total_count"] += 1
-                                        found = True
-                                
-                                # Break after checking all words
-                                break
-                            else:
-                                # For substring search
-                                pos = para_text.find(search_text, start_pos)
-                                if pos == -1:
-                                    break
-                                
-                                results["occurrences"].append({
-                                    "location": f"Table {table_idx}, Row {row_idx}, Column {col_idx}",
-                                    "position": pos,
-                                    "context": para.text[:100] + ("..." if len(para.text) > 100 else "")
-                                })
-                                results["total_count"] += 1
-                                start_pos = pos + len(search_text)
+        for table_idx, table in enumerate(model.tables):
+            for row_idx in range(table.rows):
+                for col_idx, cell in enumerate(model.row_cells(table_idx, row_idx)):
+                    paragraphs = model.cell_paragraphs(cell)
+                    add_occurrences(paragraphs.start, paragraphs.stop, {
+                        "location": f"Table {table_idx}, Row {row_idx}, Column {col_idx}"
+                    })
         
         return results
     except Exception as e:
         return {"error": f"Failed to search for text: {str(e)}"}
+
+
+def _find_in_paragraphs(model, first: int, last: int, text_to_find: str,
+                        match_case: bool, whole_word: bool):
+    """
+    Find text in a range of paragraphs of a DocumentModel.
+    
+    Yields (paragraph_index, position) in paragraph order, where position is
+    the character offset of a substring match, or the word index of a whole
+    word match.
+    """
+    search_text = text_to_find if match_case else text_to_find.lower()
+    haystack = None if match_case else model.lowered()
+    
+    if haystack is None and not match_case:
+        # Lowercasing changes some offsets in this document, so compare
+        # paragraph by paragraph
+        candidates = (i for i in range(first, last)
+                      if search_text in model.paragraph_text(i).lower())
+        matches = None
+    else:
+        matches = list(model.find(search_text, haystack, first, last))
+        candidates = dict.fromkeys(index for index, _ in matches)
+    
+    if whole_word:
+        for i in candidates:
+            para_text = model.paragraph_text(i)
+            if not match_case:
+                para_text = para_text.lower()
+            for word_idx, word in enumerate(para_text.split()):
+                if word == search_text:
+                    yield i, word_idx
+    elif matches is not None:
+        yield from matches
+    else:
+        for i in candidates:
+            para_text = model.paragraph_text(i).lower()
+            pos = para_text.find(search_text)
+            while pos != -1:
+                yield i, pos
+                pos = para_text.find(search_text, pos + len(search_text))
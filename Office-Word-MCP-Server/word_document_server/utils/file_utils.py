@@ -64,6 +64,8 @@ def create_document_copy(source_path: str, dest_path: Optional[str] = None) -> T
     
     try:
         # Simple file copy
+        from word_document_server.utils.package_reader import release_package_reader
+        release_package_reader(dest_path)
         shutil.copy2(source_path, dest_path)
         return True, f"Document copied to {dest_path}", dest_path
     except Exception as e:
@@ -0,0 +1,385 @@
+"""
+Tool instrumentation for Word Document Server.
+
+Every registered tool is wrapped by instrument_tool(), which records the
+call's total latency, the time spent loading and saving documents, the
+size of the document it worked on and the change in resident memory.
+Load and save times are captured by hooking python-docx's package loading
+and Document.save, and attributed to the tool call running in the current
+context.
+
+Aggregated metrics are available through get_metrics() and can be rendered
+as Prometheus text. Two optional file exports are controlled by
+environment variables:
+
+- WORD_MCP_METRICS_FILE: Prometheus text file rewritten after each call
+  (suitable for node_exporter's textfile collector)
+- WORD_MCP_TRACE_FILE: one JSON line per call in the OpenTelemetry span
+  layout, with child spans for document loads and saves
+"""
+import os
+import json
+import time
+import functools
+import threading
+import contextvars
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Result prefixes the tools use to report failures
+ERROR_PREFIXES = ("Failed", "Cannot", "Invalid", "Error")
+
+# Number of recent latencies kept per tool for percentiles
+LATENCY_WINDOW = 1000
+
+_current_call: contextvars.ContextVar[Optional["CallRecord"]] = contextvars.ContextVar(
+    "word_mcp_current_call", default=None
+)
+
+
+class CallRecord:
+    """Timings collected during a single tool call."""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.start_ns = time.time_ns()
+        self.load_seconds = 0.0
+        self.save_seconds = 0.0
+        self.events: List[Dict[str, Any]] = []
+
+    def add_event(self, kind: str, start_ns: int, seconds: float) -> None:
+        if kind == "load":
+            self.load_seconds += seconds
+        else:
+            self.save_seconds += seconds
+        self.events.append({"name": kind, "start_ns": start_ns, "seconds": seconds})
+
+
+class ToolMetrics:
+    """Aggregated metrics for all instrumented tools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, Any]] = {}
+        self.started = time.time()
+
+    def record(self, record: CallRecord, total_seconds: float, error: bool,
+               document_bytes: Optional[int], memory_delta: Optional[int]) -> None:
+        """Add a finished call to the aggregates."""
+        operation_seconds = max(0.0, total_seconds - record.load_seconds - record.save_seconds)
+        with self._lock:
+            stats = self._tools.get(record.tool)
+            if stats is None:
+                stats = self._tools[record.tool] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "total_seconds": 0.0,
+                    "load_seconds": 0.0,
+                    "save_seconds": 0.0,
+                    "operation_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "memory_delta_bytes": 0,
+                    "last_document_bytes": None,
+                    "max_document_bytes": None,
+                    "latencies": deque(maxlen=LATENCY_WINDOW),
+                }
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["total_seconds"] += total_seconds
+            stats["load_seconds"] += record.load_seconds
+            stats["save_seconds"] += record.save_seconds
+            stats["operation_seconds"] += operation_seconds
+            stats["max_seconds"] = max(stats["max_seconds"], total_seconds)
+            stats["latencies"].append(total_seconds)
+            if memory_delta is not None:
+                stats["memory_delta_bytes"] += memory_delta
+            if document_bytes is not None:
+                stats["last_document_bytes"] = document_bytes
+                stats["max_document_bytes"] = max(stats["max_document_bytes"] or 0, document_bytes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-serializable copy of the current metrics."""
+        with self._lock:
+            tools = {}
+            for name, stats in sorted(self._tools.items()):
+                latencies = sorted(stats["latencies"])
+                calls = stats["calls"]
+                tools[name] = {
+                    "calls": calls,
+                    "errors": stats["errors"],
+                    "mean_seconds": round(stats["total_seconds"] / calls, 6),
+                    "p50_seconds": round(_percentile(latencies, 50), 6),
+                    "p99_seconds": round(_percentile(latencies, 99), 6),
+                    "max_seconds": round(stats["max_seconds"], 6),
+                    "load_seconds_total": round(stats["load_seconds"], 6),
+                    "save_seconds_total": round(stats["save_seconds"], 6),
+                    "operation_seconds_total": round(stats["operation_seconds"], 6),
+                    "memory_delta_bytes_total": stats["memory_delta_bytes"],
+                    "last_document_bytes": stats["last_document_bytes"],
+                    "max_document_bytes": stats["max_document_bytes"],
+                }
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "rss_bytes": get_rss_bytes(),
+            "tools": tools,
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP word_mcp_uptime_seconds Seconds since the server started.",
+            "# TYPE word_mcp_uptime_seconds gauge",
+            f"word_mcp_uptime_seconds {snapshot['uptime_seconds']}",
+        ]
+        if snapshot["rss_bytes"] is not None:
+            lines += [
+                "# HELP word_mcp_resident_memory_bytes Resident memory of the server process.",
+                "# TYPE word_mcp_resident_memory_bytes gauge",
+                f"word_mcp_resident_memory_bytes {snapshot['rss_bytes']}",
+            ]
+
+        series = [
+            ("word_mcp_tool_calls_total", "counter", "Tool calls.", "calls"),
+            ("word_mcp_tool_errors_total", "counter", "Tool calls that failed.", "errors"),
+            ("word_mcp_tool_load_seconds_total", "counter", "Time spent loading documents.",
+             "load_seconds_total"),
+            ("word_mcp_tool_save_seconds_total", "counter", "Time spent saving documents.",
+             "save_seconds_total"),
+            ("word_mcp_tool_operation_seconds_total", "counter",
+             "Time spent in tools outside document loads and saves.", "operation_seconds_total"),
+            ("word_mcp_tool_memory_delta_bytes_total", "counter",
+             "Sum of resident memory changes across calls.", "memory_delta_bytes_total"),
+            ("word_mcp_tool_document_bytes", "gauge", "Size of the last document a tool worked on.",
+             "last_document_bytes"),
+        ]
+        for metric, metric_type, help_text, key in series:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stats in snapshot["tools"].items():
+                if stats[key] is not None:
+                    lines.append(f'{metric}{{tool="{name}"}} {stats[key]}')
+
+        lines.append("# HELP word_mcp_tool_duration_seconds Tool call latency.")
+        lines.append("# TYPE word_mcp_tool_duration_seconds summary")
+        for name, stats in snapshot["tools"].items():
+            lines.append(f'word_mcp_tool_duration_seconds{{tool="{name}",quantile="0.5"}} {stats["p50_seconds"]}')
+            lines.append(f'word_mcp_tool_duration_seconds{{tool="{name}",quantile="0.99"}} {stats["p99_seconds"]}')
+            lines.append(f'word_mcp_tool_duration_seconds_sum{{tool="{name}"}} '
+                         f'{round(stats["mean_seconds"] * stats["calls"], 6)}')
+            lines.append(f'word_mcp_tool_duration_seconds_count{{tool="{name}"}} {stats["calls"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear all collected metrics."""
+        with self._lock:
+            self._tools.clear()
+            self.started = time.time()
+
+
+metrics = ToolMetrics()
+
+_export_lock = threading.Lock()
+_hooks_installed = False
+
+
+def get_metrics() -> ToolMetrics:
+    """Get the process-wide tool metrics."""
+    return metrics
+
+
+def get_current_tool() -> Optional[str]:
+    """Get the name of the instrumented tool running in the current context, if any."""
+    record = _current_call.get()
+    return record.tool if record is not None else None
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    Get the current resident set size of this process.
+
+    Returns:
+        RSS in bytes, or None if it cannot be determined on this platform
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """
+    Wrap an async tool function so its calls are measured.
+
+    The wrapper keeps the tool's name, docstring and signature, so FastMCP
+    derives the same schema as for the unwrapped function.
+
+    Args:
+        func: Async tool function
+
+    Returns:
+        The instrumented async function
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Installed on first call so registering tools does not import python-docx
+        install_docx_hooks()
+        record = CallRecord(func.__name__)
+        token = _current_call.set(record)
+        path = find_document_path(args, kwargs)
+        rss_before = get_rss_bytes()
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await func(*args, **kwargs)
+            error = isinstance(result, str) and (
+                result.startswith(ERROR_PREFIXES) or result.endswith("does not exist")
+            )
+            return result
+        finally:
+            total = time.perf_counter() - start
+            _current_call.reset(token)
+            rss_after = get_rss_bytes()
+            memory_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            document_bytes = _get_size(path)
+            metrics.record(record, total, error, document_bytes, memory_delta)
+            _export(record, total, error, document_bytes, memory_delta)
+
+    return wrapper
+
+
+def install_docx_hooks() -> None:
+    """
+    Time python-docx package loads and document saves.
+
+    Patches OpcPackage.open and Document.save once per process. The timings
+    are added to the tool call running in the current context, if any.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    from docx.opc.package import OpcPackage
+    from docx.document import Document
+
+    original_open = OpcPackage.open.__func__
+    original_save = Document.save
+
+    @functools.wraps(original_open)
+    def timed_open(cls, pkg_file):
+        return _timed("load", original_open, cls, pkg_file)
+
+    @functools.wraps(original_save)
+    def timed_save(self, path_or_stream):
+        return _timed("save", original_save, self, path_or_stream)
+
+    OpcPackage.open = classmethod(timed_open)
+    Document.save = timed_save
+
+
+def _timed(kind: str, func: Callable, *args):
+    """Call func and attribute its duration to the current tool call."""
+    record = _current_call.get()
+    if record is None:
+        return func(*args)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        record.add_event(kind, start_ns, time.perf_counter() - start)
+
+
+def find_document_path(args, kwargs) -> Optional[str]:
+    """Find the document a tool call works on from its arguments."""
+    for key in ("filename", "source_filename", "original_filename"):
+        value = kwargs.get(key)
+        if isinstance(value, str):
+            return value if value.endswith(".docx") else value + ".docx"
+    if args and isinstance(args[0], str):
+        return args[0] if args[0].endswith(".docx") else args[0] + ".docx"
+    return None
+
+
+def _get_size(path: Optional[str]) -> Optional[int]:
+    """Size of a file, or None if there is no such file."""
+    if not path:
+        return None
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _export(record: CallRecord, total: float, error: bool,
+            document_bytes: Optional[int], memory_delta: Optional[int]) -> None:
+    """Write the optional metrics and trace files."""
+    metrics_file = os.environ.get("WORD_MCP_METRICS_FILE")
+    trace_file = os.environ.get("WORD_MCP_TRACE_FILE")
+    if not metrics_file and not trace_file:
+        return
+
+    with _export_lock:
+        try:
+            if metrics_file:
+                temp_path = f"{metrics_file}.tmp"
+                with open(temp_path, "w") as f:
+                    f.write(metrics.to_prometheus())
+                os.replace(temp_path, metrics_file)
+
+            if trace_file:
+                with open(trace_file, "a") as f:
+                    f.write(json.dumps(_to_span(record, total, error, document_bytes, memory_delta)) + "\n")
+        except OSError:
+            # Metrics export must never break a tool call
+            pass
+
+
+def _to_span(record: CallRecord, total: float, error: bool,
+             document_bytes: Optional[int], memory_delta: Optional[int]) -> Dict[str, Any]:
+    """Build an OpenTelemetry-style span for a finished call."""
+    trace_id = os.urandom(16).hex()
+    span_id = os.urandom(8).hex()
+    return {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "name": f"tool/{record.tool}",
+        "startTimeUnixNano": record.start_ns,
+        "endTimeUnixNano": record.start_ns + int(total * 1e9),
+        "status": {"code": "STATUS_CODE_ERROR" if error else "STATUS_CODE_OK"},
+        "attributes": {
+            "mcp.tool.name": record.tool,
+            "word.load_seconds": round(record.load_seconds, 6),
+            "word.save_seconds": round(record.save_seconds, 6),
+            "word.document_bytes": document_bytes,
+            "process.memory_delta_bytes": memory_delta,
+        },
+        "children": [
+            {
+                "traceId": trace_id,
+                "spanId": os.urandom(8).hex(),
+                "parentSpanId": span_id,
+                "name": f"docx/{event['name']}",
+                "startTimeUnixNano": event["start_ns"],
+                "endTimeUnixNano": event["start_ns"] + int(event["seconds"] * 1e9),
+            }
+            for event in record.events
+        ],
+    }
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,474 @@
+"""
+Low-level read access to the parts of a .docx package.
+
+python-docx loads and parses every part of a package before a tool can look
+at any of them. Tools that only need one or two parts (the document body,
+the core properties, the style names) read them through a PackageReader
+instead: the file is memory-mapped, the zip central directory is read once,
+and each part is decompressed straight out of the mapping when first asked
+for. The most recently parsed parts of each package are kept as lxml trees.
+
+Readers are cached per path and validated against the file's modification
+time and size, like the document cache. Code that replaces a document calls
+release_package_reader() first, since a file that is open and mapped cannot
+be replaced on Windows. A document with an open protected session is read
+from the session's decrypted copy instead of the file, unless the caller
+asks for the content on disk.
+
+Parsed trees are shared between callers and must not be modified.
+"""
+import io
+import os
+import mmap
+import zlib
+import struct
+import zipfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from word_document_server.utils.protected_sessions import get_session
+
+
+# Number of packages kept open
+MAX_READERS = 16
+
+# Number of parsed parts kept per package
+MAX_PARSED_PARTS = 8
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W_BODY = f"{{{_W}}}body"
+W_P = f"{{{_W}}}p"
+W_TBL = f"{{{_W}}}tbl"
+W_PPR = f"{{{_W}}}pPr"
+W_PSTYLE = f"{{{_W}}}pStyle"
+W_SECTPR = f"{{{_W}}}sectPr"
+W_STYLE = f"{{{_W}}}style"
+W_NAME = f"{{{_W}}}name"
+W_VAL = f"{{{_W}}}val"
+W_TYPE = f"{{{_W}}}type"
+W_STYLE_ID = f"{{{_W}}}styleId"
+W_DEFAULT = f"{{{_W}}}default"
+W_NUM = f"{{{_W}}}num"
+W_NUM_ID = f"{{{_W}}}numId"
+W_ABSTRACT_NUM = f"{{{_W}}}abstractNum"
+W_ABSTRACT_NUM_ID = f"{{{_W}}}abstractNumId"
+W_LVL = f"{{{_W}}}lvl"
+W_ILVL = f"{{{_W}}}ilvl"
+W_NUM_FMT = f"{{{_W}}}numFmt"
+
+OFFICE_DOCUMENT_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+PACKAGE_RELS = "_rels/.rels"
+CORE_PROPERTIES_PART = "docProps/core.xml"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+# Offset of the name and extra field lengths in a zip local file header
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_LENGTHS = struct.Struct("<HH")
+
+_parser = etree.XMLParser(resolve_entities=False, huge_tree=True)
+
+
+class PackageReader:
+    """Lazy, memory-mapped access to the parts of one package."""
+
+    def __init__(self, path: str, data: Optional[bytes] = None):
+        """
+        Args:
+            path: Path to the .docx file
+            data: Package content to read instead of the file
+        """
+        self.path = path
+        if data is None:
+            self._file = open(path, "rb")
+            try:
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._zip = zipfile.ZipFile(self._file)
+            except BaseException:
+                self._file.close()
+                raise
+        else:
+            self._file = None
+            self._buffer = data
+            self._zip = zipfile.ZipFile(io.BytesIO(data))
+        self._view = memoryview(self._buffer)
+        self._infos = {info.filename: info for info in self._zip.infolist()}
+        self._trees: "OrderedDict[str, Any]" = OrderedDict()
+        self._memo: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def names(self) -> List[str]:
+        """Names of all parts, in archive order."""
+        return list(self._infos)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._infos
+
+    def size(self, name: str) -> int:
+        """Uncompressed size of a part in bytes."""
+        return self._infos[name].file_size
+
+    def read(self, name: str) -> bytes:
+        """
+        Get the content of a part.
+
+        Args:
+            name: Part name, e.g. 'word/document.xml'
+
+        Returns:
+            Uncompressed content
+
+        Raises:
+            KeyError: If the package has no such part
+        """
+        info = self._infos[name]
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return self._zip.read(info)
+
+        # Decompress straight out of the mapping, without copying the
+        # compressed bytes first
+        header = info.header_offset
+        name_length, extra_length = _LOCAL_HEADER_LENGTHS.unpack_from(self._view, header + 26)
+        start = header + _LOCAL_HEADER_SIZE + name_length + extra_length
+        with self._view[start:start + info.compress_size] as compressed:
+            if info.compress_type == zipfile.ZIP_STORED:
+                data = bytes(compressed)
+            else:
+                data = zlib.decompress(compressed, -15, max(info.file_size, 1))
+        if zlib.crc32(data) != info.CRC:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for part {name}")
+        return data
+
+    def open(self, name: str):
+        """
+        Open a part as a stream, for parts too large to read at once.
+
+        Args:
+            name: Part name
+
+        Returns:
+            Binary file object
+        """
+        return self._zip.open(self._infos[name])
+
+    def tree(self, name: str):
+        """
+        Get a part parsed as XML.
+
+        The tree is shared with other callers and must not be modified.
+
+        Args:
+            name: Part name
+
+        Returns:
+            lxml root element
+        """
+        with self._lock:
+            root = self._trees.get(name)
+            if root is not None:
+                self._trees.move_to_end(name)
+                return root
+        root = etree.fromstring(self.read(name), _parser)
+        with self._lock:
+            self._trees[name] = root
+            self._trees.move_to_end(name)
+            while len(self._trees) > MAX_PARSED_PARTS:
+                self._trees.popitem(last=False)
+        return root
+
+    def memo(self, key: str, compute: Callable[["PackageReader"], Any]) -> Any:
+        """
+        Get a value derived from this package, computing it once.
+
+        Args:
+            key: Name of the value
+            compute: Function computing the value from the reader
+
+        Returns:
+            The cached value
+        """
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute(self)
+        with self._lock:
+            return self._memo.setdefault(key, value)
+
+    @property
+    def document_part(self) -> str:
+        """Name of the main document part."""
+        return self.memo("document_part", _find_document_part)
+
+    def body(self):
+        """Get the w:body element of the main document part."""
+        return self.tree(self.document_part).find(W_BODY)
+
+    def close(self) -> None:
+        """Release the mapping and the file."""
+        with self._lock:
+            self._trees.clear()
+            self._memo.clear()
+        self._zip.close()
+        self._view.release()
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+
+
+def _find_document_part(reader: PackageReader) -> str:
+    if PACKAGE_RELS in reader:
+        for rel in reader.tree(PACKAGE_RELS):
+            if rel.get("Type") == OFFICE_DOCUMENT_TYPE and rel.get("TargetMode") != "External":
+                return rel.get("Target", DEFAULT_DOCUMENT_PART).lstrip("/")
+    return DEFAULT_DOCUMENT_PART
+
+
+_readers: "OrderedDict[str, Tuple[Tuple[int, int], PackageReader]]" = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def get_package_reader(path: str, use_session: bool = True) -> PackageReader:
+    """
+    Get a reader for a document, reusing the cached one if the file is unchanged.
+
+    Args:
+        path: Path to the .docx file
+        use_session: If False, read the file on disk even when a protected
+                     session holds unsaved changes to it
+
+    Returns:
+        PackageReader
+    """
+    session = get_session(path) if use_session else None
+    if session is not None:
+        data = session.data
+        cached = getattr(session, "_reader", None)
+        if cached is None or cached._buffer is not data:
+            cached = PackageReader(session.path, data)
+            session._reader = cached
+        return cached
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _readers_lock:
+        entry = _readers.get(path)
+        if entry is not None and entry[0] == stamp:
+            _readers.move_to_end(path)
+            return entry[1]
+
+    reader = PackageReader(path)
+    stale = []
+    with _readers_lock:
+        previous = _readers.pop(path, None)
+        if previous is not None:
+            stale.append(previous[1])
+        _readers[path] = (stamp, reader)
+        while len(_readers) > MAX_READERS:
+            stale.append(_readers.popitem(last=False)[1][1])
+    for old in stale:
+        _close_quietly(old)
+    return reader
+
+
+def release_package_reader(path: str) -> None:
+    """
+    Close the cached reader of a file, before the file is written or replaced.
+
+    Args:
+        path: Path to the .docx file
+    """
+    if not _readers:
+        return
+    with _readers_lock:
+        entry = _readers.pop(os.path.abspath(path), None)
+    if entry is not None:
+        _close_quietly(entry[1])
+
+
+def _close_quietly(reader: PackageReader) -> None:
+    # A reader still in use elsewhere keeps its mapping until it is collected
+    try:
+        reader.close()
+    except (BufferError, ValueError):
+        pass
+
+
+def clear_package_readers() -> None:
+    """Close all cached readers."""
+    with _readers_lock:
+        readers = [entry[1] for entry in _readers.values()]
+        _readers.clear()
+    for reader in readers:
+        _close_quietly(reader)
+
+
+def body_paragraphs(reader: PackageReader) -> List[Any]:
+    """
+    Get the w:p elements directly in the body, as python-docx's
+    Document.paragraphs lists them.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        List of w:p elements
+    """
+    return reader.memo("body_paragraphs", lambda r: r.body().findall(W_P))
+
+
+def style_names(reader: PackageReader) -> Dict[str, Any]:
+    """
+    Get the paragraph style names of a package.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        Dictionary with 'names' (style id to the name python-docx shows) and
+        'default' (name of the default paragraph style, or None)
+    """
+    def compute(r: PackageReader) -> Dict[str, Any]:
+        from docx.styles import BabelFish
+
+        names = {}
+        default = None
+        styles_part = related_part(r, r.document_part, "styles")
+        if styles_part is not None and styles_part in r:
+            for style in r.tree(styles_part).iter(W_STYLE):
+                name_element = style.find(W_NAME)
+                raw_name = name_element.get(W_VAL) if name_element is not None else None
+                name = BabelFish.internal2ui(raw_name) if raw_name else None
+                names[style.get(W_STYLE_ID)] = name
+                if style.get(W_TYPE) == "paragraph" and style.get(W_DEFAULT) in ("1", "true", "on"):
+                    default = name
+        return {"names": names, "default": default}
+
+    return reader.memo("style_names", compute)
+
+
+def paragraph_style_name(reader: PackageReader, p) -> Optional[str]:
+    """
+    Get the style name of a w:p element, as python-docx's Paragraph.style.name.
+
+    Args:
+        reader: PackageReader
+        p: w:p element
+
+    Returns:
+        Style name, or None if neither the paragraph nor the document has one
+    """
+    styles = style_names(reader)
+    pPr = p.find(W_PPR)
+    style = pPr.find(W_PSTYLE) if pPr is not None else None
+    if style is not None:
+        style_id = style.get(W_VAL)
+        if style_id in styles["names"]:
+            return styles["names"][style_id]
+    return styles["default"]
+
+
+def related_part(reader: PackageReader, source: str, relationship: str) -> Optional[str]:
+    """
+    Resolve the target of a part's relationship.
+
+    Args:
+        reader: PackageReader
+        source: Name of the part the relationship belongs to
+        relationship: Last segment of the relationship type, e.g. 'styles'
+
+    Returns:
+        Name of the target part, or None if there is no such relationship
+    """
+    directory, name = os.path.split(source)
+    rels = _rels_part(source)
+    if rels not in reader:
+        return None
+    for rel in reader.tree(rels):
+        if rel.get("Type", "").endswith(f"/{relationship}") and rel.get("TargetMode") != "External":
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return os.path.normpath(os.path.join(directory, target)).replace(os.sep, "/")
+    return None
+
+
+def _rels_part(source: str) -> str:
+    directory, name = os.path.split(source)
+    return f"{directory}/_rels/{name}.rels" if directory else f"_rels/{name}.rels"
+
+
+def hyperlink_targets(reader: PackageReader) -> Dict[str, str]:
+    """
+    Get the external link targets of the main document part.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        Dictionary of relationship id to URL
+    """
+    def compute(r: PackageReader) -> Dict[str, str]:
+        rels = _rels_part(r.document_part)
+        if rels not in r:
+            return {}
+        return {rel.get("Id"): rel.get("Target", "") for rel in r.tree(rels)
+                if rel.get("Type", "").endswith("/hyperlink") and rel.get("TargetMode") == "External"}
+
+    return reader.memo("hyperlink_targets", compute)
+
+
+def numbering_formats(reader: PackageReader) -> Dict[Tuple[str, str], str]:
+    """
+    Get the number format of each list level in the numbering part.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        Dictionary of (numId, ilvl) to the w:numFmt value, e.g. 'bullet' or 'decimal'
+    """
+    def compute(r: PackageReader) -> Dict[Tuple[str, str], str]:
+        part = related_part(r, r.document_part, "numbering")
+        if part is None or part not in r:
+            return {}
+        root = r.tree(part)
+        abstract_formats = {}
+        for abstract in root.iterchildren(W_ABSTRACT_NUM):
+            levels = {}
+            for lvl in abstract.iterchildren(W_LVL):
+                num_fmt = lvl.find(W_NUM_FMT)
+                levels[lvl.get(W_ILVL)] = num_fmt.get(W_VAL) if num_fmt is not None else "decimal"
+            abstract_formats[abstract.get(W_ABSTRACT_NUM_ID)] = levels
+        formats = {}
+        for num in root.iterchildren(W_NUM):
+            abstract_id = num.find(W_ABSTRACT_NUM_ID)
+            if abstract_id is None:
+                continue
+            for ilvl, num_fmt in abstract_formats.get(abstract_id.get(W_VAL), {}).items():
+                formats[(num.get(W_NUM_ID), ilvl)] = num_fmt
+        return formats
+
+    return reader.memo("numbering_formats", compute)
+
+
+def core_properties(reader: PackageReader):
+    """
+    Get the core properties of a package.
+
+    Args:
+        reader: PackageReader
+
+    Returns:
+        python-docx CoreProperties, or None if the package has none
+    """
+    from docx.opc.coreprops import CoreProperties
+    from docx.oxml.parser import parse_xml
+
+    if CORE_PROPERTIES_PART not in reader:
+        return None
+    return reader.memo(
+        "core_properties", lambda r: CoreProperties(parse_xml(r.read(CORE_PROPERTIES_PART)))
+    )
@@ -0,0 +1,203 @@
+"""
+Editing sessions for password-protected documents.
+
+Opening a session decrypts a document once and keeps the decrypted package
+in memory. While the session is open, load_document() and save_document()
+work on the in-memory copy: edits are never written to disk in plain form
+and are not recorded in the edit journal. Saving the session encrypts the
+current state and atomically replaces the file on disk.
+
+Sessions, passwords, keys and decrypted content live only in this process
+and are dropped when the session is closed or the server exits; unsaved
+edits are discarded with them.
+"""
+import io
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class ProtectedSession:
+    """A decrypted, password-protected document held in memory."""
+
+    def __init__(self, path: str, password: str, data: bytes, key=None):
+        """
+        Args:
+            path: Absolute path of the encrypted document
+            password: Password the document is encrypted with
+            data: Decrypted package
+            key: EncryptionKey of the document, reused when it is saved
+        """
+        self.path = path
+        self.password = password
+        self.key = key
+        self.data = data
+        self.document = None
+        self.dirty = False
+        self.opened = time.time()
+        self._lock = threading.RLock()
+
+    def get_document(self, for_update: bool = False):
+        """
+        Get the parsed document, following the same checkout rules as the
+        document cache.
+
+        Args:
+            for_update: If True, the document must be handed back through store();
+                        until then, other callers get a fresh parse of the last
+                        stored state
+
+        Returns:
+            python-docx Document
+        """
+        from docx import Document
+
+        with self._lock:
+            document = self.document
+            if document is None:
+                document = Document(io.BytesIO(self.data))
+            self.document = None if for_update else document
+            return document
+
+    def store(self, document) -> None:
+        """
+        Record the new state of the document in memory.
+
+        Args:
+            document: python-docx Document
+        """
+        buffer = io.BytesIO()
+        document.save(buffer)
+        with self._lock:
+            self.data = buffer.getvalue()
+            self.document = document
+            self.dirty = True
+
+    def store_package(self, data: bytes) -> None:
+        """
+        Record a new state of the document that was serialized elsewhere.
+
+        Args:
+            data: Content of the .docx package
+        """
+        with self._lock:
+            self.data = data
+            self.document = None
+            self.dirty = True
+
+    def flush(self) -> bool:
+        """
+        Encrypt the current state over the document on disk.
+
+        Returns:
+            True if there were unsaved changes
+        """
+        from word_document_server.core.encryption import encrypt_stream
+        from word_document_server.core.protection import replace_file_atomically
+
+        with self._lock:
+            if not self.dirty:
+                return False
+            data = self.data
+            replace_file_atomically(
+                self.path, lambda outfile: encrypt_stream(io.BytesIO(data), outfile, self.password, self.key)
+            )
+            self.dirty = False
+            return True
+
+    def wipe(self) -> None:
+        """Drop the password, key and decrypted content of a closed session."""
+        with self._lock:
+            if self.key is not None:
+                self.key.wipe()
+            self.key = None
+            self.password = None
+            self.data = b""
+            self.document = None
+            self.dirty = False
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the session without exposing its contents."""
+        return {
+            "path": self.path,
+            "size": len(self.data),
+            "unsaved_changes": self.dirty,
+            "opened": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.opened)),
+        }
+
+
+_sessions: Dict[str, ProtectedSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def open_session(path: str, password: str) -> ProtectedSession:
+    """
+    Decrypt a document into a new session.
+
+    Args:
+        path: Path to the encrypted document
+        password: Password the document is encrypted with
+
+    Returns:
+        The session
+
+    Raises:
+        ValueError: If a session is already open for the document
+        msoffcrypto.exceptions.InvalidKeyError: If the password is incorrect
+    """
+    from word_document_server.core.encryption import decrypt_stream
+
+    path = os.path.abspath(path)
+    with _sessions_lock:
+        if path in _sessions:
+            raise ValueError("a protected session is already open for this document")
+
+    buffer = io.BytesIO()
+    with open(path, "rb") as infile:
+        key = decrypt_stream(infile, buffer, password)
+    session = ProtectedSession(path, password, buffer.getvalue(), key)
+
+    with _sessions_lock:
+        if path in _sessions:
+            raise ValueError("a protected session is already open for this document")
+        _sessions[path] = session
+    return session
+
+
+def get_session(path: str) -> Optional[ProtectedSession]:
+    """Get the open session for a document, if any."""
+    if not _sessions:
+        return None
+    return _sessions.get(os.path.abspath(path))
+
+
+def close_session(path: str, save: bool = True) -> bool:
+    """
+    Close the session for a document.
+
+    Args:
+        path: Path to the document
+        save: Whether to encrypt unsaved changes to disk first
+
+    Returns:
+        True if unsaved changes were written
+
+    Raises:
+        KeyError: If no session is open for the document
+    """
+    path = os.path.abspath(path)
+    with _sessions_lock:
+        session = _sessions[path]
+    saved = session.flush() if save else False
+    with _sessions_lock:
+        _sessions.pop(path, None)
+    session.wipe()
+    return saved
+
+
+def list_sessions() -> List[Dict[str, Any]]:
+    """Describe all open sessions."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return [session.info() for session in sessions]
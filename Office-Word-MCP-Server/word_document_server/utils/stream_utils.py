@@ -0,0 +1,153 @@
+"""
+Streaming document reader for Word Document Server.
+
+Reads the main document part incrementally with lxml's iterparse so that
+very large documents can be processed in bounded memory, without building
+a python-docx Document.
+"""
+import zipfile
+from typing import Dict, Iterator, Any, Optional
+
+from lxml import etree
+from docx.oxml.ns import qn
+from docx.styles import BabelFish
+
+from word_document_server.utils.xml_utils import (
+    W_P, W_TBL, get_paragraph_element_text, get_cell_element_text
+)
+
+
+DOCUMENT_PART = 'word/document.xml'
+STYLES_PART = 'word/styles.xml'
+
+W_BODY = qn('w:body')
+W_PPR = qn('w:pPr')
+W_PSTYLE = qn('w:pStyle')
+W_OUTLINE_LVL = qn('w:outlineLvl')
+W_VAL = qn('w:val')
+W_TR = qn('w:tr')
+W_TC = qn('w:tc')
+
+
+def read_paragraph_styles(zip_file) -> Dict[str, Any]:
+    """
+    Read paragraph style names and outline levels from the styles part.
+
+    Args:
+        zip_file: Open ZipFile of the .docx package, or a PackageReader
+
+    Returns:
+        Dictionary with 'names' (style id -> UI name), 'outline_levels'
+        (style id -> heading level) and 'default' (default paragraph style id)
+    """
+    styles = {"names": {}, "outline_levels": {}, "default": None}
+    try:
+        data = zip_file.read(STYLES_PART)
+    except KeyError:
+        return styles
+
+    root = etree.fromstring(data)
+    for style in root.iterchildren(qn('w:style')):
+        if style.get(qn('w:type')) != 'paragraph':
+            continue
+
+        style_id = style.get(qn('w:styleId'))
+        name_element = style.find(qn('w:name'))
+        name = name_element.get(W_VAL) if name_element is not None else style_id
+        styles["names"][style_id] = BabelFish.internal2ui(name)
+
+        if style.get(qn('w:default')) in ('1', 'true', 'on'):
+            styles["default"] = style_id
+
+        level = _get_outline_level(style.find(W_PPR))
+        if level is None and name.lower().startswith('heading '):
+            try:
+                level = int(name.split(' ')[1])
+            except (ValueError, IndexError):
+                level = None
+        if level is not None:
+            styles["outline_levels"][style_id] = level
+
+    return styles
+
+
+def iter_body_blocks(doc_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the body paragraphs and tables of a Word document in order.
+
+    Paragraph and table indices match python-docx's ``doc.paragraphs`` and
+    ``doc.tables``. Each element is discarded once it has been yielded.
+
+    Args:
+        doc_path: Path to the Word document
+
+    Yields:
+        Paragraph blocks ({"type": "paragraph", "index", "text", "style",
+        "heading_level"}) and table blocks ({"type": "table", "index", "rows"})
+    """
+    with zipfile.ZipFile(doc_path) as zip_file:
+        styles = read_paragraph_styles(zip_file)
+
+        paragraph_index = 0
+        table_index = 0
+
+        with zip_file.open(DOCUMENT_PART) as part:
+            for _, element in etree.iterparse(part, events=('end',), tag=(W_P, W_TBL)):
+                parent = element.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    # Paragraphs and tables nested in tables are handled with their table
+                    continue
+
+                if element.tag == W_P:
+                    style_id = _get_paragraph_style_id(element) or styles["default"]
+                    level = _get_outline_level(element.find(W_PPR))
+                    if level is None:
+                        level = styles["outline_levels"].get(style_id)
+
+                    yield {
+                        "type": "paragraph",
+                        "index": paragraph_index,
+                        "text": get_paragraph_element_text(element),
+                        "style": styles["names"].get(style_id, "Normal"),
+                        "heading_level": level
+                    }
+                    paragraph_index += 1
+                else:
+                    yield {
+                        "type": "table",
+                        "index": table_index,
+                        "rows": [
+                            [get_cell_element_text(tc) for tc in tr.iterchildren(W_TC)]
+                            for tr in element.iterchildren(W_TR)
+                        ]
+                    }
+                    table_index += 1
+
+                # Release the processed element and everything before it
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+def _get_paragraph_style_id(p) -> Optional[str]:
+    """Get the style id referenced by a w:p element, if any."""
+    pPr = p.find(W_PPR)
+    if pPr is None:
+        return None
+    pStyle = pPr.find(W_PSTYLE)
+    return pStyle.get(W_VAL) if pStyle is not None else None
+
+
+def _get_outline_level(pPr) -> Optional[int]:
+    """Get the 1-based heading level from a w:pPr outline level, if any."""
+    if pPr is None:
+        return None
+    outline = pPr.find(W_OUTLINE_LVL)
+    if outline is None:
+        return None
+    try:
+        level = int(outline.get(W_VAL)) + 1
+    except (TypeError, ValueError):
+        return None
+    # Outline level 9 (stored as 9, i.e. "body text") is not a heading
+    return level if 1 <= level <= 9 else None
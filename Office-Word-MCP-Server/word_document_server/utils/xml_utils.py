@@ -0,0 +1,105 @@
+"""
+Low-level XML helpers for Word Document Server.
+
+These helpers work directly on WordprocessingML elements and avoid creating
+python-docx proxy objects, which matters when walking large documents.
+"""
+from typing import Iterator, Tuple
+
+from docx.oxml.ns import qn
+
+
+W_P = qn('w:p')
+W_R = qn('w:r')
+W_T = qn('w:t')
+W_TBL = qn('w:tbl')
+W_TR = qn('w:tr')
+W_TC = qn('w:tc')
+W_BR = qn('w:br')
+W_HYPERLINK = qn('w:hyperlink')
+W_TYPE = qn('w:type')
+
+# Run children that contribute text, mirroring python-docx's CT_R.text
+_RUN_TEXT_EQUIVALENTS = {
+    qn('w:tab'): '\t',
+    qn('w:ptab'): '\t',
+    qn('w:cr'): '\n',
+    qn('w:noBreakHyphen'): '-',
+}
+
+
+def get_run_element_text(r) -> str:
+    """
+    Get the text of a w:r element.
+
+    Args:
+        r: w:r element
+
+    Returns:
+        Run text, with tabs and line breaks translated the same way python-docx does
+    """
+    parts = []
+    for child in r.iterchildren():
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in _RUN_TEXT_EQUIVALENTS:
+            parts.append(_RUN_TEXT_EQUIVALENTS[tag])
+    return ''.join(parts)
+
+
+def get_paragraph_element_text(p) -> str:
+    """
+    Get the text of a w:p element.
+
+    Produces the same result as python-docx's ``Paragraph.text`` without
+    building Paragraph and Run wrappers.
+
+    Args:
+        p: w:p element
+
+    Returns:
+        Paragraph text
+    """
+    parts = []
+    for child in p.iterchildren(W_R, W_HYPERLINK):
+        if child.tag == W_R:
+            parts.append(get_run_element_text(child))
+        else:
+            for r in child.iterchildren(W_R):
+                parts.append(get_run_element_text(r))
+    return ''.join(parts)
+
+
+def get_cell_element_text(tc) -> str:
+    """
+    Get the text of a w:tc element, one line per paragraph.
+
+    Args:
+        tc: w:tc element
+
+    Returns:
+        Cell text
+    """
+    return '\n'.join(get_paragraph_element_text(p) for p in tc.iterchildren(W_P))
+
+
+def iter_table_cells(tbl) -> Iterator[Tuple[int, int, object]]:
+    """
+    Iterate over the physical cells of a w:tbl element.
+
+    Horizontally merged cells are reported once, unlike python-docx's
+    ``row.cells`` which repeats them for every grid column they span.
+
+    Args:
+        tbl: w:tbl element
+
+    Yields:
+        Tuples of (row_index, column_index, tc_element)
+    """
+    for row_idx, tr in enumerate(tbl.iterchildren(W_TR)):
+        for col_idx, tc in enumerate(tr.iterchildren(W_TC)):
+            yield row_idx, col_idx, tc